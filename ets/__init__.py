@@ -0,0 +1,3 @@
+"""Gujarat ETS game engine, usable without Streamlit"""
+from .rules import Player, LARGE, SMALL, TOTAL_TILES
+from .engine import GameEngine
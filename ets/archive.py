@@ -0,0 +1,280 @@
+"""SQLite archive of finished games
+
+One row per game in `games` (parameters, seed, board, outcome and the
+whole game from GameEngine.to_bytes(), event log included) and one row
+per firm in `firms` (final results as on the results screen). Games are
+indexed by finish time, market cap and outcome for cohort queries.
+
+submit() only snapshots the game in memory and queues it; a writer thread
+reads whatever the event log spilled to disk, encodes the game and
+inserts whatever has piled up in one transaction, so the caller never
+waits on disk. The database runs in WAL mode, so readers
+are not blocked by the writer either. A game the writer cannot store is
+logged and skipped; the others still go in.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .rules import OUTCOMES
+from .state import with_events
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE = os.environ.get("ETS_ARCHIVE", "ets_games.sqlite3")
+# Most games a writer puts in one transaction
+BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    market_cap INTEGER NOT NULL,
+    permit_price REAL NOT NULL,
+    price_ceiling REAL,
+    supply_curve TEXT NOT NULL,
+    periods TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    board TEXT NOT NULL,
+    n_firms INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    total_pollution REAL NOT NULL,
+    total_permits INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_finished_at ON games (finished_at);
+CREATE INDEX IF NOT EXISTS games_market_cap ON games (market_cap, finished_at);
+CREATE INDEX IF NOT EXISTS games_outcome ON games (outcome, finished_at);
+CREATE TABLE IF NOT EXISTS firms (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    seat INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT,
+    produce REAL NOT NULL,
+    pollution REAL NOT NULL,
+    permits INTEGER NOT NULL,
+    revenue REAL NOT NULL,
+    earnings REAL NOT NULL,
+    total_cost REAL NOT NULL,
+    permit_cost REAL NOT NULL,
+    compliant INTEGER NOT NULL,
+    deficit REAL NOT NULL,
+    penalty REAL NOT NULL,
+    PRIMARY KEY (game_id, seat)
+);
+"""
+
+GAME_COLUMNS = ["finished_at", "market_cap", "permit_price", "price_ceiling", "supply_curve", "periods", "seed",
+                "board", "n_firms", "turns", "total_pollution", "total_permits", "outcome", "state"]
+FIRM_COLUMNS = ["seat", "name", "kind", "produce", "pollution", "permits", "revenue", "earnings",
+                "total_cost", "permit_cost", "compliant", "deficit", "penalty"]
+
+def game_record(engine) -> Dict:
+    """Everything archived about a game, as immutable in-memory copies taken on the caller's thread
+
+    The state is encoded without its event log, which is handed over as a
+    frozen copy; the writer joins the two.
+    """
+    players = engine.players
+    # Settled as on the results screen, so the archive agrees with it
+    settlement = engine.settlement()
+    return {
+        'game': {
+            'finished_at': time.time(),
+            'market_cap': engine.market_cap,
+            'permit_price': engine.permit_price,
+            'price_ceiling': engine.price_ceiling,
+            'supply_curve': engine.supply_curve,
+            'periods': json.dumps(engine.periods.to_dict(), separators=(",", ":")),
+            'seed': engine.seed,
+            'board': json.dumps(engine.board.spec, separators=(",", ":")),
+            'n_firms': len(players),
+            'turns': engine.turns,
+            'total_pollution': float(settlement['total']),
+            'total_permits': sum(p.permits for p in players),
+            'outcome': int(settlement['outcome']),
+        },
+        'state': engine.to_bytes(include_events=False),
+        'events': engine.events.freeze(),
+        'firms': [
+            (i, p.name, p.kind_name, p.produce, p.pollution, p.permits, p.revenue, p.earnings,
+             p.total_cost, p.permit_cost, compliant, deficit, penalty)
+            for i, (p, compliant, deficit, penalty) in enumerate(zip(
+                players, settlement['compliant'].tolist(), settlement['deficit'].tolist(),
+                settlement['penalty'].tolist()))
+        ],
+    }
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL only risks the last commits on power loss, never corruption
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class GameArchive:
+    """Write-behind store of finished games
+
+    One archive per database file per process; it is safe to share between
+    sessions. Queries read through their own connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._conn = connect(path)
+        self._read_lock = threading.Lock()
+        self.written = 0
+        self.error: Optional[Exception] = None
+        self._writer = threading.Thread(target=self._write_loop, name="ets-archive", daemon=True)
+        self._writer.start()
+
+    def submit(self, engine):
+        """Queue a finished game for writing and return at once"""
+        self._queue.put(game_record(engine))
+
+    def flush(self):
+        """Wait until everything queued so far is written, or raise if the writer has died"""
+        done = self._queue.all_tasks_done
+        with done:
+            while self._queue.unfinished_tasks:
+                if not self._writer.is_alive():
+                    raise RuntimeError(f"The archive writer for {self.path} has stopped") from self.error
+                done.wait(0.1)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._conn.close()
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                try:
+                    self._write(conn, [r for r in batch if r is not None])
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, records: List[Dict]):
+        """Store a batch in one transaction, or game by game if that fails, so one bad game loses only itself"""
+        games = []
+        for record in records:
+            try:
+                # The one step that may read disk, kept off the submitting thread
+                games.append((dict(record['game'], state=with_events(record['state'], record['events'])),
+                              record['firms']))
+            except Exception as e:
+                self._failed(record, e)
+        try:
+            self._insert(conn, games)
+        except Exception:
+            for game in games:
+                try:
+                    self._insert(conn, [game])
+                except Exception as e:
+                    self._failed(game[0], e)
+
+    def _failed(self, record: Dict, error: Exception):
+        # Keep the thread alive for later games; the UI can show the error
+        self.error = error
+        game = record.get('game', record)
+        log.exception("Could not archive game with seed %s", game.get('seed'), exc_info=error)
+
+    def _insert(self, conn: sqlite3.Connection, games: List):
+        if not games:
+            return
+        placeholders = ", ".join("?" * len(GAME_COLUMNS))
+        with conn:
+            for game, firms in games:
+                cur = conn.execute(f"INSERT INTO games ({', '.join(GAME_COLUMNS)}) VALUES ({placeholders})",
+                                   [game[c] for c in GAME_COLUMNS])
+                game_id = cur.lastrowid
+                conn.executemany(
+                    f"INSERT INTO firms (game_id, {', '.join(FIRM_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(FIRM_COLUMNS))})",
+                    [(game_id,) + firm for firm in firms])
+        self.written += len(games)
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        with self._read_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def games(self, since: Optional[float] = None, until: Optional[float] = None,
+              market_cap: Optional[int] = None, outcome: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Game summaries, newest first, filtered by finish time (Unix seconds), cap and outcome"""
+        where, params = [], []
+        if since is not None:
+            where.append("finished_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("finished_at < ?")
+            params.append(until)
+        if market_cap is not None:
+            where.append("market_cap = ?")
+            params.append(market_cap)
+        if outcome is not None:
+            where.append("outcome = ?")
+            params.append(OUTCOMES.index(outcome))
+        columns = ", ".join(["id"] + [c for c in GAME_COLUMNS if c not in ("board", "state")])
+        sql = f"SELECT {columns} FROM games"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY finished_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = [dict(row) for row in self._query(sql, params)]
+        for row in rows:
+            row['outcome'] = OUTCOMES[row['outcome']]
+            row['periods'] = json.loads(row['periods'])
+        return rows
+
+    def firms(self, game_ids: Sequence[int]) -> List[Dict]:
+        """Final per-firm results of the given games"""
+        if not game_ids:
+            return []
+        sql = (f"SELECT game_id, {', '.join(FIRM_COLUMNS)} FROM firms "
+               f"WHERE game_id IN ({', '.join('?' * len(game_ids))}) ORDER BY game_id, seat")
+        return [dict(row) for row in self._query(sql, list(game_ids))]
+
+    def outcome_counts(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[int, Dict[str, int]]:
+        """Games per outcome for each market cap"""
+        sql = "SELECT market_cap, outcome, COUNT(*) AS n FROM games WHERE finished_at >= ? AND finished_at < ? " \
+              "GROUP BY market_cap, outcome"
+        counts: Dict[int, Dict[str, int]] = {}
+        for row in self._query(sql, (since or 0.0, until or float("inf"))):
+            counts.setdefault(row['market_cap'], dict.fromkeys(OUTCOMES, 0))[OUTCOMES[row['outcome']]] = row['n']
+        return counts
+
+    def load(self, game_id: int):
+        """Rebuild an archived game, event log and timeline included"""
+        from .board import compile_board
+        from .engine import GameEngine
+
+        rows = self._query("SELECT board, state FROM games WHERE id = ?", (game_id,))
+        if not rows:
+            raise KeyError(f"No archived game {game_id}")
+        return GameEngine.from_bytes(rows[0]['state'], compile_board(json.loads(rows[0]['board'])))
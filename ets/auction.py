@@ -0,0 +1,85 @@
+"""Uniform-price sealed-bid auction for the regulator's permit pool
+
+Each firm submits a bid curve: steps of (price, quantity), meaning "I will
+buy up to quantity more permits at any price up to price". All bid steps are
+sorted by price once and swept until supply runs out; every winner pays the
+same clearing price.
+"""
+import numpy as np
+from typing import List, Optional, Tuple
+
+class AuctionResult:
+    """Clearing price and the quantity awarded to each bid step"""
+
+    def __init__(self, clearing_price: float, allocations: np.ndarray, bidders: np.ndarray, supply: int):
+        self.clearing_price = clearing_price
+        self.allocations = allocations
+        self.bidders = bidders
+        self.supply = supply
+
+    @property
+    def sold(self) -> int:
+        return int(self.allocations.sum())
+
+    def by_bidder(self, n_bidders: int) -> np.ndarray:
+        """Permits won per bidder index"""
+        return np.bincount(self.bidders, weights=self.allocations, minlength=n_bidders).astype(np.int64)
+
+def clear_uniform_price(bidders, prices, quantities, supply: int, reserve: float,
+                        rng: Optional[np.random.Generator] = None) -> AuctionResult:
+    """Clear one auction in O(n log n)
+
+    Bids below the reserve are rejected. If the remaining demand fits within
+    supply, every bid is filled at the reserve price. Otherwise the clearing
+    price is the price of the marginal bid, bids above it are filled in full
+    and bids at it share what is left pro rata. Units left over from rounding
+    go to the largest remainders, ties in random order if rng is given and
+    in submission order otherwise.
+    """
+    bidders = np.asarray(bidders, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    allocations = np.zeros(prices.size, dtype=np.int64)
+
+    valid = np.flatnonzero((prices >= reserve) & (quantities > 0))
+    # Highest price first; the stable sort keeps submission order within a price
+    order = valid[np.argsort(-prices[valid], kind="stable")]
+    demand = np.cumsum(quantities[order])
+
+    if demand.size == 0 or demand[-1] <= supply:
+        allocations[order] = quantities[order]
+        return AuctionResult(float(reserve), allocations, bidders, supply)
+
+    marginal = np.searchsorted(demand, supply, side="left")
+    clearing_price = prices[order[marginal]]
+    sorted_prices = prices[order]
+    above = order[sorted_prices > clearing_price]
+    at = order[sorted_prices == clearing_price]
+
+    allocations[above] = quantities[above]
+    remaining = supply - int(quantities[above].sum())
+
+    share = remaining * quantities[at] / quantities[at].sum()
+    base = np.floor(share).astype(np.int64)
+    leftover = remaining - int(base.sum())
+    if leftover:
+        tiebreak = rng.permutation(at.size) if rng is not None else np.arange(at.size)
+        # Largest fractional remainder first, then the tie-break order
+        ranked = np.lexsort((tiebreak, -(share - base)))
+        base[ranked[:leftover]] += 1
+    allocations[at] = base
+
+    return AuctionResult(float(clearing_price), allocations, bidders, supply)
+
+def parse_bid_curve(text: str) -> List[Tuple[float, int]]:
+    """Parse "price:qty, price:qty" into bid steps"""
+    steps = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        price, sep, qty = part.partition(":")
+        if not sep:
+            raise ValueError(f"Bid step {part!r} should look like price:quantity")
+        steps.append((float(price), int(qty)))
+    return steps
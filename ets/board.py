@@ -0,0 +1,175 @@
+"""Board specs (JSON/YAML) compiled into dense per-tile effect arrays
+
+A spec is a list of tiles. Each tile has a name, an optional colour (a key
+of COLORS) and any of these effects:
+
+    pollution  multiplier on pollution
+    produce    multiplier on production, pollution and sales revenue
+    cost       fixed charge
+    unit_tax   charge per unit of production
+    offer      {"type", "cost", "multiplier"} investment the firm may buy
+
+The display text is generated from the effects, so labels cannot drift from
+what the tile does. A "detail" string overrides the generated second line.
+"""
+import json
+import os
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .rules import COLORS, PRODUCE_PRICE, money
+
+BOARDS_DIR = os.path.join(os.path.dirname(__file__), "boards")
+DEFAULT_BOARD = os.path.join(BOARDS_DIR, "gujarat.json")
+
+TILE_KEYS = {"name", "detail", "color", "pollution", "produce", "cost", "unit_tax", "offer"}
+OFFER_KEYS = {"type", "cost", "multiplier"}
+
+def _percent(multiplier: float) -> str:
+    return f"{(multiplier - 1) * 100:+g}%"
+
+def _describe(tile: Dict) -> str:
+    """Second display line generated from a tile's effects"""
+    parts = []
+    if "pollution" in tile:
+        parts.append(f"Emissions {_percent(tile['pollution'])}")
+    if "produce" in tile:
+        parts.append(f"Production {_percent(tile['produce'])}")
+    if "cost" in tile:
+        parts.append(f"Pay {money(tile['cost'])}")
+    if "unit_tax" in tile:
+        parts.append(f"₹{tile['unit_tax']:g} per unit")
+    if "offer" in tile:
+        offer = tile["offer"]
+        parts.append(f"₹{offer['cost'] / 100000:g}L, {_percent(offer['multiplier'])}")
+    return ", ".join(parts)
+
+class Board:
+    """Compiled board: one array per effect, indexed by tile"""
+
+    def __init__(self, spec: Dict):
+        tiles = spec["tiles"]
+        n = len(tiles)
+        self.name = spec.get("name", "Custom board")
+        self.spec = spec
+        self.n_tiles = n
+
+        self.pollution_mult = np.ones(n)
+        self.produce_mult = np.ones(n)
+        self.fixed_cost = np.zeros(n)
+        self.unit_tax = np.zeros(n)
+        self.offer_cost = np.zeros(n)
+        self.offer_mult = np.ones(n)
+        self.offer_type: List[Optional[str]] = [None] * n
+        self.tiles: List[Dict] = []
+
+        for i, tile in enumerate(tiles):
+            self.pollution_mult[i] = tile.get("pollution", 1.0)
+            self.produce_mult[i] = tile.get("produce", 1.0)
+            self.fixed_cost[i] = tile.get("cost", 0.0)
+            self.unit_tax[i] = tile.get("unit_tax", 0.0)
+            if "offer" in tile:
+                self.offer_cost[i] = tile["offer"]["cost"]
+                self.offer_mult[i] = tile["offer"]["multiplier"]
+                self.offer_type[i] = tile["offer"]["type"]
+
+            detail = tile.get("detail", _describe(tile))
+            text = f"{tile['name']}\n{detail}" if detail else tile["name"]
+            self.tiles.append({"text": text, "color": COLORS[tile.get("color", "white")]})
+
+        # Python-float rows for the interactive engine, which works one tile at a time
+        self._rows: List[Tuple[float, ...]] = list(zip(
+            self.pollution_mult.tolist(), self.produce_mult.tolist(), self.fixed_cost.tolist(),
+            self.unit_tax.tolist(), self.offer_cost.tolist(), self.offer_mult.tolist(),
+        ))
+
+    def tables(self) -> Dict[str, np.ndarray]:
+        return {
+            'pollution_mult': self.pollution_mult, 'produce_mult': self.produce_mult,
+            'fixed_cost': self.fixed_cost, 'unit_tax': self.unit_tax,
+            'offer_cost': self.offer_cost, 'offer_mult': self.offer_mult,
+        }
+
+    def apply(self, player, tile: int) -> Optional[Dict]:
+        """Apply a tile to one player; returns the investment offer, if any"""
+        pollution_mult, produce_mult, fixed_cost, unit_tax, offer_cost, offer_mult = self._rows[tile]
+        pre = player.produce
+        player.produce = pre * produce_mult
+        player.pollution *= pollution_mult * produce_mult
+        player.earnings += (produce_mult - 1) * pre * PRODUCE_PRICE
+        charge = fixed_cost + unit_tax * player.produce
+        if charge:
+            player.earnings -= charge
+            player.total_cost += charge
+        if offer_cost > 0:
+            return {'cost': offer_cost, 'multiplier': offer_mult, 'type': self.offer_type[tile]}
+        return None
+
+def validate_spec(spec: Dict):
+    tiles = spec.get("tiles") if isinstance(spec, dict) else None
+    if not isinstance(tiles, list) or len(tiles) < 7:
+        raise ValueError("Board spec needs a 'tiles' list with at least 7 tiles")
+    for i, tile in enumerate(tiles):
+        unknown = set(tile) - TILE_KEYS
+        if unknown:
+            raise ValueError(f"Tile {i}: unknown keys {sorted(unknown)}")
+        if "name" not in tile:
+            raise ValueError(f"Tile {i}: missing 'name'")
+        if tile.get("color", "white") not in COLORS:
+            raise ValueError(f"Tile {i}: unknown color {tile['color']!r}")
+        if "offer" in tile:
+            if set(tile["offer"]) != OFFER_KEYS:
+                raise ValueError(f"Tile {i}: offer needs exactly {sorted(OFFER_KEYS)}")
+            # A free offer would never be made: a zero cost marks a tile without one
+            cost = tile["offer"]["cost"]
+            if not isinstance(cost, (int, float)) or cost <= 0:
+                raise ValueError(f"Tile {i}: offer cost must be a positive number, got {cost!r}")
+    if set(tiles[0]) - {"name", "detail", "color"}:
+        raise ValueError("Tile 0 is GO and cannot carry effects")
+
+def compile_board(spec: Dict) -> Board:
+    validate_spec(spec)
+    return Board(spec)
+
+def parse_board(text: str, fmt: str = "json") -> Board:
+    """Compile a board from JSON or YAML source text"""
+    if fmt in ("yaml", "yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML boards need PyYAML: pip install pyyaml")
+        try:
+            spec = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML: {e}")
+    else:
+        spec = json.loads(text)
+    return compile_board(spec)
+
+def load_board(path: str) -> Board:
+    fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, encoding="utf-8") as f:
+        return parse_board(f.read(), fmt)
+
+@lru_cache(maxsize=None)
+def default_board() -> Board:
+    return load_board(DEFAULT_BOARD)
+
+@lru_cache(maxsize=None)
+def ring_layout(n_tiles: int) -> Tuple[int, int, np.ndarray]:
+    """Grid size and (row, column) of every tile around the edge of a rectangle
+
+    GO sits in the bottom-left corner and play runs right along the bottom,
+    up the right side, left along the top and down the left side. An odd
+    tile count leaves the cell just above GO empty.
+    """
+    perimeter = n_tiles + n_tiles % 2
+    half = perimeter // 2 + 2  # columns + rows
+    cols = (half + 1) // 2
+    rows = half - cols
+    cells = [(rows - 1, c) for c in range(cols)]
+    cells += [(r, cols - 1) for r in range(rows - 2, -1, -1)]
+    cells += [(0, c) for c in range(cols - 2, -1, -1)]
+    cells += [(r, 0) for r in range(1, rows - 1)]
+    return rows, cols, np.array(cells[:n_tiles], dtype=np.int32)
@@ -0,0 +1,253 @@
+"""Headless command line: python -m ets {simulate,sweep,replay,tournament}
+
+Takes the same settings as the app's sidebar and never imports Streamlit.
+Results go to stdout or a file (-o) as NDJSON, one JSON object per line,
+or as Parquet (needs pyarrow). Simulation output is written a chunk at a
+time, so a run of millions of games streams rather than piling up.
+
+    python -m ets simulate --games 1000000 --firms 4 --seed 1 -o sim.parquet
+    python -m ets simulate --games 100000 --periods 10 --cap-decline 0.05 --borrow-limit 0.1 --summary
+    python -m ets sweep --games 20000 --caps 150000 200000 --format parquet -o sweep.parquet
+    python -m ets replay --seeds 1234 5678 --invest-prob 1
+    python -m ets replay --archive ets_games.sqlite3 --game 42 --events
+    python -m ets tournament --strategies greedy compliance --firms 3 --games 100000
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import numpy as np
+from typing import Dict, IO, Iterable, Iterator, List, Optional
+
+from .board import default_board, load_board
+from .events import EVENT_NAMES
+from .pricing import SUPPLY_CURVES
+from .roster import ALLOCATION_METHODS, load_roster
+from .periods import PeriodSchedule
+from .rules import DEFAULT_MARKET_CAP, DEFAULT_PENALTY, PERMIT_PRICE, OUTCOMES
+from .simulate import iter_simulations
+from .strategy import STRATEGIES
+
+FORMATS = ["ndjson", "parquet"]
+
+def _game_args(parser: argparse.ArgumentParser):
+    """The sidebar's market and player settings"""
+    parser.add_argument("--market-cap", type=int, default=DEFAULT_MARKET_CAP, help="total market cap (kg)")
+    parser.add_argument("--permit-price", type=float, default=PERMIT_PRICE, help="permit floor price (Rs)")
+    parser.add_argument("--price-ceiling", type=float, default=None, help="permit ceiling price (Rs)")
+    parser.add_argument("--supply-curve", choices=SUPPLY_CURVES, default="flat")
+    parser.add_argument("--board", help="board spec (JSON/YAML); defaults to the Gujarat board")
+    parser.add_argument("--firms", type=int, default=2, help="number of industries")
+    parser.add_argument("--roster", help="industry roster (CSV/Parquet); replaces --firms")
+    parser.add_argument("--allocation", choices=ALLOCATION_METHODS, default="grandfathering")
+    parser.add_argument("--invest-prob", type=float, default=0.5,
+                        help="chance a firm buys an investment it lands on")
+    parser.add_argument("--periods", type=int, default=1, help="compliance periods, one lap of the board each")
+    parser.add_argument("--cap-decline", type=float, default=0.0, help="cap tightening per period, e.g. 0.05")
+    parser.add_argument("--no-banking", dest="banking", action="store_false",
+                        help="unused permits expire at each true-up")
+    parser.add_argument("--borrow-limit", type=float, default=0.0,
+                        help="share of the next allocation a firm may borrow at a true-up")
+    parser.add_argument("--penalty", type=float, default=DEFAULT_PENALTY, help="true-up penalty per uncovered kg (Rs)")
+    parser.add_argument("--make-good", action="store_true",
+                        help="uncovered kg also come off the next period's allocation")
+
+def _output_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("-o", "--output", default="-", help="output file; - for stdout")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ets", description="Gujarat ETS game, headless")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="play a batch of games")
+    _game_args(simulate)
+    simulate.add_argument("--games", type=int, default=10_000)
+    simulate.add_argument("--seed", type=int, default=None)
+    simulate.add_argument("--chunk-size", type=int, default=2_000_000, help="firms held in memory at once")
+    simulate.add_argument("--summary", action="store_true", help="one line of outcome rates instead of per-firm rows")
+    _output_args(simulate)
+
+    sweep = commands.add_parser("sweep", help="simulate a grid of market caps and permit prices")
+    _game_args(sweep)
+    sweep.add_argument("--games", type=int, default=20_000, help="games per grid cell")
+    sweep.add_argument("--seed", type=int, default=0)
+    sweep.add_argument("--caps", type=int, nargs="+", help="market caps; defaults to the sidebar's range")
+    sweep.add_argument("--prices", type=float, nargs="+", help="floor prices; defaults to the sidebar's range")
+    sweep.add_argument("--processes", type=int, default=None)
+    _output_args(sweep)
+
+    replay = commands.add_parser("replay", help="replay seeded or archived games")
+    _game_args(replay)
+    source = replay.add_mutually_exclusive_group(required=True)
+    source.add_argument("--seeds", type=int, nargs="+", help="game seeds shown in the app")
+    source.add_argument("--archive", help="game archive (SQLite)")
+    replay.add_argument("--game", type=int, help="archived game id")
+    replay.add_argument("--events", action="store_true", help="the archived game's event log instead of results")
+    replay.add_argument("--seed", type=int, default=None, help="seed for the investment choices")
+    _output_args(replay)
+
+    tournament = commands.add_parser("tournament", help="round-robin matchups between bot strategies")
+    tournament.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES), default=None)
+    tournament.add_argument("--firms", type=int, default=2, help="seats per game")
+    tournament.add_argument("--games", type=int, default=10_000, help="games per matchup")
+    tournament.add_argument("--market-cap", type=int, default=DEFAULT_MARKET_CAP, help="total market cap (kg)")
+    tournament.add_argument("--permit-price", type=float, default=PERMIT_PRICE, help="permit floor price (Rs)")
+    tournament.add_argument("--price-ceiling", type=float, default=None, help="permit ceiling price (Rs)")
+    tournament.add_argument("--supply-curve", choices=SUPPLY_CURVES, default="flat")
+    tournament.add_argument("--board", help="board spec (JSON/YAML); defaults to the Gujarat board")
+    tournament.add_argument("--seed", type=int, default=0)
+    tournament.add_argument("--processes", type=int, default=None)
+    _output_args(tournament)
+    return parser
+
+@contextlib.contextmanager
+def _open_output(path: str, binary: bool) -> Iterator[IO]:
+    if path == "-":
+        yield sys.stdout.buffer if binary else sys.stdout
+        return
+    with open(path, "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+        yield f
+
+def _write_ndjson(rows: Iterable[Dict], out: IO):
+    for row in rows:
+        out.write(json.dumps(row, separators=(",", ":")))
+        out.write("\n")
+
+def _simulation_rows(result, first_game: int) -> Iterator[Dict]:
+    outcome = result.outcome.tolist()
+    kinds = result.kinds.tolist()
+    columns = [result.produce.tolist(), result.pollution.tolist(), result.permits.tolist(),
+               result.earnings.tolist(), result.rolls.tolist(), result.compliant.tolist(),
+               result.settlement['penalty'].tolist()]
+    for g in range(result.n_games):
+        for seat, kind in enumerate(kinds[g]):
+            produce, pollution, permits, earnings, rolls, compliant, penalties = (c[g][seat] for c in columns)
+            yield {'game': first_game + g, 'market_cap': result.market_cap, 'permit_price': result.permit_price,
+                   'outcome': OUTCOMES[outcome[g]], 'seat': seat, 'kind': result.kind_names[kind],
+                   'produce': produce, 'pollution': pollution, 'permits': permits, 'earnings': earnings,
+                   'rolls': rolls, 'compliant': compliant, 'penalties': penalties}
+
+def _summary(results) -> Dict:
+    games = compliant = firms = 0
+    counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    for result in results:
+        games += result.n_games
+        firms += result.compliant.size
+        compliant += int(result.compliant.sum())
+        counts += np.bincount(result.outcome, minlength=len(OUTCOMES))
+    row = {'games': games}
+    row.update({name.lower().replace(" ", "_"): int(counts[i]) / games for i, name in enumerate(OUTCOMES)})
+    row['compliance_rate'] = compliant / firms
+    return row
+
+def _write_results(results, args, summary: bool = False):
+    """Write simulation chunks as they are produced"""
+    from . import export
+
+    if summary:
+        row = dict(_summary(results), market_cap=args.market_cap, permit_price=args.permit_price)
+        _write_frame([row], args)
+        return
+    with _open_output(args.output, args.format == "parquet") as out:
+        if args.format == "parquet":
+            export.write_simulation(results, out)
+            return
+        games = 0
+        for result in results:
+            _write_ndjson(_simulation_rows(result, games), out)
+            out.flush()
+            games += result.n_games
+
+def _write_frame(rows: List[Dict], args):
+    """A small table of rows, e.g. sweep cells or a summary"""
+    with _open_output(args.output, args.format == "parquet") as out:
+        if args.format == "parquet":
+            import pandas as pd
+            pd.DataFrame(rows).to_parquet(out, index=False)
+        else:
+            _write_ndjson(rows, out)
+
+def _setup(args):
+    board = load_board(args.board) if args.board else default_board()
+    roster = load_roster(args.roster) if args.roster else None
+    return dict(market_cap=args.market_cap, permit_price=args.permit_price, invest_prob=args.invest_prob,
+                board=board, n_firms=args.firms, roster=roster, allocation=args.allocation,
+                price_ceiling=args.price_ceiling, supply_curve=args.supply_curve,
+                periods=PeriodSchedule(args.periods, args.cap_decline, args.banking, args.borrow_limit, args.penalty,
+                                       args.make_good))
+
+def run_simulate(args):
+    setup = _setup(args)
+    results = iter_simulations(args.games, seed=args.seed, chunk_size=args.chunk_size, **setup)
+    _write_results(results, args, args.summary)
+
+def run_sweep_command(args):
+    from .sweep import default_grid, run_sweep
+
+    default = default_grid()
+    caps = args.caps or sorted({cap for cap, _ in default})
+    prices = args.prices or sorted({price for _, price in default})
+    grid = [(cap, price) for cap in caps for price in prices]
+    if args.roster:
+        raise SystemExit("sweep plays generated Large/Small mixes; --roster is not supported")
+    if args.periods > 1:
+        raise SystemExit("sweep plays single-period games; --periods is not supported")
+    board = load_board(args.board) if args.board else default_board()
+    df = run_sweep(grid, args.games, args.firms, args.invest_prob, args.seed, args.processes, board,
+                   args.price_ceiling, args.supply_curve)
+    _write_frame(df.to_dict(orient="records"), args)
+
+def _archived_rows(engine, events: bool) -> List[Dict]:
+    if events:
+        return [{'seq': int(e['seq']), 'turn': int(e['turn']), 'kind': EVENT_NAMES[e['kind']], 'seat': int(e['seat']),
+                 'a': float(e['a']), 'b': float(e['b']), 'c': float(e['c']), 'text': engine.describe(e)}
+                for e in engine.events.slice(0)]
+    outcome = OUTCOMES[engine.outcome()]
+    return [dict(seat=i, outcome=outcome, **p) for i, p in enumerate(engine.state()['players'])]
+
+def run_replay(args):
+    if args.seeds:
+        setup = _setup(args)
+        results = iter_simulations(len(args.seeds), seed=args.seed, game_seeds=args.seeds, **setup)
+        _write_results(results, args)
+        return
+    if args.game is None:
+        raise SystemExit("--archive needs --game")
+    from . import export
+    from .archive import GameArchive
+
+    archive = GameArchive(args.archive)
+    try:
+        engine = archive.load(args.game)
+    except KeyError as e:
+        raise SystemExit(e.args[0])
+    finally:
+        archive.close()
+    with _open_output(args.output, args.format == "parquet") as out:
+        if args.format == "parquet":
+            table = export.events_table(engine) if args.events else export.game_table(engine, args.game)
+            export.write_table(table, out)
+        else:
+            _write_ndjson(_archived_rows(engine, args.events), out)
+
+def run_tournament_command(args):
+    from .tournament import run_tournament
+
+    board = load_board(args.board) if args.board else default_board()
+    df = run_tournament(args.strategies, args.games, args.firms, args.market_cap, args.permit_price, args.seed,
+                        args.processes, board, args.price_ceiling, args.supply_curve)
+    _write_frame(df.to_dict(orient="records"), args)
+
+COMMANDS = {'simulate': run_simulate, 'sweep': run_sweep_command, 'replay': run_replay,
+            'tournament': run_tournament_command}
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    try:
+        COMMANDS[args.command](args)
+    except BrokenPipeError:
+        # Output piped into head or similar; stop quietly, as the docs for SIGPIPE advise
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,93 @@
+"""Compliance true-up over columnar firm arrays
+
+One vectorised pass settles every firm of one game, arrays of shape
+(firms,), or of many games at once, shape (games, firms), with the cap
+a scalar or one per game:
+
+    surrendered     permits given up against emissions, rounded up to whole kg
+    deficit         emissions the firm's own permits do not cover
+    borrowed        deficit covered from the next allocation, up to the limit
+    uncovered       deficit left after borrowing; charged the penalty per kg
+    make_good       with make-good on, uncovered kg also come off the next
+                    allocation, so the penalty never buys the right to emit
+    banked          unused permits carried over (with banking)
+    next_permits    the next allocation, less borrowing and make-good, plus banking;
+                    never below zero
+    owed            what the next allocation could not cover, still to come off
+                    the one after: pass it back in as owed
+    excess          the market's emissions over the cap
+    outcome         index into OUTCOMES per game
+
+A finished multi-year game is then judged over all its periods with
+over_periods(). The engine's true-up and results screen, the batch
+simulator, the archive and the exports all settle through here, so they
+agree firm for firm.
+"""
+import numpy as np
+from typing import Dict, Optional
+
+from .periods import SINGLE_PERIOD, PeriodSchedule
+
+def outcome_class(total_pollution, cap, all_compliant) -> np.ndarray:
+    """Outcome per game as an index into OUTCOMES; scalars or arrays"""
+    return np.where(np.asarray(total_pollution) <= cap, np.where(all_compliant, 0, 1), 2).astype(np.int8)
+
+def true_up(emissions: np.ndarray, permits: np.ndarray, cap, schedule: PeriodSchedule = SINGLE_PERIOD,
+            next_allocation: Optional[np.ndarray] = None, owed: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Settle a period for arrays of firms, firms on the last axis
+
+    next_allocation is each firm's allocation for the next period, which
+    borrowing and make-good draw on; leave it out for the last period (or
+    a single-period game), when there is nothing to borrow against. owed
+    is the make-good earlier allocations could not cover.
+    """
+    emissions = np.asarray(emissions, dtype=np.float64)
+    permits = np.asarray(permits, dtype=np.float64)
+    next_allocation = np.zeros_like(permits) if next_allocation is None else np.asarray(next_allocation)
+    owed = np.zeros_like(permits) if owed is None else np.asarray(owed, dtype=np.float64)
+
+    required = np.ceil(emissions)
+    surrendered = np.minimum(permits, required)
+    deficit = required - surrendered
+    borrowed = np.minimum(deficit, np.floor(schedule.borrow_limit * next_allocation))
+    uncovered = deficit - borrowed
+    make_good = uncovered if schedule.make_good else np.zeros_like(uncovered)
+    banked = permits - surrendered if schedule.banking else np.zeros_like(permits)
+    compliant = uncovered == 0
+    # Whatever the next allocation and the bank cannot cover waits for the allocation after
+    shortfall = borrowed + make_good + owed - next_allocation - banked
+
+    total = emissions.sum(axis=-1)
+    all_compliant = compliant.all(axis=-1)
+    return {
+        'surrendered': surrendered,
+        'deficit': deficit,
+        'borrowed': borrowed,
+        'uncovered': uncovered,
+        'penalty': schedule.penalty * uncovered,
+        'make_good': make_good,
+        'banked': banked,
+        'next_permits': np.maximum(-shortfall, 0.0),
+        'owed': np.maximum(shortfall, 0.0),
+        'compliant': compliant,
+        'total': total,
+        'excess': np.maximum(total - cap, 0.0),
+        'all_compliant': all_compliant,
+        'outcome': outcome_class(total, cap, all_compliant),
+    }
+
+def over_periods(result: Dict[str, np.ndarray], total, cap, breaches: np.ndarray,
+                 penalties: np.ndarray) -> Dict[str, np.ndarray]:
+    """A finished multi-year game: the last true_up() result, judged over every period
+
+    total and cap are the market's emissions and caps summed over the
+    periods, breaches each firm's periods out of compliance and penalties
+    what it was charged. A firm is compliant only if covered every period.
+    """
+    compliant = np.asarray(breaches) == 0
+    all_compliant = compliant.all(axis=-1)
+    # [()] keeps one game's total a scalar, as true_up() returns it
+    total = np.asarray(total, dtype=np.float64)[()]
+    return dict(result, penalty=np.asarray(penalties, dtype=np.float64), compliant=compliant, total=total,
+                excess=np.maximum(total - cap, 0.0), all_compliant=all_compliant,
+                outcome=outcome_class(total, cap, all_compliant))
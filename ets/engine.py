@@ -0,0 +1,748 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from . import events as ev
+from . import state as encoding
+from .auction import AuctionResult, clear_uniform_price
+from .board import Board, default_board
+from .events import EventLog
+from .orderbook import BUY, SELL, OrderBook, Trade
+from .compliance import over_periods, true_up
+from .periods import SINGLE_PERIOD, PeriodSchedule
+from .pricing import PriceModel, SUPPLY_CURVES
+from .rng import Dice, game_generator, new_seed
+from .roster import Roster
+from .rules import (
+    COLORS, PERMIT_PRICE, PRODUCE_PRICE, DEFAULT_MARKET_CAP, MARKET_ALLOCATION_PERCENT, MAX_PERMIT_HOLDING_PERCENT,
+    Player, rint, money, industry_kinds, initial_allocation
+)
+from .strategy import Strategy
+
+PLAYER_COLORS = [COLORS['red'], COLORS['teal']]
+SIDES = [BUY, SELL]
+# Rolls between state snapshots, at least one per seat so that snapshot cost
+# per roll stays flat as tables grow; rewinding replays at most one interval
+SNAPSHOT_INTERVAL = 20
+
+class GameEngine:
+    """Headless game: all rules and state, no Streamlit"""
+
+    def __init__(self, market_cap: int = DEFAULT_MARKET_CAP, permit_price: float = PERMIT_PRICE,
+                 board: Optional[Board] = None, price_ceiling: Optional[float] = None,
+                 supply_curve: str = "flat", seed: Optional[int] = None, periods: Optional[PeriodSchedule] = None):
+        self.market_cap = market_cap
+        self.permit_price = permit_price
+        self.price_ceiling = price_ceiling
+        self.supply_curve = supply_curve
+        self.board = board or default_board()
+        self.periods = periods or SINGLE_PERIOD
+        # Players assigned without a seed of their own are dealt from this one
+        self.base_seed = seed
+        self.reset(seed)
+
+    def reset(self, seed: Optional[int] = None):
+        """Clear players and turn state, keeping the parameters
+
+        Every random draw of the game comes from seed (a fresh one if None),
+        so the same seed, settings and decisions replay the same game.
+        """
+        self.seed = new_seed() if seed is None else int(seed)
+        self.rng: np.random.Generator = game_generator(self.seed)
+        self.players: List[Player] = []
+        self.current_turn = 0
+        self.turns = 0
+        self.pricing = self._price_model(0)
+        self.game_started = False
+        self.game_over = False
+        self.pending_investment: Optional[Dict] = None
+        self.last_roll: Optional[int] = None
+        self.events: Optional[EventLog] = EventLog()
+        self.roll_again_required = False
+        self.roll_was_too_high = False
+
+        # Compliance period under way, whether all its firms have finished and
+        # wait for the true-up, and one summary per period trued up
+        self.period = 0
+        self.true_up_due = False
+        self.history: List[Dict] = []
+        # Turns taken before the period began; its auction closes with its first roll
+        self.period_start_turn = 0
+
+        # Ring of unfinished seats as next/prev links, so turns and finishes are O(1)
+        self._next: List[int] = []
+        self._prev: List[int] = []
+        self.active_count = 0
+
+        # Sealed bid curves for the GO auction, by seat
+        self.bids: Dict[int, List[Tuple[float, int]]] = {}
+        self.auction_result: Optional[AuctionResult] = None
+
+        # Firm-to-firm trading; open orders reserve cash and permits
+        self.book = OrderBook(on_trade=self._settle_trade)
+
+    def assign_players(self, names: List[str], kinds: Optional[List[Dict]] = None, seed: Optional[int] = None):
+        """Create the players; a shuffled Large/Small mix unless kinds are given
+
+        Without a seed the game is dealt from the engine's own, if it was
+        built with one.
+        """
+        self.reset(self.base_seed if seed is None else seed)
+        if kinds is None:
+            mix = industry_kinds(len(names))
+            kinds = [mix[j] for j in self.rng.permutation(len(mix))]
+
+        allocations = initial_allocation([k["pollution"] for k in kinds], self.market_cap)
+        for i, name in enumerate(names):
+            player = Player(name, kinds[i], PLAYER_COLORS[i % len(PLAYER_COLORS)], allocations[i],
+                            dice=Dice(self.seed, i))
+            self.players.append(player)
+
+        self._init_ring()
+
+    def assign_roster(self, roster: Roster, method: str = "grandfathering", seed: Optional[int] = None):
+        """Create one player per roster firm, allocated in a single columnar pass"""
+        self.reset(self.base_seed if seed is None else seed)
+        allocation = roster.allocate(self.market_cap, method)
+        initial_permits = allocation['initial_permits'].tolist()
+        sectors = roster.sectors.tolist()
+        for i, name in enumerate(roster.names.tolist()):
+            player = Player(name, roster.kind(i), PLAYER_COLORS[i % len(PLAYER_COLORS)],
+                            initial_permits[i], kind_name=sectors[i], dice=Dice(self.seed, i))
+            self.players.append(player)
+        self._init_ring()
+
+    def _init_ring(self):
+        self._link_ring()
+        self.pricing = self._price_model(rint(self.market_cap * (MARKET_ALLOCATION_PERCENT / 100)))
+        self._snapshot()
+
+    def _link_ring(self):
+        n = len(self.players)
+        self._next = [(i + 1) % n for i in range(n)]
+        self._prev = [(i - 1) % n for i in range(n)]
+        self.active_count = n
+
+    def _price_model(self, supply: int) -> PriceModel:
+        return PriceModel(supply, self.permit_price, self.price_ceiling, self.supply_curve,
+                          banking=self.periods.banking)
+
+    @property
+    def cap(self) -> int:
+        """The current period's cap; market_cap in a single-period game"""
+        return self.periods.cap(self.market_cap, self.period)
+
+    def configure_pricing(self, floor: float, ceiling: Optional[float] = None, curve: str = "flat"):
+        """Change the pool's floor, ceiling and supply curve; the price updates in place"""
+        if (floor, ceiling, curve) == (self.permit_price, self.price_ceiling, self.supply_curve):
+            return
+        if self.players:
+            self._emit(ev.PRICING, -1, floor, ceiling if ceiling is not None else np.nan,
+                       SUPPLY_CURVES.index(curve))
+        self.permit_price = floor
+        self.price_ceiling = ceiling
+        self.supply_curve = curve
+        self.pricing.configure(floor, ceiling, curve, banking=self.periods.banking)
+
+    @property
+    def market_permits(self) -> int:
+        return self.pricing.remaining
+
+    @property
+    def current_price(self) -> float:
+        """Pool price for the next permit"""
+        return self.pricing.price
+
+    @property
+    def auction_open(self) -> bool:
+        """Whether the period's pool is up for auction: on GO, before its first roll"""
+        return (bool(self.players) and self.auction_result is None and not self.game_over
+                and not self.true_up_due and self.turns == self.period_start_turn)
+
+    def _uncovered_bid(self, player_idx: int, curve: List[Tuple[float, int]]) -> Optional[str]:
+        """Why a player could not pay for this bid curve in full, or None if it can"""
+        player = self.players[player_idx]
+        room = player.max_permits - player.permits
+        if sum(qty for _, qty in curve) > room:
+            return f"{player.name} can hold at most {room:,} more permits"
+        # Worst case every step clears at its own price
+        cash = self.available_cash(player_idx)
+        if sum(price * qty for price, qty in curve) > cash:
+            return f"{player.name} cannot cover these bids with {money(cash)}"
+        return None
+
+    def submit_bids(self, player_idx: int, curve: List[Tuple[float, int]]):
+        """Replace a player's sealed bid curve for this period's GO auction"""
+        if self.auction_result is not None:
+            raise ValueError("The auction has already been held")
+        if not self.auction_open:
+            raise ValueError("The auction closed with the period's first roll")
+        if any(price < 0 or qty < 0 for price, qty in curve):
+            raise ValueError("Bid prices and quantities must not be negative")
+        error = self._uncovered_bid(player_idx, curve)
+        if error:
+            raise ValueError(error)
+        self.bids[player_idx] = list(curve)
+        if not curve:
+            self._emit(ev.BID, player_idx, c=-1)
+        for step, (price, qty) in enumerate(curve):
+            self._emit(ev.BID, player_idx, price, qty, step)
+
+    def run_auction(self, rng=None) -> AuctionResult:
+        """Clear the sealed bids against the market pool at a uniform price
+
+        Held once a period, on GO before its first roll. The floor permit
+        price is the reserve. Unsold permits stay in the pool. Cash and
+        holding room are checked again here, as trades and pool purchases
+        since a bid may have used them up: a curve its bidder can no longer
+        cover in full is left out. Ties at the clearing price are broken
+        with the game's seeded stream unless another rng is given.
+        """
+        if self.auction_result is not None:
+            raise ValueError("The auction has already been held")
+        if not self.auction_open:
+            raise ValueError("The auction closed with the period's first roll")
+        steps = [(i, price, qty) for i, curve in self.bids.items() if self._uncovered_bid(i, curve) is None
+                 for price, qty in curve]
+        bidders, prices, quantities = zip(*steps) if steps else ((), (), ())
+        result = clear_uniform_price(bidders, prices, quantities, self.market_permits, self.permit_price,
+                                     rng if rng is not None else self.rng)
+
+        won = result.by_bidder(len(self.players)).tolist()
+        for player, qty in zip(self.players, won):
+            if qty:
+                cost = qty * result.clearing_price
+                player.earnings -= cost
+                player.permit_cost += cost
+                player.total_cost += cost
+                player.permits += qty
+        self.pricing.sell(result.sold)
+        self.auction_result = result
+        self._emit(ev.AUCTION, -1, result.clearing_price, result.sold)
+        return result
+
+    def start(self):
+        self._emit(ev.START)
+        self.game_started = True
+        self.current_turn = 0
+
+    @property
+    def current_player(self) -> Player:
+        return self.players[self.current_turn]
+
+    def _advance_turn(self):
+        self.current_turn = self._next[self.current_turn]
+
+    def _retire(self, seat: int):
+        """Unlink a finished seat from the turn ring"""
+        prev, nxt = self._prev[seat], self._next[seat]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+        self.active_count -= 1
+
+    def _apply_tile(self, player_idx: int):
+        player = self.players[player_idx]
+        offer = self.board.apply(player, player.position)
+        if offer is not None:
+            self.pending_investment = dict(offer, player=player_idx)
+
+    def roll(self, value: Optional[int] = None) -> int:
+        """Roll for the current player (or use the given value) and resolve the move"""
+        if self.game_over:
+            raise ValueError("The game is over")
+        if not self.game_started:
+            raise ValueError("The game has not started")
+        if self.true_up_due:
+            raise ValueError(f"Period {self.period + 1} is waiting for its true-up")
+        if self.pending_investment is not None:
+            raise ValueError(f"{self.players[self.pending_investment['player']].name} "
+                             f"must first decide on the investment offer")
+        if self.turns and self.turns % max(SNAPSHOT_INTERVAL, len(self.players)) == 0:
+            self._snapshot()
+        current_player = self.current_player
+        roll = current_player.roll() if value is None else value
+        self._emit(ev.ROLL, self.current_turn, roll, value is None)
+        self.turns += 1
+        self.last_roll = roll
+
+        # Calculate potential new position
+        old_pos = current_player.position
+        potential_new_pos = current_player.position + roll
+
+        n_tiles = self.board.n_tiles
+
+        # Check if player would go past the final tile or reach/exceed GO (0) after starting
+        if old_pos > 0 and potential_new_pos >= n_tiles:
+            # Player would complete the circuit or go beyond
+            if potential_new_pos == n_tiles:
+                # Exactly reaches GO - game ends for this player (GO carries no tile effects)
+                current_player.position = 0  # Set to GO
+                current_player.finished = True
+                # Finished firms leave the market
+                self.book.cancel_owner(self.current_turn)
+
+                self._emit(ev.FINISH, self.current_turn, roll)
+
+                self._retire(self.current_turn)
+
+                # Check if all players have finished; a multi-year game waits for the
+                # true-up, so the last firm home can still buy permits first
+                if self.active_count == 0 and self.periods.multi:
+                    self.true_up_due = True
+                elif self.active_count == 0:
+                    self.game_over = True
+                    self._emit(ev.GAME_OVER)
+                else:
+                    self._advance_turn()
+
+            else:
+                # Roll was too high - player must roll again
+                self.roll_again_required = True
+                self.roll_was_too_high = True
+                self._emit(ev.MOVE, self.current_turn, old_pos, old_pos, roll)
+                return roll  # Don't advance turn
+
+        else:
+            # Normal move within the board
+            current_player.position = potential_new_pos
+
+            # Apply tile effect
+            self._apply_tile(self.current_turn)
+
+            # Normalize values
+            current_player.produce = float(rint(current_player.produce))
+            current_player.pollution = float(rint(current_player.pollution))
+
+            # Log the move
+            self._emit(ev.MOVE, self.current_turn, old_pos, current_player.position, roll)
+            self._emit(ev.EFFECT, self.current_turn, current_player.position,
+                       current_player.pollution, current_player.earnings)
+
+            # Reset roll again flags
+            self.roll_again_required = False
+            self.roll_was_too_high = False
+
+            # Next turn (only if game isn't over)
+            if not self.game_over:
+                self._advance_turn()
+
+        return roll
+
+    def close_period(self) -> bool:
+        """True up every firm once all have finished the period; returns True if another period opened
+
+        Runs once per period over all firms at once, and the next period
+        starts from the state this one left, so a long game costs the same
+        per period as a short one. After the last period the game is over.
+        """
+        if not self.true_up_due:
+            raise ValueError("Every firm must finish the period before the true-up")
+        schedule = self.periods
+        players = self.players
+        next_allocation = np.rint(self.column('initial_permits') * schedule.factor(self.period + 1))
+        result = true_up(self.column('pollution'), self.column('permits'), self.cap, schedule, next_allocation,
+                         self.column('owed'))
+        for p, penalty, compliant, borrowed, owed in zip(players, result['penalty'].tolist(),
+                                                         result['compliant'].tolist(), result['borrowed'].tolist(),
+                                                         result['owed'].tolist()):
+            p.earnings -= penalty
+            p.total_cost += penalty
+            p.penalties += penalty
+            p.breaches += not compliant
+            p.borrowed = int(borrowed)
+            p.owed = int(owed)
+
+        self.history.append({
+            'period': self.period,
+            'cap': self.cap,
+            'emissions': float(result['total']),
+            **{key: float(result[key].sum()) for key in ('surrendered', 'banked', 'borrowed', 'uncovered',
+                                                         'make_good')},
+            'penalties': float(result['penalty'].sum()),
+            'outcome': int(result['outcome']),
+        })
+        # An input event: replaying it reruns the whole true-up
+        self._emit(ev.PERIOD, -1, self.period, result['total'], result['uncovered'].sum())
+        self.true_up_due = False
+        if self.period == schedule.n_periods - 1:
+            self.game_over = True
+            self._emit(ev.GAME_OVER)
+            return False
+
+        # Open the next period: a new allocation and a new year's sales, equipment kept
+        self.period += 1
+        for p, permits, allocation, banked in zip(players, result['next_permits'].tolist(), next_allocation.tolist(),
+                                                  result['banked'].tolist()):
+            p.permits = int(permits)
+            p.max_permits = rint(allocation * (MAX_PERMIT_HOLDING_PERCENT / 100)) + int(banked)
+            p.produce = p.revenue / PRODUCE_PRICE
+            p.pollution = float(rint(p.initial_pollution * p.abatement))
+            p.earnings += p.revenue
+            p.position = 0
+            p.finished = False
+        self._link_ring()
+        self.pricing.roll_over(rint(self.cap * (MARKET_ALLOCATION_PERCENT / 100)))
+        # The new year's pool goes to auction on GO again
+        self.bids = {}
+        self.auction_result = None
+        self.period_start_turn = self.turns
+        self.current_turn = 0
+        self.roll_again_required = False
+        self.roll_was_too_high = False
+        return True
+
+    def decide_investment(self, buy: bool) -> bool:
+        """Resolve the pending investment offer; returns True if equipment was bought"""
+        investment = self.pending_investment
+        if investment is None:
+            return False
+        self.pending_investment = None
+        seat = investment['player']
+        cost = investment['cost']
+        if not buy or self.available_cash(seat) < cost:
+            self._emit(ev.INVESTMENT, seat, buy, False, cost)
+            return False
+
+        player = self.players[seat]
+        player.earnings -= cost
+        player.total_cost += cost
+        player.pollution *= investment['multiplier']
+        player.abatement *= investment['multiplier']
+        self._emit(ev.INVESTMENT, seat, True, True, cost)
+        return True
+
+    def play_bots(self, bots: Dict[int, Strategy], rng: Optional[np.random.Generator] = None) -> int:
+        """Decide and roll for bot seats until a human must act or the game ends; returns the rolls made
+
+        A bot buys its permits from the pool as soon as it finishes. The batch
+        simulator serves seats in seat order instead, so the two agree unless
+        the pool runs short. Randomised strategies draw from rng, by default
+        the game's own stream.
+        """
+        rng = rng if rng is not None else self.rng
+        rolls = 0
+        while self.game_started and not self.game_over:
+            if self.true_up_due:
+                # A table of bots trues itself up; with any human seat the facilitator does
+                if len(bots) < len(self.players):
+                    break
+                self.close_period()
+                continue
+            investment = self.pending_investment
+            if investment is not None:
+                seat = investment['player']
+                if seat not in bots:
+                    break
+                player = self.players[seat]
+                # The firm's start: allocated permits and the whole first pool, as in the
+                # simulator, so a policy bot reuses one solved policy for the whole game
+                context = {'board': self.board, 'position': np.array([player.position]),
+                           'produce': np.array([player.produce]),
+                           'initial_produce': np.array([player.revenue / PRODUCE_PRICE]),
+                           'initial_pollution': np.array([player.initial_pollution]),
+                           'permits': np.array([float(player.initial_permits)]),
+                           'max_permits': np.array([float(rint(player.initial_permits
+                                                               * (MAX_PERMIT_HOLDING_PERCENT / 100)))]),
+                           'pool': np.array([float(rint(self.market_cap * (MARKET_ALLOCATION_PERCENT / 100)))]),
+                           'permit_price': np.array([self.permit_price])}
+                buy = bots[seat].invest(rng, np.array([investment['cost']]), np.array([investment['multiplier']]),
+                                        np.array([player.pollution]), np.array([self.available_cash(seat)]), context)
+                self.decide_investment(bool(buy[0]))
+                continue
+            seat = self.current_turn
+            if seat not in bots:
+                break
+            self.roll()
+            rolls += 1
+            player = self.players[seat]
+            if player.finished:
+                deficit = max(0.0, np.ceil(player.pollution - player.permits))
+                wanted = bots[seat].buy(rng, np.array([deficit]), np.array([self.current_price]),
+                                        np.array([self.available_cash(seat)]))
+                qty = min(int(wanted[0]), self.max_buyable(seat))
+                if qty > 0:
+                    # The last firm to finish a single-period game ends it, so it buys past game over
+                    self._buy_permits(seat, qty)
+        return rolls
+
+    def available_cash(self, player_idx: int) -> float:
+        """Earnings not reserved by open buy orders"""
+        return self.players[player_idx].earnings - self.book.open_buy_value[player_idx]
+
+    def holding_room(self, player_idx: int) -> int:
+        """Permits a player may still acquire, counting open buy orders"""
+        player = self.players[player_idx]
+        return player.max_permits - player.permits - self.book.open_buy_qty[player_idx]
+
+    def max_buyable(self, player_idx: int) -> int:
+        """Largest permit purchase allowed by pool, holding limit and cash"""
+        cash = self.available_cash(player_idx)
+        max_affordable = self.pricing.max_affordable(cash)
+        max_by_limit = self.holding_room(player_idx)
+        return max(0, min(self.market_permits, max_by_limit, max_affordable))
+
+    def buy_permits(self, player_idx: int, qty: int) -> float:
+        """Buy permits from the regulator pool along its supply curve; returns the cost"""
+        if self.game_over:
+            raise ValueError("The game is over")
+        return self._buy_permits(player_idx, qty)
+
+    def _buy_permits(self, player_idx: int, qty: int) -> float:
+        if qty <= 0:
+            return 0.0
+        if qty > self.max_buyable(player_idx):
+            raise ValueError(f"Cannot buy {qty} permits")
+
+        player = self.players[player_idx]
+        cost = self.pricing.quote(qty)
+        player.earnings -= cost
+        player.permit_cost += cost
+        player.total_cost += cost
+        player.permits += qty
+        self.pricing.sell(qty)
+        self._emit(ev.PURCHASE, player_idx, qty, cost)
+        return cost
+
+    def place_order(self, player_idx: int, side: str, price: float, qty: int) -> Tuple[int, List[Trade]]:
+        """Send a limit order to the firm-to-firm book; returns (order id, fills)"""
+        player = self.players[player_idx]
+        if player.finished or self.game_over:
+            raise ValueError(f"{player.name} can no longer trade")
+        if side not in SIDES:
+            raise ValueError(f"Unknown side {side!r}")
+        if qty <= 0 or price <= 0:
+            raise ValueError("Orders need a positive price and quantity")
+        if side == BUY:
+            if qty > self.holding_room(player_idx):
+                raise ValueError(f"{player.name} can hold at most {self.holding_room(player_idx):,} more permits")
+            if price * qty > self.available_cash(player_idx):
+                raise ValueError(f"{player.name} cannot cover {money(price * qty)}")
+        elif qty > player.permits - self.book.open_sell_qty[player_idx]:
+            raise ValueError(f"{player.name} only has {player.permits - self.book.open_sell_qty[player_idx]:,} permits to sell")
+        # Logged before matching, so the fills it causes follow it
+        self._emit(ev.ORDER, player_idx, price, qty, SIDES.index(side))
+        return self.book.submit(player_idx, side, price, qty)
+
+    def cancel_order(self, order_id: int) -> bool:
+        if order_id not in self.book.orders:
+            return False
+        self._emit(ev.CANCEL, -1, order_id)
+        return self.book.cancel(order_id)
+
+    def _settle_trade(self, trade: Trade):
+        """Move cash and permits for one fill; both sides change together"""
+        value = trade.qty * trade.price
+        buyer, seller = self.players[trade.buyer], self.players[trade.seller]
+        buyer.earnings -= value
+        buyer.permit_cost += value
+        buyer.total_cost += value
+        buyer.permits += trade.qty
+        seller.earnings += value
+        seller.permit_cost -= value
+        seller.total_cost -= value
+        seller.permits -= trade.qty
+        self._emit(ev.TRADE, trade.buyer, trade.price, trade.qty, trade.seller)
+
+    # Event log, snapshots and rewind
+
+    def _emit(self, kind: int, seat: int = -1, a: float = 0.0, b: float = 0.0, c: float = 0.0):
+        if self.events is not None:
+            self.events.append(self.turns, kind, seat, a, b, c)
+
+    def to_bytes(self, include_events: bool = True) -> bytes:
+        """Compact binary copy of the game, without the board (see ets.state)"""
+        return encoding.encode(self, include_events)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, board: Optional[Board] = None) -> "GameEngine":
+        return encoding.decode(blob, board)
+
+    def _dump_state(self) -> bytes:
+        """Everything but the board and the log itself"""
+        return self.to_bytes(include_events=False)
+
+    def _load_state(self, blob: bytes):
+        engine = encoding.decode(blob, self.board)
+        self.__dict__.update({k: v for k, v in engine.__dict__.items() if k not in ('board', 'events')})
+        self.book.on_trade = self._settle_trade
+
+    def _snapshot(self):
+        if self.events is not None:
+            self.events.add_snapshot(self.events.count, self._dump_state())
+
+    def _replay(self, event):
+        """Re-apply one player action to this engine"""
+        kind, seat, a, b, c = int(event['kind']), int(event['seat']), event['a'], event['b'], event['c']
+        if kind == ev.START:
+            self.start()
+        elif kind == ev.ROLL:
+            self.roll(None if b else int(a))
+        elif kind == ev.INVESTMENT:
+            self.decide_investment(bool(a))
+        elif kind == ev.PURCHASE:
+            self._buy_permits(seat, int(a))
+        elif kind == ev.ORDER:
+            self.book.submit(seat, SIDES[int(c)], float(a), int(b))
+        elif kind == ev.CANCEL:
+            self.book.cancel(int(a))
+        elif kind == ev.BID:
+            # Steps arrive in order; step 0 (or -1 for none) starts a new curve
+            steps = [] if c <= 0 else self.bids[seat]
+            if c >= 0:
+                steps.append((float(a), int(b)))
+            self.bids[seat] = steps
+        elif kind == ev.AUCTION:
+            self.run_auction()
+        elif kind == ev.PRICING:
+            self.configure_pricing(float(a), None if np.isnan(b) else float(b), SUPPLY_CURVES[int(c)])
+        elif kind == ev.PERIOD:
+            self.close_period()
+
+    def state_at(self, seq: int) -> "GameEngine":
+        """A detached copy of the game as it stood before event seq
+
+        Loads the nearest earlier snapshot and replays only the actions
+        logged since, so the cost does not grow with the length of the game.
+        """
+        snap_seq, blob = self.events.nearest_snapshot(seq)
+        engine = GameEngine.__new__(GameEngine)
+        engine.board = self.board
+        engine.events = None
+        engine._load_state(blob)
+        for event in self.events.slice(snap_seq, seq):
+            if event['kind'] in ev.INPUT_KINDS:
+                engine._replay(event)
+        return engine
+
+    def state_at_turn(self, turn: int) -> "GameEngine":
+        return self.state_at(self.events.seq_of_turn(turn))
+
+    def rewind(self, seq: int):
+        """Return to the state before event seq and drop the events after it"""
+        engine = self.state_at(seq)
+        self.__dict__.update({k: v for k, v in engine.__dict__.items() if k not in ('board', 'events')})
+        self.book.on_trade = self._settle_trade
+        self.events.truncate(seq)
+
+    def undo(self) -> bool:
+        """Take back the last player action; returns False if there is none"""
+        start = max(0, self.events.count - 4 * SNAPSHOT_INTERVAL)
+        while True:
+            recent = self.events.slice(start)
+            actions = recent['seq'][np.isin(recent['kind'], list(ev.INPUT_KINDS))]
+            if actions.size or start == 0:
+                break
+            start = max(0, start - 4 * SNAPSHOT_INTERVAL)
+        if not actions.size:
+            return False
+        self.rewind(int(actions[-1]))
+        return True
+
+    def describe(self, event) -> Optional[str]:
+        """One log line for an event, or None for events the log does not show"""
+        kind, seat = int(event['kind']), int(event['seat'])
+        name = self.players[seat].name if 0 <= seat < len(self.players) else ""
+        a, b, c = event['a'], event['b'], event['c']
+        if kind == ev.MOVE:
+            if a == b:
+                return f"{name} rolled {int(c)} but needs exactly {self.board.n_tiles - int(a)} to reach GO. Must roll again!"
+            tile_name = self.board.tiles[int(b)]["text"].split('\n')[0]
+            return f"{name} rolled {int(c)} and moved to {tile_name}"
+        if kind == ev.FINISH:
+            return f"{name} rolled {int(a)} and completed the round at GO/True-up!"
+        if kind == ev.PERIOD:
+            return (f"Period {int(a) + 1} trued up: {rint(b):,} kg emitted"
+                    + (f", {rint(c):,} kg uncovered" if c else ", every firm covered"))
+        if kind == ev.GAME_OVER:
+            return "All players have completed the round! Game Over!"
+        if kind == ev.INVESTMENT:
+            if b:
+                return f"{name} invested {money(c)} in equipment"
+            if a:
+                return f"{name} could not afford {money(c)} of equipment"
+            return None
+        if kind == ev.PURCHASE:
+            return f"{name} bought {int(a):,} permits from the regulator for {money(b)}"
+        if kind == ev.TRADE:
+            return f"{name} bought {int(b):,} permits from {self.players[int(c)].name} at ₹{a:.2f}"
+        if kind == ev.AUCTION:
+            return f"Uniform auction cleared at ₹{a:.2f}: {int(b):,} permits sold"
+        return None
+
+    def recent_log(self, n: int = 5, before: Optional[int] = None) -> List[str]:
+        """The last n log lines, oldest first, from events before seq `before`"""
+        stop = self.events.count if before is None else before
+        lines: List[str] = []
+        window = 4 * n
+        while len(lines) < n and stop > 0:
+            chunk = self.events.slice(max(0, stop - window), stop)
+            for event in chunk[::-1]:
+                line = self.describe(event)
+                if line is not None:
+                    lines.append(line)
+                    if len(lines) == n:
+                        break
+            stop -= len(chunk)
+        return lines[::-1]
+
+    def column(self, field: str, dtype=np.float64) -> np.ndarray:
+        """One player attribute for every seat, as an array"""
+        return np.fromiter((getattr(p, field) for p in self.players), dtype, len(self.players))
+
+    def settlement(self) -> Dict[str, np.ndarray]:
+        """Every firm's compliance and the market's, settled in one pass (ets.compliance)
+
+        In a single-period game this is the true-up at GO of the permits
+        each firm holds. Once a multi-year game has trued up periods, the
+        firm results cover all of them: penalties charged, and compliant
+        only if covered in every period; the market compares emissions
+        with the caps summed over the periods.
+        """
+        result = true_up(self.column('pollution'), self.column('permits'), self.cap, self.periods)
+        if self.history:
+            result = over_periods(result, sum(h['emissions'] for h in self.history),
+                                  sum(h['cap'] for h in self.history), self.column('breaches', np.int64),
+                                  self.column('penalties'))
+        return result
+
+    def outcome(self) -> int:
+        """Final outcome as an index into OUTCOMES"""
+        return int(self.settlement()['outcome'])
+
+    def state(self) -> Dict:
+        """Plain-data snapshot of the game"""
+        return {
+            'market_cap': self.market_cap,
+            'permit_price': self.permit_price,
+            'market_permits': self.market_permits,
+            'current_price': self.current_price,
+            'auction_price': self.auction_result.clearing_price if self.auction_result else None,
+            'current_turn': self.current_turn,
+            'turns': self.turns,
+            'period': self.period,
+            'game_started': self.game_started,
+            'game_over': self.game_over,
+            'last_roll': self.last_roll,
+            'roll_again_required': self.roll_again_required,
+            'roll_was_too_high': self.roll_was_too_high,
+            'pending_investment': dict(self.pending_investment) if self.pending_investment else None,
+            'players': [
+                {
+                    'name': p.name,
+                    'kind': p.kind_name,
+                    'position': p.position,
+                    'produce': p.produce,
+                    'pollution': p.pollution,
+                    'permits': p.permits,
+                    'max_permits': p.max_permits,
+                    'revenue': p.revenue,
+                    'earnings': p.earnings,
+                    'total_cost': p.total_cost,
+                    'permit_cost': p.permit_cost,
+                    'owed': p.owed,
+                    'penalties': p.penalties,
+                    'breaches': p.breaches,
+                    'finished': p.finished,
+                }
+                for p in self.players
+            ],
+        }
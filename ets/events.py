@@ -0,0 +1,233 @@
+"""Typed, append-only game event log with snapshots
+
+Each event is one fixed-size record (EVENT_DTYPE): sequence number, turn
+(rolls taken so far), kind, seat and three numeric fields whose meaning
+depends on the kind:
+
+    kind        seat      a            b              c
+    START       -
+    ROLL        roller    value        1 if dice      -
+    MOVE        roller    from tile    to tile        roll
+    EFFECT      roller    tile         pollution      earnings
+    FINISH      roller    roll
+    GAME_OVER   -
+    INVESTMENT  investor  1 if buy     1 if bought    cost
+    PURCHASE    buyer     qty          cost
+    ORDER       owner     price        qty            side code
+    CANCEL      -         order id
+    TRADE       buyer     price        qty            seller
+    BID         bidder    price        qty            step (-1 clears)
+    AUCTION     -         price        sold
+    PRICING     -         floor        ceiling        curve code
+    PERIOD      -         period       emissions      uncovered
+
+Player actions (INPUT_KINDS) are enough to rebuild the game from a state
+snapshot; the other kinds record what they caused. Recent events sit in a
+ring buffer and older ones spill to files, so memory per game stays
+bounded however long it runs. Snapshots are encoded engine state (ets.state), with
+all but the latest few spilled to disk the same way.
+
+Spilled files are written once and never changed, so freeze() can hand
+another thread a copy of the log that reads them while the game goes on.
+"""
+import bisect
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+
+(START, ROLL, MOVE, EFFECT, FINISH, GAME_OVER, INVESTMENT, PURCHASE, ORDER, CANCEL, TRADE, BID, AUCTION, PRICING,
+ PERIOD) = range(15)
+EVENT_NAMES = ["start", "roll", "move", "effect", "finish", "game_over", "investment", "purchase",
+               "order", "cancel", "trade", "bid", "auction", "pricing", "period"]
+INPUT_KINDS = frozenset([START, ROLL, INVESTMENT, PURCHASE, ORDER, CANCEL, BID, AUCTION, PRICING, PERIOD])
+
+EVENT_DTYPE = np.dtype([
+    ('seq', '<i8'), ('turn', '<i4'), ('kind', 'i1'), ('seat', '<i4'),
+    ('a', '<f8'), ('b', '<f8'), ('c', '<f8'),
+])
+
+RING_CAPACITY = 4096
+# The ring starts this small and doubles up to RING_CAPACITY as a game grows
+RING_START = 64
+MEMORY_SNAPSHOTS = 8
+
+class EventLog:
+    """Events in a ring buffer with an on-disk spill, plus state snapshots
+
+    capacity must be even; once the ring has grown to it and fills, its
+    older half is written to a spill file of its own.
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        self.capacity = capacity
+        self._ring = np.zeros(min(RING_START, capacity), dtype=EVENT_DTYPE)
+        self.count = 0
+        self.spilled = 0
+        # Spill file of each half-block on disk, in sequence order
+        self._chunks: List[str] = []
+        self._snapshot_seqs: List[int] = []
+        self._snapshots: Dict[int, Union[bytes, str]] = {}  # a file path once spilled
+        self._dir: Optional[str] = None
+        self._files = 0
+        # Set once a frozen copy may still read the spilled files
+        self._shared = False
+        self._source: Optional["EventLog"] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _spill_dir(self) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="ets-events-")
+            weakref.finalize(self, shutil.rmtree, self._dir, ignore_errors=True)
+        return self._dir
+
+    def _new_file(self, prefix: str) -> str:
+        # Never reused, so a frozen copy's files stay as it saw them
+        self._files += 1
+        return os.path.join(self._spill_dir(), f"{prefix}-{self._files}.bin")
+
+    def _discard(self, path: str):
+        if not self._shared:
+            os.remove(path)
+
+    def _make_room(self):
+        size = self._ring.size
+        if self.count - self.spilled < size:
+            return
+        if size < self.capacity:
+            # Nothing has spilled yet, so seqs 0..count-1 sit in order
+            ring = np.zeros(min(2 * size, self.capacity), dtype=EVENT_DTYPE)
+            ring[:self.count] = self._ring[:self.count]
+            self._ring = ring
+            return
+        half = self.capacity // 2
+        start = self.spilled % self.capacity
+        path = self._new_file("events")
+        self._ring[start:start + half].tofile(path)
+        self._chunks.append(path)
+        self.spilled += half
+
+    def append(self, turn: int, kind: int, seat: int = -1, a: float = 0.0, b: float = 0.0, c: float = 0.0) -> int:
+        self._make_room()
+        seq = self.count
+        self._ring[seq % self._ring.size] = (seq, turn, kind, seat, a, b, c)
+        self.count += 1
+        return seq
+
+    def extend(self, records: np.ndarray):
+        """Append already numbered records, e.g. from a saved game, as block copies into the ring"""
+        done = 0
+        while done < len(records):
+            self._make_room()
+            size = self._ring.size
+            start = self.count % size
+            # As many as fit before the ring is full or wraps round
+            n = min(len(records) - done, size - (self.count - self.spilled), size - start)
+            self._ring[start:start + n] = records[done:done + n]
+            self.count += n
+            done += n
+
+    def slice(self, start: int, stop: Optional[int] = None) -> np.ndarray:
+        """Events with start <= seq < stop, read from disk where spilled"""
+        stop = self.count if stop is None else min(stop, self.count)
+        start = max(0, start)
+        if start >= stop:
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        parts = []
+        half = self.capacity // 2
+        while start < min(stop, self.spilled):
+            chunk, offset = divmod(start, half)
+            n = min(stop, self.spilled, (chunk + 1) * half) - start
+            parts.append(np.fromfile(self._chunks[chunk], dtype=EVENT_DTYPE, count=n,
+                                     offset=offset * EVENT_DTYPE.itemsize))
+            start += n
+        if start < stop:
+            idx = np.arange(start, stop) % self._ring.size
+            parts.append(self._ring[idx])
+        return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def tail(self, n: int) -> np.ndarray:
+        return self.slice(self.count - n)
+
+    def seq_of_turn(self, turn: int) -> int:
+        """Sequence number at which the given turn begins"""
+        lo, hi = 0, self.count
+        # Turns never decrease along the log, so bisect without loading it all
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.slice(mid, mid + 1)['turn'][0] < turn:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def add_snapshot(self, seq: int, blob: bytes):
+        """Keep engine state as it was before event seq"""
+        if seq not in self._snapshots:
+            bisect.insort(self._snapshot_seqs, seq)
+        self._snapshots[seq] = blob
+        # Older snapshots move to disk
+        for old in self._snapshot_seqs[:-MEMORY_SNAPSHOTS]:
+            blob = self._snapshots.get(old)
+            if isinstance(blob, bytes):
+                path = self._new_file("snapshot")
+                with open(path, "wb") as f:
+                    f.write(blob)
+                self._snapshots[old] = path
+
+    def nearest_snapshot(self, seq: int) -> Tuple[int, bytes]:
+        """Latest snapshot taken at or before seq"""
+        i = bisect.bisect_right(self._snapshot_seqs, seq) - 1
+        if i < 0:
+            raise ValueError(f"No snapshot at or before event {seq}")
+        snap_seq = self._snapshot_seqs[i]
+        blob = self._snapshots[snap_seq]
+        if isinstance(blob, str):
+            with open(blob, "rb") as f:
+                blob = f.read()
+        return snap_seq, blob
+
+    def snapshots(self) -> List[Tuple[int, bytes]]:
+        """Every snapshot as (seq, blob), oldest first"""
+        return [(seq, self.nearest_snapshot(seq)[1]) for seq in self._snapshot_seqs]
+
+    def truncate(self, seq: int):
+        """Drop every event from seq on, and snapshots taken after it"""
+        if seq >= self.count:
+            return
+        if seq < self.spilled:
+            # Pull the spilled half-block holding seq back into the ring
+            half = self.capacity // 2
+            keep = (seq // half) * half
+            back = self.slice(keep, seq)
+            self._ring[np.arange(keep, seq) % self.capacity] = back
+            for path in self._chunks[keep // half:]:
+                self._discard(path)
+            del self._chunks[keep // half:]
+            self.spilled = keep
+        self.count = seq
+        while self._snapshot_seqs and self._snapshot_seqs[-1] > seq:
+            blob = self._snapshots.pop(self._snapshot_seqs.pop())
+            if isinstance(blob, str):
+                self._discard(blob)
+
+    def freeze(self) -> "EventLog":
+        """A read-only copy of the log as it stands, safe to read on another thread
+
+        Only the ring is copied; spilled events and snapshots are read from
+        the same files, which this log then stops deleting.
+        """
+        frozen = EventLog.__new__(EventLog)
+        frozen.__dict__.update(self.__dict__)
+        frozen._ring = self._ring.copy()
+        frozen._chunks = list(self._chunks)
+        frozen._snapshot_seqs = list(self._snapshot_seqs)
+        frozen._snapshots = dict(self._snapshots)
+        # Keeps the spill directory alive for as long as the copy is
+        frozen._source = self
+        self._shared = True
+        return frozen
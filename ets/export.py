@@ -0,0 +1,186 @@
+"""Typed columnar export of game and simulation results to Arrow/Parquet
+
+Every number stays a number: pollution and earnings as float64, permits
+as int64, kinds and outcomes as dictionary-encoded strings. Tables are
+long, one row per firm, with the game's id and settings repeated on each
+row so a single file loads straight into a notebook.
+
+    single game       game_table(engine)
+    archived games    write_archive(archive, path, ...)
+    batch simulation  write_simulation(results, path)
+
+Large outputs are written one row group at a time with
+pyarrow.parquet.ParquetWriter, so memory stays at one chunk however many
+games there are. pyarrow (in requirements.txt) is imported on first use.
+"""
+import numpy as np
+from typing import Iterable, List, Optional, Sequence, Union
+
+from .rules import OUTCOMES
+
+# Archived games read from SQLite per row group
+ARCHIVE_BATCH = 1024
+FIRM_FIELDS = ('produce', 'pollution', 'permits', 'earnings', 'total_cost', 'permit_cost')
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet/Arrow export needs pyarrow: pip install pyarrow")
+    return pa, pq
+
+def _dictionary(pa, codes: np.ndarray, names: Sequence[str]):
+    return pa.DictionaryArray.from_arrays(pa.array(codes.astype(np.int32)), pa.array(list(names), pa.string()))
+
+def firm_schema():
+    pa, _ = _pyarrow()
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('game', pa.int64()), ('seed', pa.int64()), ('market_cap', pa.int64()), ('permit_price', pa.float64()),
+        ('outcome', label), ('seat', pa.int32()), ('name', pa.string()), ('kind', label),
+        ('produce', pa.float64()), ('pollution', pa.float64()), ('permits', pa.int64()),
+        ('earnings', pa.float64()), ('total_cost', pa.float64()), ('permit_cost', pa.float64()),
+        ('deficit', pa.float64()), ('compliant', pa.bool_()), ('penalty', pa.float64()),
+    ])
+
+def simulation_schema(kind_names: Sequence[str]):
+    pa, _ = _pyarrow()
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('game', pa.int64()), ('market_cap', pa.int64()), ('permit_price', pa.float64()), ('outcome', label),
+        ('seat', pa.int32()), ('kind', label), ('produce', pa.float64()), ('pollution', pa.float64()),
+        ('permits', pa.int64()), ('earnings', pa.float64()), ('rolls', pa.int64()), ('compliant', pa.bool_()),
+        ('penalties', pa.float64()),
+    ], metadata={b'kind_names': ",".join(kind_names).encode()})
+
+def _firm_rows(game, seed, market_cap, permit_price, outcome, names: List[str], kinds: List[str], columns: dict):
+    """Firm rows as a firm_schema table; the game columns are scalars or one value per row
+
+    Deficit, compliance and penalty come settled (ets.compliance) in columns.
+    """
+    pa, _ = _pyarrow()
+    n = len(names)
+    kind_names = list(dict.fromkeys(kinds))
+    kind_codes = {k: i for i, k in enumerate(kind_names)}
+    return pa.table({
+        'game': np.broadcast_to(np.asarray(game, dtype=np.int64), n),
+        'seed': np.broadcast_to(np.asarray(seed, dtype=np.int64), n),
+        'market_cap': np.broadcast_to(np.asarray(market_cap, dtype=np.int64), n),
+        'permit_price': np.broadcast_to(np.asarray(permit_price, dtype=np.float64), n),
+        'outcome': _dictionary(pa, np.broadcast_to(np.asarray(outcome), n), OUTCOMES),
+        'seat': np.asarray(columns['seat'], dtype=np.int32),
+        'name': pa.array(names, pa.string()),
+        'kind': _dictionary(pa, np.array([kind_codes[k] for k in kinds], dtype=np.int32), kind_names),
+        'produce': np.asarray(columns['produce'], dtype=np.float64),
+        'pollution': np.asarray(columns['pollution'], dtype=np.float64),
+        'permits': np.asarray(columns['permits'], dtype=np.int64),
+        'earnings': np.asarray(columns['earnings'], dtype=np.float64),
+        'total_cost': np.asarray(columns['total_cost'], dtype=np.float64),
+        'permit_cost': np.asarray(columns['permit_cost'], dtype=np.float64),
+        'deficit': np.asarray(columns['deficit'], dtype=np.float64),
+        'compliant': np.asarray(columns['compliant'], dtype=bool),
+        'penalty': np.asarray(columns['penalty'], dtype=np.float64),
+    }, schema=firm_schema())
+
+def game_table(engine, game: int = 0):
+    """Final per-firm results of one interactive game"""
+    players = engine.players
+    settlement = engine.settlement()
+    columns = {field: [getattr(p, field) for p in players] for field in FIRM_FIELDS}
+    columns.update(seat=range(len(players)), deficit=settlement['deficit'], compliant=settlement['compliant'],
+                   penalty=settlement['penalty'])
+    return _firm_rows(game, engine.seed, engine.market_cap, engine.permit_price, int(settlement['outcome']),
+                      [p.name for p in players], [p.kind_name or "" for p in players], columns)
+
+def events_table(engine):
+    """The game's event log, one typed row per event"""
+    from .events import EVENT_NAMES
+
+    pa, _ = _pyarrow()
+    events = engine.events.slice(0)
+    return pa.table({
+        'seq': events['seq'], 'turn': events['turn'],
+        'kind': _dictionary(pa, events['kind'], EVENT_NAMES),
+        'seat': events['seat'], 'a': events['a'], 'b': events['b'], 'c': events['c'],
+    })
+
+def simulation_table(result, first_game: int = 0):
+    """A SimulationResult as one row per firm; games are numbered from first_game"""
+    pa, _ = _pyarrow()
+    n_games, n_firms = result.pollution.shape
+    size = n_games * n_firms
+    return pa.table({
+        'game': np.repeat(np.arange(first_game, first_game + n_games, dtype=np.int64), n_firms),
+        'market_cap': np.full(size, result.market_cap, dtype=np.int64),
+        'permit_price': np.full(size, result.permit_price, dtype=np.float64),
+        'outcome': _dictionary(pa, np.repeat(result.outcome, n_firms), OUTCOMES),
+        'seat': np.tile(np.arange(n_firms, dtype=np.int32), n_games),
+        'kind': _dictionary(pa, result.kinds.reshape(-1), result.kind_names),
+        'produce': result.produce.reshape(-1).astype(np.float64),
+        'pollution': result.pollution.reshape(-1).astype(np.float64),
+        'permits': result.permits.reshape(-1).astype(np.int64),
+        'earnings': result.earnings.reshape(-1).astype(np.float64),
+        'rolls': result.rolls.reshape(-1).astype(np.int64),
+        'compliant': result.compliant.reshape(-1),
+        'penalties': result.settlement['penalty'].reshape(-1).astype(np.float64),
+    }, schema=simulation_schema(result.kind_names))
+
+def write_table(table, path):
+    """Write one table to Parquet"""
+    _, pq = _pyarrow()
+    pq.write_table(table, path)
+
+def to_parquet_bytes(table) -> bytes:
+    """A table as an in-memory Parquet file, e.g. for a download button"""
+    pa, pq = _pyarrow()
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+def write_simulation(results: Union["SimulationResult", Iterable["SimulationResult"]], path) -> int:
+    """Stream simulation output to Parquet, one row group per chunk; returns the games written
+
+    Pass simulate_games() output, or iter_simulations() to generate and
+    write chunk by chunk without holding the whole batch.
+    """
+    from .simulate import SimulationResult
+
+    _, pq = _pyarrow()
+    if isinstance(results, SimulationResult):
+        results = [results]
+    writer = None
+    games = 0
+    try:
+        for result in results:
+            table = simulation_table(result, games)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            games += result.n_games
+    finally:
+        if writer is not None:
+            writer.close()
+    return games
+
+def write_archive(archive, path, since: Optional[float] = None, until: Optional[float] = None,
+                  market_cap: Optional[int] = None, outcome: Optional[str] = None) -> int:
+    """Stream the firms of matching archived games to Parquet; returns the games written
+
+    Games are numbered by their archive id, so rows join back to the
+    archive's `games` table.
+    """
+    _, pq = _pyarrow()
+    games = archive.games(since, until, market_cap, outcome)
+    with pq.ParquetWriter(path, firm_schema()) as writer:
+        for start in range(0, len(games), ARCHIVE_BATCH):
+            batch = {g['id']: g for g in games[start:start + ARCHIVE_BATCH]}
+            firms = archive.firms(list(batch))
+            owners = [batch[f['game_id']] for f in firms]
+            columns = {field: [f[field] for f in firms]
+                       for field in FIRM_FIELDS + ('seat', 'deficit', 'compliant', 'penalty')}
+            writer.write_table(_firm_rows(
+                [g['id'] for g in owners], [g['seed'] for g in owners], [g['market_cap'] for g in owners],
+                [g['permit_price'] for g in owners], [OUTCOMES.index(g['outcome']) for g in owners],
+                [f['name'] for f in firms], [f['kind'] or "" for f in firms], columns))
+    return len(games)
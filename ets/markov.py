@@ -0,0 +1,120 @@
+"""Exact analysis of the board as an absorbing Markov chain
+
+States 0..n_tiles-1 are board positions and state n_tiles is "finished at GO".
+A roll that overshoots GO leaves the firm where it is, so those re-rolls show
+up as self-loops in the transition matrix.
+"""
+import numpy as np
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .board import Board, default_board
+from .rules import LARGE, SMALL, PRODUCE_PRICE, TOTAL_TILES
+
+DIE_FACES = 6
+
+def transition_matrix(n_tiles: int = TOTAL_TILES) -> np.ndarray:
+    """One-roll transition matrix, shape (n_tiles + 1, n_tiles + 1)"""
+    if n_tiles <= DIE_FACES:
+        raise ValueError(f"Board needs more than {DIE_FACES} tiles, got {n_tiles}")
+
+    P = np.zeros((n_tiles + 1, n_tiles + 1))
+    for pos in range(n_tiles):
+        for roll in range(1, DIE_FACES + 1):
+            new_pos = pos + roll
+            if pos > 0 and new_pos == n_tiles:
+                P[pos, n_tiles] += 1 / DIE_FACES
+            elif pos > 0 and new_pos > n_tiles:
+                P[pos, pos] += 1 / DIE_FACES
+            else:
+                P[pos, new_pos] += 1 / DIE_FACES
+    P[n_tiles, n_tiles] = 1.0
+    return P
+
+def jump_matrix(n_tiles: int = TOTAL_TILES) -> np.ndarray:
+    """Transition matrix between landings, with the overshoot self-loops removed"""
+    P = transition_matrix(n_tiles)
+    stay = np.diag(P)[:n_tiles].copy()
+    J = P.copy()
+    J[np.arange(n_tiles), np.arange(n_tiles)] = 0.0
+    J[:n_tiles] /= (1 - stay)[:, None]
+    return J
+
+def expected_rolls(n_tiles: int = TOTAL_TILES) -> float:
+    """Expected rolls from the start until finishing, forced re-rolls included"""
+    Q = transition_matrix(n_tiles)[:n_tiles, :n_tiles]
+    steps = np.linalg.solve(np.eye(n_tiles) - Q, np.ones(n_tiles))
+    return float(steps[0])
+
+def visit_probabilities(n_tiles: int = TOTAL_TILES) -> np.ndarray:
+    """Probability of landing on each tile during the round; GO (index 0) is always 1"""
+    J = jump_matrix(n_tiles)[:n_tiles, :n_tiles]
+    start = np.zeros(n_tiles)
+    start[0] = 1.0
+    # Positions only increase between landings, so expected landings are probabilities
+    return np.linalg.solve((np.eye(n_tiles) - J).T, start)
+
+@lru_cache(maxsize=None)
+def pollution_multiplier_distribution(kind_name: str, invest: bool = False,
+                                      board: Optional[Board] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact distribution of final pollution / starting pollution for one firm type
+
+    With invest=True the firm buys every investment it can afford. Rounding
+    is applied after each move exactly as in the game. Returns (multipliers,
+    probabilities) sorted by multiplier.
+    """
+    kind = {"Large": LARGE, "Small": SMALL}[kind_name]
+    board = board or default_board()
+    tables = {k: v.tolist() for k, v in board.tables().items()}
+    n_tiles = board.n_tiles
+    J = jump_matrix(n_tiles)
+
+    # Firm state (produce, pollution, earnings) -> probability, per position
+    states = [defaultdict(float) for _ in range(n_tiles)]
+    start = (kind["produce"], kind["pollution"], kind["produce"] * PRODUCE_PRICE)
+    states[0][start] = 1.0
+    final: Dict[float, float] = defaultdict(float)
+
+    for pos in range(n_tiles):
+        targets = np.flatnonzero(J[pos])
+        for (produce, pollution, earnings), prob in states[pos].items():
+            for tile in targets:
+                p = prob * J[pos, tile]
+                if tile == n_tiles:
+                    final[pollution / kind["pollution"]] += p
+                    continue
+
+                factor = tables['produce_mult'][tile]
+                new_produce = produce * factor
+                new_pollution = pollution * (tables['pollution_mult'][tile] * factor)
+                new_earnings = earnings + (factor - 1) * produce * PRODUCE_PRICE
+                new_earnings -= tables['fixed_cost'][tile] + tables['unit_tax'][tile] * new_produce
+                new_produce = float(round(new_produce))
+                new_pollution = float(round(new_pollution))
+
+                cost = tables['offer_cost'][tile]
+                if invest and cost > 0 and new_earnings >= cost:
+                    new_earnings -= cost
+                    new_pollution *= tables['offer_mult'][tile]
+
+                states[tile][(new_produce, new_pollution, new_earnings)] += p
+
+    multipliers = np.array(sorted(final))
+    probs = np.array([final[m] for m in multipliers])
+    return multipliers, probs
+
+def solve(board: Optional[Board] = None, invest: bool = False) -> Dict:
+    """All exact board statistics in one dict"""
+    board = board or default_board()
+    result = {
+        'visit_probabilities': visit_probabilities(board.n_tiles),
+        'expected_rolls': expected_rolls(board.n_tiles),
+        'pollution_multiplier': {},
+    }
+    for kind_name in ("Large", "Small"):
+        values, probs = pollution_multiplier_distribution(kind_name, invest, board)
+        result['pollution_multiplier'][kind_name] = {
+            'values': values, 'probs': probs, 'mean': float(values @ probs),
+        }
+    return result
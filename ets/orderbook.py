@@ -0,0 +1,174 @@
+"""Continuous double-auction limit order book for firm-to-firm permit trades
+
+Bids and asks sit in two heaps keyed on (price, arrival sequence), giving
+price-time priority. Cancelled and filled orders are dropped from the order
+table at once and skipped lazily when they reach the top of a heap. Trades
+execute at the resting order's price.
+"""
+import heapq
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+BUY = "buy"
+SELL = "sell"
+
+class Order:
+    __slots__ = ('id', 'owner', 'side', 'price', 'qty', 'remaining')
+
+    def __init__(self, order_id: int, owner: int, side: str, price: float, qty: int):
+        self.id = order_id
+        self.owner = owner
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.remaining = qty
+
+class Trade(NamedTuple):
+    seq: int
+    price: float
+    qty: int
+    buyer: int
+    seller: int
+    buy_order: int
+    sell_order: int
+
+class OrderBook:
+    """Price-time priority matching with partial fills, cancels and a trade tape
+
+    on_trade is called once per fill, before the book moves on, so the owner
+    of the book can settle both sides of each trade together. Open exposure
+    per owner (buy quantity, buy value at limit prices, sell quantity) is
+    kept up to date so callers can reserve cash and permits cheaply.
+    """
+
+    def __init__(self, on_trade: Optional[Callable[[Trade], None]] = None, tape_size: int = 1000):
+        self.on_trade = on_trade
+        self.orders: Dict[int, Order] = {}
+        self.tape: Deque[Trade] = deque(maxlen=tape_size)
+        self._bids: List[Tuple[float, int]] = []  # (-price, order id)
+        self._asks: List[Tuple[float, int]] = []  # (price, order id)
+        self._next_id = 1
+        self._trade_seq = 0
+        self._stale = 0
+        self.open_buy_qty: Dict[int, int] = defaultdict(int)
+        self.open_buy_value: Dict[int, float] = defaultdict(float)
+        self.open_sell_qty: Dict[int, int] = defaultdict(int)
+
+    def _best(self, heap: List[Tuple[float, int]]) -> Optional[Order]:
+        while heap:
+            order = self.orders.get(heap[0][1])
+            if order is not None:
+                return order
+            heapq.heappop(heap)
+        return None
+
+    def best_bid(self) -> Optional[Order]:
+        return self._best(self._bids)
+
+    def best_ask(self) -> Optional[Order]:
+        return self._best(self._asks)
+
+    def _reduce(self, order: Order, qty: int):
+        """Take qty off an open order's remaining size and its owner's exposure"""
+        order.remaining -= qty
+        if order.side == BUY:
+            self.open_buy_qty[order.owner] -= qty
+            self.open_buy_value[order.owner] -= qty * order.price
+        else:
+            self.open_sell_qty[order.owner] -= qty
+        if order.remaining == 0:
+            del self.orders[order.id]
+
+    def submit(self, owner: int, side: str, price: float, qty: int) -> Tuple[int, List[Trade]]:
+        """Match a limit order against the book and rest any remainder"""
+        if side not in (BUY, SELL):
+            raise ValueError(f"Unknown side {side!r}")
+        if qty <= 0 or price <= 0:
+            raise ValueError("Orders need a positive price and quantity")
+
+        order = Order(self._next_id, owner, side, price, qty)
+        self._next_id += 1
+        self.orders[order.id] = order
+        if side == BUY:
+            self.open_buy_qty[owner] += qty
+            self.open_buy_value[owner] += qty * price
+        else:
+            self.open_sell_qty[owner] += qty
+
+        trades = []
+        opposite = self._asks if side == BUY else self._bids
+        while order.remaining:
+            resting = self._best(opposite)
+            if resting is None:
+                break
+            if (side == BUY and resting.price > price) or (side == SELL and resting.price < price):
+                break
+            if resting.owner == owner:
+                # No self-trades: the older order gives way
+                self._reduce(resting, resting.remaining)
+                continue
+
+            qty_filled = min(order.remaining, resting.remaining)
+            buy, sell = (order, resting) if side == BUY else (resting, order)
+            self._trade_seq += 1
+            trade = Trade(self._trade_seq, resting.price, qty_filled, buy.owner, sell.owner, buy.id, sell.id)
+            self._reduce(order, qty_filled)
+            self._reduce(resting, qty_filled)
+            if self.on_trade is not None:
+                self.on_trade(trade)
+            self.tape.append(trade)
+            trades.append(trade)
+
+        if order.remaining:
+            heapq.heappush(self._bids if side == BUY else self._asks,
+                           (-price if side == BUY else price, order.id))
+        return order.id, trades
+
+    def restore(self, order: Order):
+        """Put a resting order back without matching, e.g. when loading a saved game"""
+        self.orders[order.id] = order
+        if order.side == BUY:
+            heapq.heappush(self._bids, (-order.price, order.id))
+            self.open_buy_qty[order.owner] += order.remaining
+            self.open_buy_value[order.owner] += order.remaining * order.price
+        else:
+            heapq.heappush(self._asks, (order.price, order.id))
+            self.open_sell_qty[order.owner] += order.remaining
+
+    def cancel(self, order_id: int) -> bool:
+        order = self.orders.get(order_id)
+        if order is None:
+            return False
+        self._reduce(order, order.remaining)
+        self._stale += 1
+        # Rebuild the heaps once cancelled entries outnumber live orders
+        if self._stale > 2 * len(self.orders) + 64:
+            self._bids = [e for e in self._bids if e[1] in self.orders]
+            self._asks = [e for e in self._asks if e[1] in self.orders]
+            heapq.heapify(self._bids)
+            heapq.heapify(self._asks)
+            self._stale = 0
+        return True
+
+    def cancel_owner(self, owner: int) -> int:
+        """Cancel every open order of one owner; returns how many"""
+        ids = [o.id for o in self.orders.values() if o.owner == owner]
+        for order_id in ids:
+            self.cancel(order_id)
+        return len(ids)
+
+    def open_orders(self, owner: int) -> List[Order]:
+        return [o for o in self.orders.values() if o.owner == owner]
+
+    def depth(self, levels: int = 5) -> Dict[str, List[Tuple[float, int]]]:
+        """Aggregated quantity at the best price levels on each side"""
+        result = {}
+        for side, heap in ((BUY, self._bids), (SELL, self._asks)):
+            by_price: Dict[float, int] = defaultdict(int)
+            for key, order_id in heap:
+                order = self.orders.get(order_id)
+                if order is not None:
+                    by_price[order.price] += order.remaining
+            best = sorted(by_price, reverse=(side == BUY))[:levels]
+            result[side] = [(price, by_price[price]) for price in best]
+        return result
@@ -0,0 +1,66 @@
+"""Multi-year games: compliance periods, cap tightening, banking and borrowing
+
+A game of n_periods periods plays one lap of the board per period. When
+the last firm reaches GO, the period is due for its true-up, which the
+facilitator runs (Engine.close_period); every firm is trued up and the
+next period opens from where the last left off:
+
+    cap             market_cap * (1 - cap_decline) ** period
+    allocation      each firm's first allocation, scaled the same way
+    true-up         permits are surrendered against the period's emissions
+    banking         with banking, unused permits (and unsold pool permits)
+                    carry over; without, they expire
+    borrowing       a deficit may be covered by borrowing up to borrow_limit
+                    of the next period's allocation, repaid out of it
+    penalty         whatever is still uncovered costs penalty per kg
+    make-good       optionally, uncovered kg also come off the next allocation
+    auction         each period's pool is auctioned on GO before its first roll
+
+Firms keep their cash and the equipment they bought; production and
+pollution restart each period from the firm's baseline, less its
+abatement, so tile events are one-year shocks. A one-period schedule is
+the classic single-lap game, which ends without a true-up step. The
+true-up itself is ets.compliance.true_up.
+"""
+from typing import Dict
+
+class PeriodSchedule:
+    """Settings of a multi-year game"""
+
+    def __init__(self, n_periods: int = 1, cap_decline: float = 0.0, banking: bool = True,
+                 borrow_limit: float = 0.0, penalty: float = 0.0, make_good: bool = False):
+        if n_periods < 1:
+            raise ValueError("A game needs at least one period")
+        if not 0 <= cap_decline < 1:
+            raise ValueError("cap_decline must be in [0, 1)")
+        if borrow_limit < 0 or penalty < 0:
+            raise ValueError("borrow_limit and penalty cannot be negative")
+        self.n_periods = int(n_periods)
+        self.cap_decline = float(cap_decline)
+        self.banking = bool(banking)
+        self.borrow_limit = float(borrow_limit)
+        self.penalty = float(penalty)
+        self.make_good = bool(make_good)
+
+    @property
+    def multi(self) -> bool:
+        return self.n_periods > 1
+
+    def factor(self, period: int) -> float:
+        """Cap and allocations in a period relative to the first"""
+        return (1 - self.cap_decline) ** period if period < self.n_periods else 0.0
+
+    def cap(self, market_cap: int, period: int) -> int:
+        return int(round(market_cap * self.factor(period)))
+
+    def to_dict(self) -> Dict:
+        return {'n_periods': self.n_periods, 'cap_decline': self.cap_decline, 'banking': self.banking,
+                'borrow_limit': self.borrow_limit, 'penalty': self.penalty, 'make_good': self.make_good}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PeriodSchedule) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"PeriodSchedule({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+SINGLE_PERIOD = PeriodSchedule()
@@ -0,0 +1,384 @@
+"""Optimal investment policy for one firm, by dynamic programming
+
+A firm's state is its position and its (production, pollution, earnings).
+Positions only increase between landings, so the expected final reward of
+every state is found exactly by one backward pass over the positions,
+from the last tile down to GO, with the whole state grid of each position
+updated as one NumPy array.
+
+The reward is final earnings after covering the permit deficit from the
+pool at permit_price, less a penalty (by default the firm's starting
+revenue) for ending out of compliance. The firm buys its deficit only if
+it can cover all of it, within its holding limit. Other firms and pool
+scarcity are ignored, so the solution is a benchmark for one firm playing
+alone.
+
+Production and pollution are gridded on a log scale and earnings linearly,
+between bounds no path on the board can leave. Values between grid points
+are interpolated; bots look up the nearest point of the invest table, so
+a decision is O(1). A solved policy is cached on disk (ETS_POLICY_CACHE,
+by default ~/.cache/ets/policies), keyed by the board spec and every
+parameter, so each parameter set is solved once. The last MEMORY_POLICIES
+used also stay in memory; at about 10 MB each, the rest are reloaded from
+disk when next needed.
+"""
+import hashlib
+import itertools
+import json
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .board import Board, default_board
+from .markov import jump_matrix
+from .rules import MARKET_ALLOCATION_PERCENT, MAX_PERMIT_HOLDING_PERCENT, PRODUCE_PRICE, rint
+
+POLICY_CACHE = os.environ.get("ETS_POLICY_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ets", "policies"))
+# Grid points for (production, pollution, earnings)
+GRID = (12, 128, 96)
+# Bump when the solver changes, so stale cache files are not reused
+VERSION = 1
+# Solved policies kept in memory, least recently used dropped first
+MEMORY_POLICIES = 16
+# Distinct firm starts benchmark() compares, well within memory so they are all held at once
+BENCHMARK_POLICIES = 4
+
+class Policy:
+    """Solved policy tables for one firm on one board
+
+    value, comply and net have shape (len(positions), *GRID): the expected
+    reward, chance of ending compliant and final earnings from each state
+    at GO (position 0) and on each offer tile, under optimal play from
+    there on. invest has one table per offer tile: whether to buy the
+    offer when standing on it in each state.
+    """
+
+    def __init__(self, key: Dict, axes: Tuple[np.ndarray, np.ndarray, np.ndarray], positions: np.ndarray,
+                 value: np.ndarray, comply: np.ndarray, net: np.ndarray, invest: np.ndarray):
+        self.key = key
+        self.axes = axes
+        self.positions = positions
+        # Stacked once so a lookup interpolates all three without copying
+        self._tables = np.stack([value, comply, net], axis=1)
+        self.value, self.comply, self.net = (self._tables[:, i] for i in range(3))
+        self.invest = invest
+        self._slot = {int(p): i for i, p in enumerate(positions)}
+        # Row of each tile's invest table, -1 for tiles without an offer
+        self._offer = np.full(int(positions.max()) + 2, -1, dtype=np.intp)
+        self._offer[positions[1:]] = np.arange(positions.size - 1)
+
+    def _coords(self, produce, pollution, earnings):
+        return _coords(self.axes, np.asarray(produce, dtype=np.float64), np.asarray(pollution, dtype=np.float64),
+                       np.asarray(earnings, dtype=np.float64))
+
+    def should_invest(self, position, produce, pollution, earnings) -> np.ndarray:
+        """Whether firms standing on an offer tile should buy it; arrays broadcast together"""
+        position, produce, pollution, earnings = np.broadcast_arrays(position, produce, pollution, earnings)
+        coords = self._coords(produce, pollution, earnings)
+        i, j, k = (np.rint(c).astype(np.intp) for c in coords)
+        table = self._offer[np.minimum(position, self._offer.size - 1)]
+        if (table < 0).any():
+            raise ValueError("should_invest() needs positions on offer tiles")
+        return self.invest[table, i, j, k]
+
+    def outlook(self, position: int, produce, pollution, earnings) -> Dict[str, np.ndarray]:
+        """Expected value, compliance chance and final earnings from a state on GO or an offer tile
+
+        On an offer tile the state is after the decision, so passing the
+        state with and without the offer compares buying against skipping.
+        """
+        if position not in self._slot:
+            raise ValueError(f"No tables for position {position}")
+        tables = self._tables[self._slot[position]]
+        value, comply, net = _interpolate(tables, self._coords(produce, pollution, earnings))
+        return {'value': value, 'comply': comply, 'net': net}
+
+    def expected(self) -> Dict[str, float]:
+        """Outlook of the firm at the start, under optimal play: the benchmark"""
+        key = self.key
+        start = self.outlook(0, key['produce'], key['pollution'], key['produce'] * PRODUCE_PRICE)
+        return {name: float(v) for name, v in start.items()}
+
+def _axis(lo: float, hi: float, n: int, log: bool) -> np.ndarray:
+    if hi <= lo or n == 1:
+        return np.array([lo])
+    return np.geomspace(lo, hi, n) if log else np.linspace(lo, hi, n)
+
+def _coords(axes, produce, pollution, earnings):
+    """Fractional grid indices of states, clipped to the grid"""
+    coords = []
+    for axis, x, log in zip(axes, (produce, pollution, earnings), (True, True, False)):
+        n = axis.size
+        if n == 1:
+            coords.append(np.zeros(x.shape))
+            continue
+        lo, hi = (np.log(axis[0]), np.log(axis[-1])) if log else (axis[0], axis[-1])
+        x = np.log(np.maximum(x, axis[0])) if log else x
+        coords.append(np.clip((x - lo) / (hi - lo) * (n - 1), 0, n - 1))
+    return coords
+
+def _interpolate(tables: np.ndarray, coords) -> np.ndarray:
+    """Multilinear interpolation of stacked tables (m, *grid) at fractional coords"""
+    shape = tables.shape[1:]
+    flat = tables.reshape(tables.shape[0], -1)
+    strides = np.cumprod((1,) + shape[:0:-1])[::-1]
+    lows, weights, steps = [], [], []
+    for c, n, stride in zip(coords, shape, strides):
+        low = np.minimum(np.floor(c).astype(np.intp), max(n - 2, 0))
+        lows.append(low * stride)
+        weights.append(c - low)
+        steps.append(stride if n > 1 else 0)
+    base = lows[0] + lows[1] + lows[2]
+    result = np.zeros((tables.shape[0],) + coords[0].shape)
+    for corner in itertools.product((0, 1), repeat=3):
+        w = np.ones(coords[0].shape)
+        offset = 0
+        for up, weight, step in zip(corner, weights, steps):
+            w *= weight if up else 1 - weight
+            offset += up * step
+        result += w * np.take(flat, base + offset, axis=1)
+    return result
+
+def _bounds(board: Board, produce: float, pollution: float):
+    """Production, pollution and earnings bounds over every path round the board"""
+    t = board.tables()
+    f = t['produce_mult']
+    g = t['pollution_mult'] * f
+    m = np.where(t['offer_cost'] > 0, t['offer_mult'], 1.0)
+    p_lo, p_hi = produce * np.minimum(f, 1).prod(), produce * np.maximum(f, 1).prod()
+    q_lo = pollution * np.minimum(g, 1).prod() * np.minimum(m, 1).prod()
+    q_hi = pollution * np.maximum(g, 1).prod() * np.maximum(m, 1).prod()
+    e0 = produce * PRODUCE_PRICE
+    e_hi = e0 + (p_hi - produce) * PRODUCE_PRICE
+    e_lo = e0 - (produce - p_lo) * PRODUCE_PRICE - t['fixed_cost'].sum() - t['unit_tax'].sum() * p_hi \
+        - t['offer_cost'].sum()
+    return (p_lo, p_hi), (q_lo, q_hi), (e_lo, e_hi)
+
+def solve(board: Board, produce: float, pollution: float, permits: float, max_permits: float,
+          permit_price: float, penalty: Optional[float] = None, grid: Tuple[int, int, int] = GRID) -> Policy:
+    """Solve the policy of a firm starting with the given production, pollution and permits"""
+    penalty = produce * PRODUCE_PRICE if penalty is None else penalty
+    key = _key(board, produce, pollution, permits, max_permits, permit_price, penalty, grid)
+    n_tiles = board.n_tiles
+    t = board.tables()
+    (p_lo, p_hi), (q_lo, q_hi), (e_lo, e_hi) = _bounds(board, produce, pollution)
+    axes = (_axis(p_lo, p_hi, grid[0], True), _axis(q_lo, q_hi, grid[1], True), _axis(e_lo, e_hi, grid[2], False))
+    P, Q, E = np.meshgrid(*axes, indexing='ij')
+
+    # Reward on finishing: cover the whole deficit if allowed and affordable, else buy nothing
+    deficit = np.maximum(0, np.ceil(Q - permits))
+    cover = (deficit <= max_permits - permits) & (deficit * permit_price <= np.maximum(E, 0))
+    comply = (deficit == 0) | cover
+    net = E - np.where(cover, deficit * permit_price, 0)
+    finish = np.stack([net - penalty * ~comply, comply, net])
+
+    # landed[t]: (value, comply, net) just after landing on t from each grid state, decided optimally
+    J = jump_matrix(n_tiles)
+    landed = {n_tiles: finish}
+    after: Dict[int, np.ndarray] = {}
+    for pos in range(n_tiles - 1, -1, -1):
+        targets = [tile for tile in np.flatnonzero(J[pos]) if tile > pos]
+        after[pos] = sum(J[pos, tile] * landed[tile] for tile in targets)
+        if pos == 0:
+            break
+        factor = t['produce_mult'][pos]
+        P1 = P * factor
+        Q1 = Q * (t['pollution_mult'][pos] * factor)
+        E1 = E + (factor - 1) * P * PRODUCE_PRICE - t['fixed_cost'][pos] - t['unit_tax'][pos] * P1
+        result = _interpolate(after[pos], _coords(axes, P1, Q1, E1))
+        cost = t['offer_cost'][pos]
+        if cost > 0:
+            take = _interpolate(after[pos], _coords(axes, P1, Q1 * t['offer_mult'][pos], E1 - cost))
+            result = np.where((E1 >= cost) & (take[0] > result[0]), take, result)
+        landed[pos] = result
+
+    offers = np.flatnonzero(t['offer_cost'] > 0)
+    invest = np.empty((offers.size,) + P.shape, dtype=bool)
+    for i, pos in enumerate(offers):
+        cost = t['offer_cost'][pos]
+        take = _interpolate(after[pos][:1], _coords(axes, P, Q * t['offer_mult'][pos], E - cost))[0]
+        invest[i] = (E >= cost) & (take > after[pos][0])
+
+    positions = np.concatenate([[0], offers])
+    tables = np.stack([after[int(p)] for p in positions]).astype(np.float32)
+    return Policy(key, axes, positions, tables[:, 0], tables[:, 1], tables[:, 2], invest)
+
+def _key(board: Board, produce, pollution, permits, max_permits, permit_price, penalty, grid) -> Dict:
+    return {'version': VERSION, 'board': board.spec, 'produce': float(produce), 'pollution': float(pollution),
+            'permits': float(permits), 'max_permits': float(max_permits), 'permit_price': float(permit_price),
+            'penalty': float(penalty), 'grid': list(grid)}
+
+def _digest(key: Dict) -> str:
+    return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:32]
+
+def _save(policy: Policy, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write beside the target and rename, so concurrent solvers never see half a file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, key=np.array(json.dumps(policy.key, sort_keys=True)), produce=policy.axes[0],
+                            pollution=policy.axes[1], earnings=policy.axes[2], positions=policy.positions,
+                            value=policy.value, comply=policy.comply, net=policy.net, invest=policy.invest)
+    os.replace(tmp, path)
+
+def _load(path: str, key: Dict) -> Optional[Policy]:
+    try:
+        with np.load(path) as data:
+            if json.loads(str(data['key'])) != json.loads(json.dumps(key, sort_keys=True)):
+                return None
+            return Policy(key, (data['produce'], data['pollution'], data['earnings']), data['positions'],
+                          data['value'], data['comply'], data['net'], data['invest'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+_POLICIES: "OrderedDict[str, Policy]" = OrderedDict()
+# Guards the dicts only, never a load or a solve
+_LOCK = threading.Lock()
+# One lock per policy being loaded or solved: callers after the same one wait for it, nobody else does
+_PENDING: Dict[str, threading.Lock] = {}
+
+def _cached(digest: str) -> Optional[Policy]:
+    with _LOCK:
+        policy = _POLICIES.get(digest)
+        if policy is not None:
+            _POLICIES.move_to_end(digest)
+        return policy
+
+def policy_for(board: Optional[Board] = None, produce: float = 0.0, pollution: float = 0.0, permits: float = 0.0,
+               max_permits: float = 0.0, permit_price: float = 0.0, penalty: Optional[float] = None,
+               cache_dir: Optional[str] = POLICY_CACHE, block: bool = True) -> Optional[Policy]:
+    """The solved policy for these parameters, from memory, then disk, then the solver
+
+    cache_dir=None keeps the policy in memory only. With block=False only
+    memory is checked: a policy not there is loaded or solved on a
+    background thread, and None returned until it is ready.
+    """
+    board = board or default_board()
+    penalty = produce * PRODUCE_PRICE if penalty is None else penalty
+    key = _key(board, produce, pollution, permits, max_permits, permit_price, penalty, GRID)
+    digest = _digest(key)
+    policy = _cached(digest)
+    if policy is not None:
+        return policy
+    # Registered before any thread starts, so one solve per policy however many callers ask at once
+    with _LOCK:
+        pending = _PENDING.get(digest)
+        started = pending is not None
+        if not started:
+            pending = _PENDING[digest] = threading.Lock()
+    path = os.path.join(cache_dir, f"{digest}.npz") if cache_dir else None
+    args = (digest, pending, key, path, (board, produce, pollution, permits, max_permits, permit_price, penalty))
+    if not block:
+        if not started:
+            threading.Thread(target=_fill, args=args, name="ets-policy", daemon=True).start()
+        return None
+    return _fill(*args)
+
+def _fill(digest: str, pending: threading.Lock, key: Dict, path: Optional[str], params: Tuple) -> Policy:
+    """Load or solve one policy under its pending lock and keep it in memory"""
+    try:
+        with pending:
+            # Whoever held the lock before us may have just finished this one
+            policy = _cached(digest)
+            if policy is not None:
+                return policy
+            policy = _load(path, key) if path and os.path.exists(path) else None
+            if policy is None:
+                policy = solve(*params)
+                if path:
+                    try:
+                        _save(policy, path)
+                    except OSError:
+                        # A read-only cache only costs a re-solve next time
+                        pass
+            with _LOCK:
+                _POLICIES[digest] = policy
+                while len(_POLICIES) > MEMORY_POLICIES:
+                    _POLICIES.popitem(last=False)
+            return policy
+    finally:
+        with _LOCK:
+            if _PENDING.get(digest) is pending:
+                del _PENDING[digest]
+
+def _firm_start(engine, seat: int) -> Tuple:
+    """policy_for() arguments after the board for a seat: its start, as policy bots key it"""
+    player = engine.players[seat]
+    max_permits = rint(player.initial_permits * (MAX_PERMIT_HOLDING_PERCENT / 100))
+    pool = rint(engine.market_cap * (MARKET_ALLOCATION_PERCENT / 100))
+    return (player.revenue / PRODUCE_PRICE, player.initial_pollution, player.initial_permits,
+            min(max_permits, player.initial_permits + pool), engine.permit_price)
+
+def firm_policy(engine, seat: int) -> Policy:
+    """The policy for a seat of an interactive game, from its starting state and allocated permits
+
+    Keyed only on the firm's type and the game's parameters (the first
+    period's pool, not what is left of it), so every decision in the game
+    reuses it; trades since the start are not counted.
+    """
+    return policy_for(engine.board, *_firm_start(engine, seat))
+
+def warm(engine, seats: Optional[Iterable[int]] = None) -> threading.Thread:
+    """Solve or load in the background the policies of the seats to be advised, every seat by default
+
+    Seats with the same start share a policy. At most MEMORY_POLICIES are
+    warmed, in seat order, so a large roster does not solve policies that
+    would leave memory before their first offer.
+    """
+    seats = range(len(engine.players)) if seats is None else seats
+    starts = list(dict.fromkeys(_firm_start(engine, seat) for seat in seats))[:MEMORY_POLICIES]
+    board = engine.board
+    thread = threading.Thread(target=lambda: [policy_for(board, *start) for start in starts], name="ets-policy",
+                              daemon=True)
+    thread.start()
+    return thread
+
+def advise(engine, block: bool = True) -> Optional[Dict[str, Dict[str, float]]]:
+    """Expected compliance chance and final earnings of buying and of skipping the pending offer
+
+    Two table lookups once the seat's policy is solved. Buying is left
+    out when the firm cannot afford it; None when nothing is pending or,
+    with block=False, while the seat's policy is still loading or solving.
+    """
+    investment = engine.pending_investment
+    if investment is None:
+        return None
+    seat = investment['player']
+    player = engine.players[seat]
+    policy = policy_for(engine.board, *_firm_start(engine, seat), block=block)
+    if policy is None:
+        return None
+    options = {'skip': (player.pollution, player.earnings)}
+    if engine.available_cash(seat) >= investment['cost']:
+        options['buy'] = (player.pollution * investment['multiplier'], player.earnings - investment['cost'])
+    advice = {}
+    for option, (pollution, earnings) in options.items():
+        outlook = policy.outlook(player.position, player.produce, pollution, earnings)
+        advice[option] = {'compliance': float(outlook['comply']), 'earnings': float(outlook['net'])}
+    return advice
+
+def benchmark(engine, block: bool = True) -> Optional[List[Dict]]:
+    """Each firm's expected final earnings and compliance chance under optimal play from its start
+
+    The facilitator's yardstick for the results screen: what a firm with
+    the same start would expect, playing the same board alone. Only firms
+    with one of the first BENCHMARK_POLICIES distinct starts are compared.
+    With block=False the policies are loaded or solved in the background
+    and None returned until all of them are ready.
+    """
+    starts = {}
+    for seat in range(len(engine.players)):
+        start = _firm_start(engine, seat)
+        if start in starts or len(starts) < BENCHMARK_POLICIES:
+            starts.setdefault(start, []).append(seat)
+    policies = [policy_for(engine.board, *start, block=block) for start in starts]
+    if any(policy is None for policy in policies):
+        return None
+    rows = []
+    for policy, seats in zip(policies, starts.values()):
+        expected = policy.expected()
+        rows += [{'seat': seat, 'name': engine.players[seat].name, 'earnings': expected['net'],
+                  'compliance': expected['comply']} for seat in seats]
+    return sorted(rows, key=lambda row: row['seat'])
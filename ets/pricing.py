@@ -0,0 +1,116 @@
+"""Scarcity pricing for the regulator's permit pool
+
+The pool price rises from the floor towards the ceiling as the pool drains,
+following a supply curve over the fraction sold u in [0, 1]:
+
+    flat         floor
+    linear       floor + (ceiling - floor) * u
+    exponential  floor + (ceiling - floor) * (e^(k u) - 1) / (e^k - 1)
+
+A purchase pays the area under the curve across the units it takes, so a
+large order cannot buy everything at the current price. The cost functions
+work on scalars and NumPy arrays alike, so the batch simulator prices whole
+batches of games with the same formulas.
+"""
+import math
+import numpy as np
+from typing import Optional
+
+SUPPLY_CURVES = ["flat", "linear", "exponential"]
+DEFAULT_STEEPNESS = 3.0
+
+def cumulative_cost(sold, supply, floor: float, ceiling: float, curve: str = "flat",
+                    steepness: float = DEFAULT_STEEPNESS):
+    """Total paid for the first `sold` units of a pool of `supply`"""
+    if curve == "flat" or ceiling <= floor:
+        return floor * sold
+    supply = np.maximum(supply, 1)
+    u = sold / supply
+    if curve == "linear":
+        return supply * (floor * u + (ceiling - floor) * u * u / 2)
+    if curve == "exponential":
+        k = steepness
+        return supply * (floor * u + (ceiling - floor) / math.expm1(k) * (np.expm1(k * u) / k - u))
+    raise ValueError(f"Unknown supply curve {curve!r}; use one of {SUPPLY_CURVES}")
+
+def unit_price(sold, supply, floor: float, ceiling: float, curve: str = "flat",
+               steepness: float = DEFAULT_STEEPNESS):
+    """Marginal price after `sold` units have gone"""
+    if curve == "flat" or ceiling <= floor:
+        return floor + 0 * sold
+    u = np.minimum(sold / np.maximum(supply, 1), 1.0)
+    if curve == "linear":
+        return floor + (ceiling - floor) * u
+    if curve == "exponential":
+        return floor + (ceiling - floor) * np.expm1(steepness * u) / math.expm1(steepness)
+    raise ValueError(f"Unknown supply curve {curve!r}; use one of {SUPPLY_CURVES}")
+
+def affordable(budget, sold, remaining, supply, floor: float, ceiling: float, curve: str = "flat",
+               steepness: float = DEFAULT_STEEPNESS):
+    """Most units purchasable with `budget`, by bisection on the integer quantity"""
+    start = cumulative_cost(sold, supply, floor, ceiling, curve, steepness)
+    lo = np.zeros_like(np.asarray(remaining, dtype=np.float64))
+    hi = np.maximum(np.asarray(remaining, dtype=np.float64), 0)
+    while np.any(lo < hi):
+        mid = np.ceil((lo + hi) / 2)
+        cost = cumulative_cost(sold + mid, supply, floor, ceiling, curve, steepness) - start
+        ok = cost <= budget
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid - 1)
+    return lo
+
+class PriceModel:
+    """Pool price that moves with each sale in O(1)
+
+    With banking, permits left unsold when a period closes are carried into
+    the next period's pool instead of being retired.
+    """
+
+    def __init__(self, supply: int, floor: float, ceiling: Optional[float] = None, curve: str = "flat",
+                 steepness: float = DEFAULT_STEEPNESS, banking: bool = False):
+        self.supply = supply
+        self.sold = 0
+        self.banked = 0
+        self.configure(floor, ceiling, curve, steepness, banking)
+
+    def configure(self, floor: float, ceiling: Optional[float] = None, curve: str = "flat",
+                  steepness: float = DEFAULT_STEEPNESS, banking: bool = False):
+        if curve not in SUPPLY_CURVES:
+            raise ValueError(f"Unknown supply curve {curve!r}; use one of {SUPPLY_CURVES}")
+        self.floor = floor
+        self.ceiling = max(floor, ceiling if ceiling is not None else floor)
+        self.curve = curve
+        self.steepness = steepness
+        self.banking = banking
+        self._update_price()
+
+    def _update_price(self):
+        self.price = float(unit_price(self.sold, self.supply, self.floor, self.ceiling, self.curve, self.steepness))
+
+    @property
+    def remaining(self) -> int:
+        return self.supply - self.sold
+
+    def quote(self, qty: int) -> float:
+        """Cost of buying the next qty units from the pool"""
+        args = (self.supply, self.floor, self.ceiling, self.curve, self.steepness)
+        return float(cumulative_cost(self.sold + qty, *args) - cumulative_cost(self.sold, *args))
+
+    def max_affordable(self, budget: float) -> int:
+        return int(affordable(budget, self.sold, self.remaining, self.supply, self.floor,
+                              self.ceiling, self.curve, self.steepness))
+
+    def sell(self, qty: int):
+        """Record qty units leaving the pool and move the price"""
+        if qty > self.remaining:
+            raise ValueError(f"Only {self.remaining:,} permits left in the pool")
+        self.sold += qty
+        self._update_price()
+
+    def roll_over(self, new_supply: int) -> int:
+        """Close the period and open a new pool; returns the permits banked"""
+        self.banked = self.remaining if self.banking else 0
+        self.supply = new_supply + self.banked
+        self.sold = 0
+        self._update_price()
+        return self.banked
@@ -0,0 +1,51 @@
+"""HTML snippets for the Streamlit client, memoised on exactly what they show
+
+These live outside the app script because Streamlit re-executes the script
+on every rerun, which would throw its module-level caches away. Here they
+are process-wide, so every session on the server shares them.
+"""
+import html
+import os
+from functools import lru_cache
+from typing import Tuple
+
+from .rules import COLORS
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+TILE_CACHE_SIZE = 1024
+CARD_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=None)
+def app_css() -> str:
+    """The prebuilt stylesheet as a <style> block, read once per process"""
+    with open(os.path.join(STATIC_DIR, "app.css"), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+@lru_cache(maxsize=TILE_CACHE_SIZE)
+def tile_html(text: str, color: str, markers: Tuple[bool, ...], overflow: int) -> str:
+    """HTML for one tile; markers holds one flag per drawn player, True for red"""
+    marker_text = " ".join(["⚫" if red else "⚪" for red in markers])
+    if overflow:
+        marker_text += f" +{overflow}"
+    dark = color in [COLORS['black'], COLORS['dark_gray'], COLORS['cyan']]
+    text = html.escape(text).replace("\n", "<br>")
+    css_class = "tile-card dark-tile" if dark else "tile-card"
+    return (f'<div class="{css_class}" style="background-color:{color};">'
+            f'<div class="tile-text">{text}</div><div class="tile-markers">{marker_text}</div></div>')
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def player_card_html(card_class: str, title: str, position: int, produce: str, pollution: str,
+                     permits: str, revenue: str, earnings: str, finished: bool) -> str:
+    """HTML for one player status card from its already formatted fields"""
+    return f"""
+    <div class="{card_class}">
+        <h3>{title}</h3>
+        <p><strong>Position:</strong> Tile {position}</p>
+        <p><strong>Production:</strong> {produce} units</p>
+        <p><strong>Pollution:</strong> {pollution} kg</p>
+        <p><strong>Permits:</strong> {permits}</p>
+        <p><strong>Revenue:</strong> {revenue}</p>
+        <p><strong>Earnings:</strong> {earnings}</p>
+        {"<p><strong>Status:</strong> Finished the round!</p>" if finished else ""}
+    </div>
+    """
@@ -0,0 +1,69 @@
+"""Seeded, replayable randomness for one game
+
+Everything random in a game comes from its seed through counter-based
+Philox streams:
+
+    game stream      Philox(seed)              seat shuffle, auction ties
+    seat k's die     Philox(seed) jumped k+1   that seat's rolls
+
+Dice are drawn in fixed blocks of DICE_BLOCK, so the interactive engine
+(one roll at a time) and the batch simulator (whole blocks per firm) read
+exactly the same sequence, and a seat's rolls do not depend on how the
+other seats' turns were interleaved.
+"""
+import secrets
+import numpy as np
+from typing import Sequence
+
+DICE_BLOCK = 64
+SEED_BITS = 32
+
+def new_seed() -> int:
+    """Fresh seed small enough to show and type into the UI"""
+    return secrets.randbits(SEED_BITS)
+
+def game_generator(seed: int) -> np.random.Generator:
+    return np.random.Generator(np.random.Philox(seed))
+
+def seat_generator(seed: int, seat: int) -> np.random.Generator:
+    return np.random.Generator(np.random.Philox(seed).jumped(seat + 1))
+
+def dice_block(rng: np.random.Generator) -> np.ndarray:
+    return rng.integers(1, 7, size=DICE_BLOCK)
+
+class Dice:
+    """One seat's die, read a block at a time"""
+    __slots__ = ('rng', 'block', 'i')
+
+    def __init__(self, seed: int, seat: int):
+        self.rng = seat_generator(seed, seat)
+        self.block = dice_block(self.rng)
+        self.i = 0
+
+    def roll(self) -> int:
+        if self.i == DICE_BLOCK:
+            self.block = dice_block(self.rng)
+            self.i = 0
+        value = int(self.block[self.i])
+        self.i += 1
+        return value
+
+class DiceTable:
+    """Dice for many firms at once, shape (firms, DICE_BLOCK)
+
+    Firm f rolls with seat seats[f] of game seeds[f]. draw() takes each
+    firm's next roll given how many it has already taken, refilling only
+    the firms that have used up their block.
+    """
+
+    def __init__(self, seeds: Sequence[int], seats: Sequence[int]):
+        self.generators = [seat_generator(int(seed), int(seat)) for seed, seat in zip(seeds, seats)]
+        self.table = np.stack([dice_block(rng) for rng in self.generators])
+        self.offset = np.zeros(len(self.generators), dtype=np.int64)
+
+    def draw(self, firms: np.ndarray, taken: np.ndarray) -> np.ndarray:
+        index = taken - self.offset[firms]
+        for f in firms[index >= DICE_BLOCK]:
+            self.table[f] = dice_block(self.generators[f])
+            self.offset[f] += DICE_BLOCK
+        return self.table[firms, taken - self.offset[firms]]
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional
+
+from .rng import Dice, new_seed
+
+# JPAL Color Scheme
+COLORS = {
+    'black': '#000000',
+    'white': '#FFFFFF', 
+    'dark_gray': '#646464',
+    'medium_gray': '#919191',
+    'light_gray': '#CACACA',
+    'red': '#E35925',
+    'teal': '#2FAA9F',
+    'yellow': '#F4C300',
+    'green': '#4A9C65',
+    'cyan': '#2D616E'
+}
+
+# Game Parameters
+LARGE = {"produce": 10000.0, "pollution": 100000.0}
+SMALL = {"produce": 2000.0, "pollution": 20000.0}
+PERMIT_PRICE = 5.0
+PRODUCE_PRICE = 1000.0
+DEFAULT_MARKET_CAP = 200000
+INDUSTRY_ALLOCATION_PERCENT = 80
+MARKET_ALLOCATION_PERCENT = 20
+MAX_PERMIT_HOLDING_PERCENT = 150
+
+# Sidebar ranges as (min, max, step)
+MARKET_CAP_RANGE = (100000, 500000, 10000)
+PERMIT_PRICE_RANGE = (1.0, 20.0, 0.5)
+PERIODS_RANGE = (1, 30, 1)
+PENALTY_RANGE = (0.0, 100.0, 1.0)
+DEFAULT_PENALTY = 20.0
+
+# Total number of tiles (0-15, so 16 tiles total)
+TOTAL_TILES = 16
+
+# Final outcome classes, in the order the results screen checks them
+OUTCOMES = ["EVERYONE WINS", "PARTIAL SUCCESS", "EVERYONE LOSES"]
+
+# Helper functions
+def rint(x: float) -> int:
+    return int(round(x))
+
+def money(x: float) -> str:
+    return f"₹{rint(x):,}"
+
+def format_number(x: float) -> str:
+    return f"{rint(x):,}"
+
+def default_name(i: int) -> str:
+    """Industry A, B, ... Z, AA, AB, ... for seat i"""
+    letters = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        letters = chr(ord("A") + r) + letters
+    return f"Industry {letters}"
+
+def industry_kinds(num_players: int) -> List[Dict]:
+    """Alternating Large/Small mix for num_players firms, before shuffling"""
+    return [LARGE if i % 2 == 0 else SMALL for i in range(num_players)]
+
+def initial_allocation(pollutions: List[float], market_cap: int) -> List[int]:
+    """Industry allocation shared out by pollution, computed once over all firms"""
+    industry_allocation = market_cap * (INDUSTRY_ALLOCATION_PERCENT / 100)
+    total_pollution = sum(pollutions)
+    return [rint(industry_allocation * (p / total_pollution)) for p in pollutions]
+
+# Player class
+class Player:
+    __slots__ = ('name', 'kind_name', 'produce', 'pollution', 'initial_pollution', 'initial_permits', 'permits',
+                 'max_permits', 'revenue', 'earnings', 'total_cost', 'permit_cost', 'abatement', 'borrowed',
+                 'owed', 'penalties', 'breaches', 'position', 'color', 'finished', 'dice')
+
+    def __init__(self, name: str, kind_dict: Dict, color: str, initial_permits: int,
+                 kind_name: Optional[str] = None, dice: Optional[Dice] = None):
+        self.name = name
+        self.kind_name = kind_name or ("Large" if kind_dict is LARGE else "Small")
+        self.produce = float(kind_dict["produce"])
+        self.pollution = float(kind_dict["pollution"])
+        self.initial_pollution = self.pollution
+        
+        self.initial_permits = initial_permits
+        self.permits = self.initial_permits
+        self.max_permits = rint(self.initial_permits * (MAX_PERMIT_HOLDING_PERCENT / 100))
+        
+        self.revenue = self.produce * PRODUCE_PRICE
+        self.earnings = float(self.revenue)
+        self.total_cost = 0.0
+        self.permit_cost = 0.0
+
+        # Carried between compliance periods: equipment bought, permits owed, true-up penalties
+        self.abatement = 1.0
+        self.borrowed = 0
+        self.owed = 0
+        self.penalties = 0.0
+        self.breaches = 0
+        
+        self.position = 0
+        self.color = color
+        self.finished = False
+        self.dice = dice if dice is not None else Dice(new_seed(), 0)
+
+    def roll(self) -> int:
+        return self.dice.roll()
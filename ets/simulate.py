@@ -0,0 +1,343 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .board import Board, default_board
+from .compliance import over_periods, true_up
+from .periods import SINGLE_PERIOD, PeriodSchedule
+from .pricing import affordable, cumulative_cost, unit_price
+from .rng import DiceTable, game_generator
+from .roster import Roster
+from .rules import (
+    LARGE, SMALL, PERMIT_PRICE, PRODUCE_PRICE, DEFAULT_MARKET_CAP, INDUSTRY_ALLOCATION_PERCENT,
+    MARKET_ALLOCATION_PERCENT, MAX_PERMIT_HOLDING_PERCENT, OUTCOMES
+)
+from .strategy import Strategy
+
+KIND_NAMES = ["Large", "Small"]
+KIND_PRODUCE = np.array([LARGE["produce"], SMALL["produce"]])
+KIND_POLLUTION = np.array([LARGE["pollution"], SMALL["pollution"]])
+
+class SimulationResult:
+    """Final per-firm arrays for a batch of games, shape (n_games, n_firms)"""
+
+    def __init__(self, market_cap: int, permit_price: float, kinds: np.ndarray, produce: np.ndarray,
+                 pollution: np.ndarray, permits: np.ndarray, earnings: np.ndarray, rolls: np.ndarray,
+                 kind_names: Optional[List[str]] = None, penalties: Optional[np.ndarray] = None,
+                 breaches: Optional[np.ndarray] = None, emissions: Optional[np.ndarray] = None,
+                 cap_total: Optional[float] = None, periods: Optional[PeriodSchedule] = None):
+        self.market_cap = market_cap
+        self.permit_price = permit_price
+        self.kinds = kinds
+        self.kind_names = kind_names or KIND_NAMES
+        self.produce = produce
+        self.pollution = pollution
+        self.permits = permits
+        self.earnings = earnings
+        self.rolls = rolls
+        # Multi-year games: true-up penalties and periods out of compliance per firm,
+        # emissions summed over the periods and the caps likewise
+        self.penalties = penalties if penalties is not None else np.zeros_like(earnings)
+        self.breaches = breaches
+        self.emissions = emissions
+        self.cap_total = cap_total if cap_total is not None else market_cap
+        self.periods = periods or SINGLE_PERIOD
+        self._settlement = None
+
+    @property
+    def n_games(self) -> int:
+        return self.pollution.shape[0]
+
+    @property
+    def settlement(self) -> Dict[str, np.ndarray]:
+        """The final true-up of every game, settled in one pass (ets.compliance)
+
+        A multi-year game was trued up period by period as it was played,
+        and is judged over all its periods. A single-period game shows the
+        penalty due under its schedule without charging it, as the engine does.
+        """
+        if self._settlement is None:
+            result = true_up(self.pollution, self.permits, self.market_cap, self.periods)
+            if self.breaches is not None:
+                result = over_periods(result, self.emissions.sum(axis=1), self.cap_total, self.breaches,
+                                      self.penalties)
+            self._settlement = result
+        return self._settlement
+
+    @property
+    def total_pollution(self) -> np.ndarray:
+        return self.settlement['total']
+
+    @property
+    def compliant(self) -> np.ndarray:
+        return self.settlement['compliant']
+
+    @property
+    def outcome(self) -> np.ndarray:
+        """Outcome class per game as an index into OUTCOMES"""
+        return self.settlement['outcome']
+
+    def outcome_probabilities(self) -> Dict[str, float]:
+        counts = np.bincount(self.outcome, minlength=len(OUTCOMES))
+        return {name: float(counts[i] / self.n_games) for i, name in enumerate(OUTCOMES)}
+
+def _play_walks(rng: np.random.Generator, board: Board, produce: np.ndarray,
+                pollution: np.ndarray, earnings: np.ndarray, invest_prob: float,
+                dice: Optional[DiceTable] = None, strategies: Optional[Sequence[Strategy]] = None,
+                firms: Optional[Dict[str, np.ndarray]] = None, abatement: Optional[np.ndarray] = None,
+                rolls: Optional[np.ndarray] = None) -> np.ndarray:
+    """Move every firm round the board until it lands exactly on GO; returns rolls taken
+
+    Rolls come from dice when given (per-firm seeded streams), otherwise from rng.
+    Firms are laid out game by game, so with strategies, firm f sits in seat
+    f % len(strategies) and that seat's strategy takes its investment choices.
+    firms holds the per-firm arrays (starting production and pollution,
+    permits, holding limit, pool size, floor price) passed on in each
+    strategy's context. abatement, when given, accumulates the pollution
+    multiplier of the equipment each firm buys. rolls, when given, holds the
+    rolls taken in earlier periods, so the dice carry on from there; it is
+    updated in place.
+    """
+    tables = board.tables()
+    n_tiles = board.n_tiles
+    position = np.zeros(produce.size, dtype=np.int64)
+    rolls = np.zeros(produce.size, dtype=np.int64) if rolls is None else rolls
+    active = np.arange(produce.size)
+
+    while active.size:
+        roll = dice.draw(active, rolls[active]) if dice is not None else rng.integers(1, 7, size=active.size)
+        rolls[active] += 1
+        pos = position[active]
+        new_pos = pos + roll
+
+        # Exact landing on GO finishes the firm; overshooting means rolling again
+        done = (pos > 0) & (new_pos == n_tiles)
+        moves = (pos == 0) | (new_pos < n_tiles)
+        position[active[done]] = 0
+
+        m = active[moves]
+        tile = new_pos[moves]
+        position[m] = tile
+
+        pre = produce[m]
+        factor = tables['produce_mult'][tile]
+        produce[m] = pre * factor
+        pollution[m] *= tables['pollution_mult'][tile] * factor
+        earnings[m] += (factor - 1) * pre * PRODUCE_PRICE
+        earnings[m] -= tables['fixed_cost'][tile] + tables['unit_tax'][tile] * produce[m]
+
+        # Normalize values
+        produce[m] = np.round(produce[m])
+        pollution[m] = np.round(pollution[m])
+
+        # Investment offers are decided straight away
+        offered = tables['offer_cost'][tile] > 0
+        if (invest_prob > 0 or strategies is not None) and offered.any():
+            o = m[offered]
+            cost = tables['offer_cost'][tile[offered]]
+            multiplier = tables['offer_mult'][tile[offered]]
+            if strategies is None:
+                buy = rng.random(o.size) < invest_prob
+            else:
+                buy = np.zeros(o.size, dtype=bool)
+                seat = o % len(strategies)
+                for s, strategy in enumerate(strategies):
+                    mine = seat == s
+                    if mine.any():
+                        f = o[mine]
+                        context = {k: v[f] for k, v in (firms or {}).items()}
+                        context.update(board=board, position=tile[offered][mine], produce=produce[f])
+                        buy[mine] = strategy.invest(rng, cost[mine], multiplier[mine],
+                                                    pollution[f], earnings[f], context)
+            buy &= earnings[o] >= cost
+            o, cost = o[buy], cost[buy]
+            earnings[o] -= cost
+            pollution[o] *= multiplier[buy]
+            if abatement is not None:
+                abatement[o] *= multiplier[buy]
+
+        active = active[~done]
+
+    return rolls
+
+def simulate_games(n_games: int, market_cap: int = DEFAULT_MARKET_CAP, permit_price: float = PERMIT_PRICE,
+                   invest_prob: float = 0.0, buy_permits: bool = True, seed: Optional[int] = None,
+                   chunk_size: int = 2_000_000, board: Optional[Board] = None,
+                   n_firms: int = 2, roster: Optional[Roster] = None,
+                   allocation: str = "grandfathering", price_ceiling: Optional[float] = None,
+                   supply_curve: str = "flat", game_seeds: Optional[Sequence[int]] = None,
+                   strategies: Optional[Sequence[Strategy]] = None,
+                   periods: Optional[PeriodSchedule] = None) -> SimulationResult:
+    """Play n_games games of n_firms firms at once as NumPy arrays
+
+    Each firm is offered every investment tile it lands on and buys with
+    probability invest_prob if it can afford it. With buy_permits, firms top up
+    from the regulator pool at the end, in seat order, to cover any deficit
+    they can afford within the holding limit. chunk_size bounds the number of
+    firms held in memory at once. Pool purchases follow the same supply curve
+    as the interactive game, from permit_price up to price_ceiling.
+
+    With a roster, every game seats the roster's firms in order (n_firms is
+    ignored), allocated with the given method, and kinds are sector codes.
+
+    With game_seeds, one game is played per seed (n_games is ignored) and
+    each is seated and rolled exactly as GameEngine with that seed would,
+    so any classroom game can be replayed here. Investment choices still
+    come from seed.
+
+    With strategies, one per seat, bots (ets.strategy) make each seat's
+    investment choices in place of invest_prob and choose how much of its
+    deficit to buy from the pool.
+
+    With a multi-period schedule (ets.periods), every game plays that many
+    laps, trued up after each, and the result also carries each firm's
+    penalties, periods out of compliance and total emissions.
+    """
+    chunks = list(iter_simulations(n_games, market_cap, permit_price, invest_prob, buy_permits, seed, chunk_size,
+                                   board, n_firms, roster, allocation, price_ceiling, supply_curve, game_seeds,
+                                   strategies, periods))
+    fields = zip(*[(c.kinds, c.produce, c.pollution, c.permits, c.earnings, c.rolls, c.penalties) for c in chunks])
+    kinds, produce, pollution, permits, earnings, rolls, penalties = (np.concatenate(f) for f in fields)
+    multi = chunks[0].breaches is not None
+    return SimulationResult(market_cap, permit_price, kinds, produce, pollution, permits, earnings, rolls,
+                            chunks[0].kind_names, penalties,
+                            np.concatenate([c.breaches for c in chunks]) if multi else None,
+                            np.concatenate([c.emissions for c in chunks]) if multi else None,
+                            chunks[0].cap_total, chunks[0].periods)
+
+def iter_simulations(n_games: int, market_cap: int = DEFAULT_MARKET_CAP, permit_price: float = PERMIT_PRICE,
+                     invest_prob: float = 0.0, buy_permits: bool = True, seed: Optional[int] = None,
+                     chunk_size: int = 2_000_000, board: Optional[Board] = None,
+                     n_firms: int = 2, roster: Optional[Roster] = None,
+                     allocation: str = "grandfathering", price_ceiling: Optional[float] = None,
+                     supply_curve: str = "flat", game_seeds: Optional[Sequence[int]] = None,
+                     strategies: Optional[Sequence[Strategy]] = None,
+                     periods: Optional[PeriodSchedule] = None) -> Iterator[SimulationResult]:
+    """simulate_games one chunk of games at a time
+
+    Yields the same games, in the same order, as simulate_games with the
+    same arguments, but only one chunk is held in memory, for outputs
+    streamed to disk.
+    """
+    rng = np.random.default_rng(seed)
+    if game_seeds is not None:
+        game_seeds = np.asarray(game_seeds, dtype=np.int64)
+        n_games = game_seeds.size
+    board = board or default_board()
+    roster_allocation = roster.allocate(market_cap, allocation) if roster is not None else None
+    if roster is not None:
+        n_firms = len(roster)
+    if strategies is not None and len(strategies) != n_firms:
+        raise ValueError(f"Need one strategy per seat: {n_firms} seats, {len(strategies)} strategies")
+    games_per_chunk = max(1, chunk_size // n_firms)
+    kind_names = roster.sector_names.tolist() if roster is not None else None
+    periods = periods or SINGLE_PERIOD
+    cap_total = sum(periods.cap(market_cap, k) for k in range(periods.n_periods)) if periods.multi else None
+    for start in range(0, n_games, games_per_chunk):
+        n = min(games_per_chunk, n_games - start)
+        seeds = game_seeds[start:start + n] if game_seeds is not None else None
+        *fields, multi = _simulate_chunk(rng, board, n, n_firms, market_cap, permit_price, invest_prob, buy_permits,
+                                         roster, roster_allocation, price_ceiling, supply_curve, seeds, strategies,
+                                         periods)
+        yield SimulationResult(market_cap, permit_price, *fields, kind_names=kind_names, cap_total=cap_total,
+                               periods=periods, **multi)
+
+def _simulate_chunk(rng: np.random.Generator, board: Board, n: int, n_firms: int, market_cap: int,
+                    permit_price: float, invest_prob: float, buy_permits: bool,
+                    roster: Optional[Roster] = None, roster_allocation: Optional[Dict[str, np.ndarray]] = None,
+                    price_ceiling: Optional[float] = None, supply_curve: str = "flat",
+                    game_seeds: Optional[np.ndarray] = None, strategies: Optional[Sequence[Strategy]] = None,
+                    periods: PeriodSchedule = SINGLE_PERIOD):
+    if roster is not None:
+        kinds = np.tile(roster.sector_codes, (n, 1))
+        produce = np.tile(roster.produce, (n, 1))
+        pollution = np.tile(roster.pollution, (n, 1))
+        initial_permits = np.tile(roster_allocation['initial_permits'].astype(np.float64), (n, 1))
+    else:
+        # The Large/Small mix is shuffled per game, as in the Assign button
+        mix = np.arange(n_firms, dtype=np.int8) % 2
+        if game_seeds is not None:
+            kinds = np.stack([mix[game_generator(int(s)).permutation(n_firms)] for s in game_seeds])
+        else:
+            kinds = mix[np.argsort(rng.random((n, n_firms)), axis=1)]
+        produce = KIND_PRODUCE[kinds]
+        pollution = KIND_POLLUTION[kinds]
+        industry_allocation = market_cap * (INDUSTRY_ALLOCATION_PERCENT / 100)
+        initial_permits = np.round(industry_allocation * (pollution / pollution.sum(axis=1, keepdims=True)))
+
+    earnings = produce * PRODUCE_PRICE
+    max_permits = np.round(initial_permits * (MAX_PERMIT_HOLDING_PERCENT / 100))
+    permits = initial_permits.copy()
+    baseline = (produce.copy(), pollution.copy())
+
+    flat = (produce.reshape(-1), pollution.reshape(-1), earnings.reshape(-1))
+    dice = None
+    if game_seeds is not None:
+        n_seats = kinds.shape[1]
+        dice = DiceTable(np.repeat(game_seeds, n_seats), np.tile(np.arange(n_seats), n))
+    supply = np.full(n, np.round(market_cap * (MARKET_ALLOCATION_PERCENT / 100)))
+    firms = None
+    if strategies is not None:
+        # Every firm's start, which stays its context however many periods it plays
+        firms = {'initial_produce': baseline[0].reshape(-1), 'initial_pollution': baseline[1].reshape(-1),
+                 'permits': initial_permits.reshape(-1), 'max_permits': max_permits.reshape(-1).copy(),
+                 'pool': np.repeat(supply, kinds.shape[1]), 'permit_price': np.full(produce.size, float(permit_price))}
+
+    # Every period continues from the arrays the last one left, so periods cost the same however many there are
+    rolls = np.zeros((n, kinds.shape[1]), dtype=np.int64)
+    multi = {}
+    if periods.multi:
+        abatement = np.ones_like(pollution)
+        multi = {'penalties': np.zeros_like(earnings), 'breaches': np.zeros(kinds.shape, dtype=np.int64),
+                 'emissions': np.zeros_like(pollution)}
+        owed = np.zeros_like(permits)
+    for period in range(periods.n_periods):
+        if period:
+            # A new year's sales from the baseline, less the equipment bought so far
+            produce[:] = baseline[0]
+            pollution[:] = np.round(baseline[1] * abatement)
+            earnings += produce * PRODUCE_PRICE
+        _play_walks(rng, board, *flat, invest_prob, dice, strategies, firms,
+                    abatement.reshape(-1) if periods.multi else None, rolls.reshape(-1))
+        sold = _buy_from_pool(rng, pollution, permits, max_permits, earnings, supply, permit_price, price_ceiling,
+                              supply_curve, strategies) if buy_permits else np.zeros(n)
+        if not periods.multi:
+            break
+
+        next_allocation = np.round(initial_permits * periods.factor(period + 1))
+        result = true_up(pollution, permits, periods.cap(market_cap, period), periods, next_allocation, owed)
+        earnings -= result['penalty']
+        multi['penalties'] += result['penalty']
+        multi['breaches'] += result['uncovered'] > 0
+        multi['emissions'] += pollution
+        if period < periods.n_periods - 1:
+            permits[:] = result['next_permits']
+            owed[:] = result['owed']
+            max_permits[:] = np.round(next_allocation * (MAX_PERMIT_HOLDING_PERCENT / 100)) + result['banked']
+            banked = supply - sold if periods.banking else 0
+            supply[:] = np.round(periods.cap(market_cap, period + 1) * (MARKET_ALLOCATION_PERCENT / 100)) + banked
+
+    return kinds, produce, pollution, permits.astype(np.int64), earnings, rolls, multi
+
+def _buy_from_pool(rng: np.random.Generator, pollution: np.ndarray, permits: np.ndarray, max_permits: np.ndarray,
+                   earnings: np.ndarray, supply: np.ndarray, permit_price: float, price_ceiling: Optional[float],
+                   supply_curve: str, strategies: Optional[Sequence[Strategy]]) -> np.ndarray:
+    """Firms top up from each game's pool in seat order; updates permits and earnings, returns permits sold"""
+    n = pollution.shape[0]
+    ceiling = max(permit_price, price_ceiling if price_ceiling is not None else permit_price)
+    curve = (supply, permit_price, ceiling, supply_curve)
+    scarce = supply_curve != "flat" and ceiling > permit_price
+    sold = np.zeros(n)
+    for seat in range(pollution.shape[1]):
+        wanted = np.ceil(np.maximum(0, pollution[:, seat] - permits[:, seat]))
+        if strategies is not None:
+            wanted = strategies[seat].buy(rng, wanted, unit_price(sold, *curve), earnings[:, seat])
+        if scarce:
+            can_afford = affordable(np.maximum(earnings[:, seat], 0), sold, supply - sold, *curve)
+        else:
+            can_afford = np.floor(earnings[:, seat] / permit_price) if permit_price > 0 else 0
+        qty = np.minimum.reduce([wanted, supply - sold, max_permits[:, seat] - permits[:, seat], can_afford])
+        qty = np.maximum(qty, 0)
+        permits[:, seat] += qty
+        earnings[:, seat] -= cumulative_cost(sold + qty, *curve) - cumulative_cost(sold, *curve)
+        sold += qty
+    return sold
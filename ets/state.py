@@ -0,0 +1,250 @@
+"""Compact binary encoding of a whole game
+
+A blob is a small JSON header followed by raw array buffers:
+
+    b"ETS2" | header length (uint32) | header JSON | buffers
+
+The header holds the scalars, names and, for each array, its dtype, shape
+and offset into the buffers. Per-seat numbers, turn links, dice states,
+resting orders, the trade tape, bids and events are fixed-layout NumPy
+records, so encoding and decoding cost a few memcpys rather than one
+Python object per field. Engine snapshots use the same format without the
+event log.
+"""
+import json
+import struct
+import numpy as np
+from typing import Dict, Tuple
+
+MAGIC = b"ETS2"
+
+PLAYER_DTYPE = np.dtype([
+    ('produce', '<f8'), ('pollution', '<f8'), ('initial_pollution', '<f8'), ('initial_permits', '<i8'),
+    ('permits', '<i8'), ('max_permits', '<i8'), ('revenue', '<f8'), ('earnings', '<f8'), ('total_cost', '<f8'),
+    ('permit_cost', '<f8'), ('abatement', '<f8'), ('borrowed', '<i8'), ('owed', '<i8'),
+    ('penalties', '<f8'), ('breaches', '<i4'), ('position', '<i4'), ('finished', '?'),
+    ('next', '<i4'), ('prev', '<i4'),
+])
+# Philox bit generator state plus, for dice, the current block and read index
+PHILOX_DTYPE = np.dtype([
+    ('counter', '<u8', (4,)), ('key', '<u8', (2,)), ('buffer', '<u8', (4,)),
+    ('buffer_pos', '<i4'), ('has_uint32', '<i4'), ('uinteger', '<u4'),
+])
+ORDER_DTYPE = np.dtype([
+    ('id', '<i8'), ('owner', '<i4'), ('side', 'i1'), ('price', '<f8'), ('qty', '<i8'), ('remaining', '<i8'),
+])
+TRADE_DTYPE = np.dtype([
+    ('seq', '<i8'), ('price', '<f8'), ('qty', '<i8'), ('buyer', '<i4'), ('seller', '<i4'),
+    ('buy_order', '<i8'), ('sell_order', '<i8'),
+])
+BID_DTYPE = np.dtype([('seat', '<i4'), ('price', '<f8'), ('qty', '<i8')])
+
+def _philox_record(rng: np.random.Generator) -> Tuple:
+    st = rng.bit_generator.state
+    # A spent buffer and an unset half-word are stale: store them as zeros, as decoding leaves them
+    buffer = st['buffer'] if st['buffer_pos'] != 4 else np.zeros(4, dtype=np.uint64)
+    uinteger = st['uinteger'] if st['has_uint32'] else 0
+    return (st['state']['counter'], st['state']['key'], buffer,
+            st['buffer_pos'], st['has_uint32'], uinteger)
+
+def _philox_generator(rec) -> np.random.Generator:
+    bit_generator = np.random.Philox(counter=rec['counter'], key=rec['key'])
+    # Dice draw whole 64-bit words, so the output buffer is usually empty
+    if rec['buffer_pos'] != 4 or rec['has_uint32']:
+        bit_generator.state = {
+            'bit_generator': 'Philox',
+            'state': {'counter': np.array(rec['counter']), 'key': np.array(rec['key'])},
+            'buffer': np.array(rec['buffer']),
+            'buffer_pos': int(rec['buffer_pos']),
+            'has_uint32': int(rec['has_uint32']),
+            'uinteger': int(rec['uinteger']),
+        }
+    return np.random.Generator(bit_generator)
+
+def _pack(header: Dict, arrays: Dict[str, np.ndarray]) -> bytes:
+    specs, buffers, offset = {}, [], 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        specs[name] = [np.lib.format.dtype_to_descr(arr.dtype), list(arr.shape), offset]
+        buffers.append(arr.tobytes())
+        offset += arr.nbytes
+    header = dict(header, arrays=specs)
+    head = json.dumps(header, separators=(",", ":")).encode()
+    return b"".join([MAGIC, struct.pack("<I", len(head)), head] + buffers)
+
+def _unpack(blob: bytes) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    if blob[:4] != MAGIC:
+        raise ValueError("Not an encoded game")
+    (n,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + n])
+    data = memoryview(blob)[8 + n:]
+    arrays = {}
+    for name, (descr, shape, offset) in header.pop("arrays").items():
+        dtype = np.lib.format.descr_to_dtype(descr)
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+    return header, arrays
+
+def encode(engine, include_events: bool = True) -> bytes:
+    """Serialize an engine; the board is not included"""
+    from .orderbook import BUY
+
+    players = engine.players
+    n = len(players)
+    table = np.zeros(n, dtype=PLAYER_DTYPE)
+    for name in PLAYER_DTYPE.names[:-2]:
+        table[name] = [getattr(p, name) for p in players]
+    table['next'] = engine._next
+    table['prev'] = engine._prev
+
+    dice = np.zeros(n, dtype=PHILOX_DTYPE)
+    dice[:] = [_philox_record(p.dice.rng) for p in players]
+    blocks = np.array([p.dice.block for p in players], dtype=np.int8).reshape(n, -1)
+    game_rng = np.array([_philox_record(engine.rng)], dtype=PHILOX_DTYPE)
+
+    book = engine.book
+    orders = np.array([(o.id, o.owner, o.side == BUY, o.price, o.qty, o.remaining) for o in book.orders.values()],
+                      dtype=ORDER_DTYPE)
+    tape = np.array([tuple(t) for t in book.tape], dtype=TRADE_DTYPE)
+    bids = np.array([(seat, price, qty) for seat, curve in engine.bids.items() for price, qty in curve],
+                    dtype=BID_DTYPE)
+
+    pricing = engine.pricing
+    auction = engine.auction_result
+    header = {
+        'market_cap': engine.market_cap,
+        'permit_price': engine.permit_price,
+        'price_ceiling': engine.price_ceiling,
+        'supply_curve': engine.supply_curve,
+        'seed': engine.seed,
+        'base_seed': engine.base_seed,
+        'current_turn': engine.current_turn,
+        'turns': engine.turns,
+        'active_count': engine.active_count,
+        'game_started': engine.game_started,
+        'game_over': engine.game_over,
+        'last_roll': engine.last_roll,
+        'roll_again_required': engine.roll_again_required,
+        'roll_was_too_high': engine.roll_was_too_high,
+        'pending_investment': engine.pending_investment,
+        'periods': engine.periods.to_dict(),
+        'period': engine.period,
+        'true_up_due': engine.true_up_due,
+        'period_start_turn': engine.period_start_turn,
+        'history': engine.history,
+        'pricing': {k: getattr(pricing, k) for k in ('supply', 'sold', 'banked', 'floor', 'ceiling',
+                                                     'curve', 'steepness', 'banking')},
+        # Seats that have bid, empty curves included, which have no rows in the bids array
+        'bid_seats': list(engine.bids),
+        'auction': None if auction is None else {'clearing_price': auction.clearing_price, 'supply': auction.supply},
+        'book': {'next_id': book._next_id, 'trade_seq': book._trade_seq, 'tape_size': book.tape.maxlen},
+        'names': [p.name for p in players],
+        'kind_names': [p.kind_name for p in players],
+        'colors': [p.color for p in players],
+        'dice_index': [p.dice.i for p in players],
+        'board_tiles': engine.board.n_tiles,
+    }
+    arrays = {'players': table, 'dice': dice, 'dice_blocks': blocks, 'game_rng': game_rng,
+              'orders': orders, 'tape': tape, 'bids': bids}
+    if auction is not None:
+        arrays['auction_allocations'] = auction.allocations
+        arrays['auction_bidders'] = auction.bidders
+
+    events = engine.events if include_events else None
+    if events is not None:
+        _add_events(header, arrays, events)
+    return _pack(header, arrays)
+
+def _add_events(header: Dict, arrays: Dict[str, np.ndarray], events):
+    arrays['events'] = events.slice(0)
+    snapshots = events.snapshots()
+    header['snapshots'] = [[seq, len(blob)] for seq, blob in snapshots]
+    arrays['snapshot_data'] = np.frombuffer(b"".join(blob for _, blob in snapshots), dtype=np.uint8)
+
+def with_events(blob: bytes, events) -> bytes:
+    """encode() output from a blob encoded without events plus the log, e.g. a frozen copy"""
+    header, arrays = _unpack(blob)
+    _add_events(header, arrays, events)
+    return _pack(header, arrays)
+
+def decode(blob: bytes, board=None):
+    """Rebuild an engine from encode() output, on the given board"""
+    from .auction import AuctionResult
+    from .board import default_board
+    from .engine import GameEngine
+    from .events import EventLog
+    from .orderbook import BUY, SELL, Order, OrderBook, Trade
+    from .periods import PeriodSchedule
+    from .pricing import PriceModel
+    from .rng import Dice
+    from .rules import Player
+
+    header, arrays = _unpack(blob)
+    board = board or default_board()
+    if board.n_tiles != header['board_tiles']:
+        raise ValueError(f"Game was played on {header['board_tiles']} tiles, board has {board.n_tiles}")
+
+    engine = GameEngine.__new__(GameEngine)
+    engine.board = board
+    for key in ('market_cap', 'permit_price', 'price_ceiling', 'supply_curve', 'seed', 'base_seed', 'current_turn', 'turns',
+                'active_count', 'game_started', 'game_over', 'last_roll', 'roll_again_required',
+                'roll_was_too_high', 'pending_investment'):
+        setattr(engine, key, header[key])
+    engine.rng = _philox_generator(arrays['game_rng'][0])
+    engine.periods = PeriodSchedule(**header['periods'])
+    engine.period = header['period']
+    engine.true_up_due = header['true_up_due']
+    engine.period_start_turn = header['period_start_turn']
+    engine.history = header['history']
+
+    pricing = header['pricing']
+    engine.pricing = PriceModel(pricing['supply'], pricing['floor'], pricing['ceiling'], pricing['curve'],
+                                pricing['steepness'], pricing['banking'])
+    engine.pricing.sold = pricing['sold']
+    engine.pricing.banked = pricing['banked']
+    engine.pricing._update_price()
+
+    table = arrays['players']
+    engine.players = []
+    for i, name in enumerate(header['names']):
+        row = table[i]
+        player = Player.__new__(Player)
+        player.name = name
+        player.kind_name = header['kind_names'][i]
+        player.color = header['colors'][i]
+        for field in PLAYER_DTYPE.names[:-2]:
+            setattr(player, field, row[field].item())
+        dice = Dice.__new__(Dice)
+        dice.rng = _philox_generator(arrays['dice'][i])
+        dice.block = arrays['dice_blocks'][i].astype(np.int64)
+        dice.i = header['dice_index'][i]
+        player.dice = dice
+        engine.players.append(player)
+    engine._next = table['next'].tolist()
+    engine._prev = table['prev'].tolist()
+
+    engine.bids = {seat: [] for seat in header['bid_seats']}
+    for seat, price, qty in arrays['bids'].tolist():
+        engine.bids[seat].append((price, qty))
+    auction = header['auction']
+    engine.auction_result = None if auction is None else AuctionResult(
+        auction['clearing_price'], arrays['auction_allocations'], arrays['auction_bidders'], auction['supply'])
+
+    book = OrderBook(on_trade=engine._settle_trade, tape_size=header['book']['tape_size'])
+    book._next_id = header['book']['next_id']
+    book._trade_seq = header['book']['trade_seq']
+    for order_id, owner, is_buy, price, qty, remaining in arrays['orders'].tolist():
+        order = Order(order_id, owner, BUY if is_buy else SELL, price, qty)
+        order.remaining = remaining
+        book.restore(order)
+    book.tape.extend(Trade(*t) for t in arrays['tape'].tolist())
+    engine.book = book
+
+    engine.events = EventLog()
+    if 'events' in arrays:
+        engine.events.extend(arrays['events'])
+        data, offset = arrays['snapshot_data'].tobytes(), 0
+        for seq, size in header['snapshots']:
+            engine.events.add_snapshot(seq, data[offset:offset + size])
+            offset += size
+    return engine
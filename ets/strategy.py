@@ -0,0 +1,137 @@
+"""Bot players: pluggable strategies for the two decisions a firm makes
+
+A firm decides whether to buy the equipment a tile offers, and how many
+permits to buy from the regulator once it has finished its trip round the
+board. A Strategy answers both for whole arrays of firms at once, so the
+batch simulator runs millions of bot games through the same code that
+fills a seat in the interactive engine (with arrays of length one).
+
+    greedy            never spends on compliance; keeps every rupee
+    compliance        buys every affordable upgrade and covers its deficit
+    threshold         abates or buys only while it costs at most max_price per kg
+    random            invests and buys at random, as a noisy human might
+    optimal           follows the dynamic-programming policy of ets.policy
+"""
+import abc
+import numpy as np
+from typing import Dict, Optional
+
+from .rules import PERMIT_PRICE
+
+class Strategy(abc.ABC):
+    """Decisions for the seats a bot fills; subclasses override both methods
+
+    invest() gets the offer's cost and pollution multiplier and the firms'
+    current pollution and earnings, and returns which firms buy. buy()
+    gets each firm's permit deficit, the pool's current unit price and
+    earnings, and returns how many permits each wants. Affordability, the
+    holding limit and the pool size are enforced by the caller.
+
+    Callers also pass invest() a context: the board and, per firm, its
+    position and production, and its start: production, pollution,
+    allocated permits, holding limit, the first pool's size and the floor
+    price (keys board, position, produce, initial_produce,
+    initial_pollution, permits, max_permits, pool, permit_price).
+    """
+    name = "strategy"
+
+    @abc.abstractmethod
+    def invest(self, rng: np.random.Generator, cost: np.ndarray, multiplier: np.ndarray,
+               pollution: np.ndarray, earnings: np.ndarray, context: Optional[Dict] = None) -> np.ndarray:
+        """Which firms buy the equipment on offer"""
+
+    @abc.abstractmethod
+    def buy(self, rng: np.random.Generator, deficit: np.ndarray, price: np.ndarray,
+            earnings: np.ndarray) -> np.ndarray:
+        """How many permits each firm wants"""
+
+    def __repr__(self) -> str:
+        return self.name
+
+class Greedy(Strategy):
+    name = "greedy"
+
+    def invest(self, rng, cost, multiplier, pollution, earnings, context=None):
+        return np.zeros(cost.shape, dtype=bool)
+
+    def buy(self, rng, deficit, price, earnings):
+        return np.zeros_like(deficit)
+
+class ComplianceFirst(Strategy):
+    name = "compliance"
+
+    def invest(self, rng, cost, multiplier, pollution, earnings, context=None):
+        return earnings >= cost
+
+    def buy(self, rng, deficit, price, earnings):
+        return deficit
+
+class PriceThreshold(Strategy):
+    """Abates or buys while the cost per kg is at most max_price"""
+    name = "threshold"
+
+    def __init__(self, max_price: float = 2 * PERMIT_PRICE):
+        self.max_price = max_price
+
+    def invest(self, rng, cost, multiplier, pollution, earnings, context=None):
+        abated = pollution * (1 - multiplier)
+        return cost <= self.max_price * abated
+
+    def buy(self, rng, deficit, price, earnings):
+        return np.where(price <= self.max_price, deficit, 0)
+
+class RandomStrategy(Strategy):
+    name = "random"
+
+    def __init__(self, invest_prob: float = 0.5):
+        self.invest_prob = invest_prob
+
+    def invest(self, rng, cost, multiplier, pollution, earnings, context=None):
+        return rng.random(cost.shape) < self.invest_prob
+
+    def buy(self, rng, deficit, price, earnings):
+        return np.floor(deficit * rng.random(deficit.shape))
+
+class OptimalStrategy(Strategy):
+    """Invests as the optimal single-firm policy says and covers its deficit when it can
+
+    Firms are grouped by starting position, permits and price, and each
+    group looks its decisions up in the policy solved (or cached) for it.
+    No firm can buy more than the pool holds, so that caps its holding limit.
+    """
+    name = "optimal"
+
+    def invest(self, rng, cost, multiplier, pollution, earnings, context=None):
+        from .policy import policy_for
+
+        if context is None:
+            raise ValueError("The optimal strategy needs the firms' context")
+        limit = np.minimum(context['max_permits'], context['permits'] + context['pool'])
+        columns = [np.broadcast_to(v, cost.shape) for v in (context['initial_produce'], context['initial_pollution'],
+                                                            context['permits'], limit, context['permit_price'])]
+        # Group on one integer code per firm; unique() over whole rows sorts far more slowly
+        code = np.zeros(cost.shape, dtype=np.int64)
+        for column in columns:
+            values, inverse = np.unique(column, return_inverse=True)
+            code = code * values.size + inverse.reshape(cost.shape)
+        _, first, inverse = np.unique(code, return_index=True, return_inverse=True)
+        buy = np.zeros(cost.shape, dtype=bool)
+        for g, row in enumerate(first):
+            mine = inverse.reshape(cost.shape) == g
+            produce, start_pollution, permits, max_permits, price = (float(c[row]) for c in columns)
+            policy = policy_for(context['board'], produce, start_pollution, permits, max_permits, price)
+            buy[mine] = policy.should_invest(context['position'][mine], context['produce'][mine],
+                                             pollution[mine], earnings[mine])
+        return buy
+
+    def buy(self, rng, deficit, price, earnings):
+        # Part of a deficit buys no compliance, so cover it all or keep the money
+        return np.where(deficit * price <= earnings, deficit, 0)
+
+STRATEGIES = {cls.name: cls for cls in (Greedy, ComplianceFirst, PriceThreshold, RandomStrategy, OptimalStrategy)}
+
+def get_strategy(name: str) -> Strategy:
+    try:
+        return STRATEGIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown strategy {name!r}; use one of {sorted(STRATEGIES)}")
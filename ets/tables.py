@@ -0,0 +1,217 @@
+"""Classroom tables: many games in one server process
+
+A GameRegistry holds every table the process is running; the app keeps
+one in st.cache_resource, so every browser session sees the same
+tables. Each Table is one game behind its own lock, reached by a short
+join code. The registry's lock only guards its dict of tables and is
+never held while a game runs, so an action at one table never waits on
+another and a dice click costs the same with five tables or five
+hundred.
+
+    registry.create(engine)          open a table; it comes with a join code
+    registry.get(code)               the table, or KeyError once it has gone
+    table.join(client, seat=None)    claim a seat, the first free one by default
+    with table.hold() as engine:     act on the game; marks the table active
+    registry.summaries()             one row per table for the facilitator
+
+A session that has not claimed a seat controls every seat, as the host
+or facilitator does; only the host, the session that opened the table,
+changes its settings. Tables nobody has acted at for idle_timeout seconds
+are evicted, checked at most every sweep_interval seconds whenever
+tables are opened or listed, never on the path of a move.
+"""
+import contextlib
+import secrets
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from .engine import GameEngine
+from .rules import OUTCOMES
+from .strategy import Strategy
+
+# Join codes leave out characters that read alike (0/O, 1/I)
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 5
+IDLE_TIMEOUT = 4 * 60 * 60
+SWEEP_INTERVAL = 60
+
+class Table:
+    """One game and the sessions seated at it"""
+
+    def __init__(self, code: str, engine: GameEngine, name: str = "", host: Optional[str] = None):
+        self.code = code
+        self.engine = engine
+        self.name = name or code
+        # The client that set the game up and alone may change its settings
+        self.host = host
+        # Reentrant, so a page render can hold it while a callback in it acts
+        self.lock = threading.RLock()
+        # Seat -> client id, and the seats bots play
+        self.seats: Dict[int, str] = {}
+        self.bots: Dict[int, Strategy] = {}
+        self.archived = False
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self._summary: Optional[Dict] = None
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    @contextlib.contextmanager
+    def hold(self) -> Iterator[GameEngine]:
+        """The game, locked for one action"""
+        with self.lock:
+            try:
+                yield self.engine
+            finally:
+                self.touch()
+
+    def seat_of(self, client: str) -> Optional[int]:
+        for seat, owner in self.seats.items():
+            if owner == client:
+                return seat
+        return None
+
+    def free_seats(self) -> List[int]:
+        return [s for s in range(len(self.engine.players)) if s not in self.seats and s not in self.bots]
+
+    def join(self, client: str, seat: Optional[int] = None) -> int:
+        """Seat a client, keeping the seat it already has unless another is asked for"""
+        with self.hold():
+            current = self.seat_of(client)
+            if current is not None and seat in (None, current):
+                return current
+            free = self.free_seats()
+            if seat is None:
+                if not free:
+                    raise ValueError(f"Table {self.code} is full")
+                seat = free[0]
+            elif seat not in free:
+                raise ValueError(f"Seat {seat} at table {self.code} is taken")
+            if current is not None:
+                del self.seats[current]
+            self.seats[seat] = client
+            return seat
+
+    def leave(self, client: str):
+        with self.lock:
+            seat = self.seat_of(client)
+            if seat is not None:
+                del self.seats[seat]
+
+    def release_seats(self):
+        """Free every seat, e.g. when the host deals new industries"""
+        with self.lock:
+            self.seats.clear()
+
+    def mark_archived(self) -> bool:
+        """True the first time it is called, so a finished game is archived once whoever sees it end"""
+        with self.lock:
+            first = not self.archived
+            self.archived = True
+            return first
+
+    def status(self) -> str:
+        engine = self.engine
+        if engine.game_over:
+            return "game over"
+        if engine.true_up_due:
+            return "true-up due"
+        if engine.game_started:
+            return "playing"
+        return "waiting to start" if engine.players else "setting up"
+
+    def summary(self) -> Dict:
+        """Live state for the facilitator
+
+        Taken only if the table is free at that moment; while a move is in
+        progress the last summary is returned instead, so listing tables
+        never holds up a game.
+        """
+        if not self.lock.acquire(blocking=self._summary is None):
+            return dict(self._summary, idle=time.monotonic() - self.last_active)
+        try:
+            engine = self.engine
+            playing = engine.game_started and not engine.game_over and not engine.true_up_due
+            settlement = engine.settlement() if engine.players else None
+            self._summary = {
+                'code': self.code,
+                'name': self.name,
+                'status': self.status(),
+                'industries': len(engine.players),
+                'seated': len(self.seats),
+                'bots': len(self.bots),
+                'period': f"{engine.period + 1} of {engine.periods.n_periods}",
+                'turns': engine.turns,
+                'current': engine.current_player.name if playing else None,
+                'pollution': float(settlement['total']) if settlement else 0.0,
+                'cap': engine.cap,
+                'in_deficit': int((~settlement['compliant']).sum()) if settlement else 0,
+                'outcome': OUTCOMES[int(settlement['outcome'])] if engine.game_over else None,
+            }
+        finally:
+            self.lock.release()
+        return dict(self._summary, idle=time.monotonic() - self.last_active)
+
+class GameRegistry:
+    """Every table in the process, by join code; safe to share between sessions"""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT, sweep_interval: float = SWEEP_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._tables: Dict[str, Table] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def _new_code(self) -> str:
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if code not in self._tables:
+                return code
+
+    def create(self, engine: Optional[GameEngine] = None, name: str = "", host: Optional[str] = None) -> Table:
+        """Open a table for a game, a new one by default"""
+        self._sweep()
+        with self._lock:
+            table = Table(self._new_code(), engine if engine is not None else GameEngine(), name, host)
+            self._tables[table.code] = table
+        return table
+
+    def get(self, code: str) -> Table:
+        code = code.strip().upper()
+        with self._lock:
+            table = self._tables.get(code)
+        if table is None:
+            raise KeyError(f"No table {code}")
+        return table
+
+    def remove(self, code: str):
+        with self._lock:
+            self._tables.pop(code, None)
+
+    def tables(self) -> List[Table]:
+        """Open tables, oldest first"""
+        self._sweep()
+        with self._lock:
+            return list(self._tables.values())
+
+    def summaries(self) -> List[Dict]:
+        return [table.summary() for table in self.tables()]
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """Close the tables idle longer than idle_timeout; returns their codes"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [code for code, table in self._tables.items() if now - table.last_active > self.idle_timeout]
+            for code in idle:
+                del self._tables[code]
+            self._last_sweep = now
+        return idle
+
+    def _sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.evict_idle()
@@ -0,0 +1,88 @@
+"""Round-robin tournaments between bot strategies in the batch simulator
+
+Every ordered seating of the strategies (each strategy against each,
+itself included, in every seat) is one matchup of n_games games. Matchups
+run across a process pool like the parameter sweep, each seeded from
+(seed, matchup) so any one can be re-run alone. Results are pooled per
+strategy over every seat it filled.
+"""
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .board import Board, default_board
+from .rules import DEFAULT_MARKET_CAP, PERMIT_PRICE, PRODUCE_PRICE, OUTCOMES
+from .simulate import KIND_PRODUCE, simulate_games
+from .strategy import STRATEGIES, get_strategy
+
+def matchups(names: Sequence[str], n_firms: int = 2) -> List[tuple]:
+    """Every ordered seating of n_firms strategies"""
+    return list(itertools.product(names, repeat=n_firms))
+
+def _run_matchup(args) -> List[Dict]:
+    index, seating, n_games, market_cap, permit_price, seed, board, price_ceiling, supply_curve = args
+    strategies = [get_strategy(name) for name in seating]
+    result = simulate_games(n_games, market_cap, permit_price, seed=np.random.SeedSequence([seed, index]),
+                            board=board, n_firms=len(seating), price_ceiling=price_ceiling,
+                            supply_curve=supply_curve, strategies=strategies)
+    outcome = result.outcome
+    # A firm wins its table by staying compliant and keeping the most of its
+    # starting revenue, so Large and Small firms compete on equal terms; ties all win
+    kept = np.where(result.compliant, result.earnings / (KIND_PRODUCE[result.kinds] * PRODUCE_PRICE), -np.inf)
+    top = result.compliant & (kept == kept.max(axis=1, keepdims=True))
+    rows = []
+    for seat, name in enumerate(seating):
+        rows.append({
+            'strategy': name,
+            'games': result.n_games,
+            'wins': int(top[:, seat].sum()),
+            'outcomes': np.bincount(outcome, minlength=len(OUTCOMES)),
+            'compliant': int(result.compliant[:, seat].sum()),
+            'earnings': float(result.earnings[:, seat].sum()),
+        })
+    return rows
+
+def run_tournament(names: Optional[Sequence[str]] = None, n_games: int = 10_000, n_firms: int = 2,
+                   market_cap: int = DEFAULT_MARKET_CAP, permit_price: float = PERMIT_PRICE, seed: int = 0,
+                   processes: Optional[int] = None, board: Optional[Board] = None,
+                   price_ceiling: Optional[float] = None, supply_curve: str = "flat") -> pd.DataFrame:
+    """Play every matchup and return one row per strategy
+
+    win_rate is the share of its games in which the strategy stayed
+    compliant and kept the largest share of its starting revenue at its
+    table; the outcome rates are the shared results of those
+    games; compliance_rate and mean_final_earnings are its own.
+    """
+    names = list(names or STRATEGIES)
+    board = board or default_board()
+    tasks = [(i, seating, n_games, market_cap, permit_price, seed, board, price_ceiling, supply_curve)
+             for i, seating in enumerate(matchups(names, n_firms))]
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        cells = map(_run_matchup, tasks)
+        rows = [row for cell in cells for row in cell]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            rows = [row for cell in pool.map(_run_matchup, tasks, chunksize=chunksize) for row in cell]
+
+    table = []
+    for name in names:
+        mine = [row for row in rows if row['strategy'] == name]
+        games = sum(row['games'] for row in mine)
+        outcomes = sum(row['outcomes'] for row in mine) / games
+        table.append({
+            'strategy': name,
+            'games': games,
+            'win_rate': sum(row['wins'] for row in mine) / games,
+            'everyone_wins_rate': outcomes[0],
+            'partial_rate': outcomes[1],
+            'lose_rate': outcomes[2],
+            'compliance_rate': sum(row['compliant'] for row in mine) / games,
+            'mean_final_earnings': sum(row['earnings'] for row in mine) / games,
+        })
+    return pd.DataFrame(table)
@@ -1,647 +1,212 @@
+import contextlib
+import functools
+import io
+import secrets
 import streamlit as st
-import random
-import pandas as pd
 from typing import Dict, List, Optional, Callable
 
-def render_tile(tile_idx: int, tile: Dict):
-    """Render a single tile"""
-    players_here = [p for p in st.session_state.players if p.position == tile_idx]
-    player_indicators = " ".join(["⚫" if p.color == COLORS['red'] else "⚪" for p in players_here])
+from ets.rules import (
+    COLORS, PERMIT_PRICE, DEFAULT_MARKET_CAP, Player,
+    MARKET_CAP_RANGE, PERMIT_PRICE_RANGE, PERIODS_RANGE, PENALTY_RANGE, DEFAULT_PENALTY,
+    OUTCOMES, money, format_number, default_name
+)
+from ets.archive import GameArchive
+from ets.auction import parse_bid_curve
+from ets.board import Board, default_board, parse_board, ring_layout
+from ets.engine import GameEngine
+from ets.export import game_table, to_parquet_bytes
+from ets.orderbook import BUY, SELL
+from ets.periods import PeriodSchedule
+from ets.policy import BENCHMARK_POLICIES, advise, benchmark, warm
+from ets.pricing import SUPPLY_CURVES
+from ets.render import app_css, tile_html, player_card_html
+from ets.roster import Roster, ALLOCATION_METHODS, load_roster
+from ets.simulate import simulate_games
+from ets.strategy import STRATEGIES, Strategy, get_strategy
+from ets.tables import CODE_LENGTH, GameRegistry, Table
+
+# Player markers drawn on one tile before collapsing into a "+N" count
+MAX_TILE_MARKERS = 6
+# Player status cards per row
+STATUS_COLUMNS = 4
+MAX_INDUSTRIES = 300
+# Seconds between refreshes of a classroom table's turn panel and of the facilitator view
+TABLE_REFRESH = 2
+FACILITATOR_REFRESH = 5
+# Seconds between refreshes of the full standings, which a roll does not redraw
+STANDINGS_REFRESH = 5
+# Seconds between checks for a policy still solving behind the investment advice
+ADVICE_REFRESH = 1
+
+# Initialize session state
+def init_session_state():
+    defaults = {
+        'game': GameEngine(),
+        # Which seat this browser session holds at a classroom table
+        'client_id': secrets.token_hex(8),
+    }
     
-    text_color = 'white' if tile['color'] in [COLORS['black'], COLORS['dark_gray'], COLORS['cyan']] else 'black'
+    for key, value in defaults.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
     
-    st.markdown(f"""
-    <div class="tile-card" style="background-color:{tile['color']}; color:{text_color} !important; text-align: center; padding: 8px; border-radius: 8px; border: 2px solid #000; height: 80px; display: flex; flex-direction: column; justify-content: center; align-items: center; font-size: 0.75rem; font-weight: bold;">
-        <div style="line-height: 1.1; color: {text_color} !important;">{tile['text']}</div>
-        <div style="margin-top: 4px; font-size: 1rem; color: {text_color} !important;">{player_indicators}</div>
-    </div>
-    """, unsafe_allow_html=True)
+    # A session at a classroom table plays that table's game
+    table = current_table()
+    if table is not None:
+        st.session_state.game = table.engine
 
-# Page configuration
-st.set_page_config(
-    page_title="Gujarat ETS - Emission Trading Simulation",
-    page_icon="🌐",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+@st.cache_resource
+def game_registry() -> GameRegistry:
+    """Every classroom table in this server process, shared by every session"""
+    return GameRegistry()
 
-# JPAL Color Scheme
-COLORS = {
-    'black': '#000000',
-    'white': '#FFFFFF', 
-    'dark_gray': '#646464',
-    'medium_gray': '#919191',
-    'light_gray': '#CACACA',
-    'red': '#E35925',
-    'teal': '#2FAA9F',
-    'yellow': '#F4C300',
-    'green': '#4A9C65',
-    'cyan': '#2D616E'
-}
-
-# Game Parameters
-LARGE = {"produce": 10000.0, "pollution": 100000.0}
-SMALL = {"produce": 2000.0, "pollution": 20000.0}
-PERMIT_PRICE = 5.0
-PRODUCE_PRICE = 1000.0
-DEFAULT_MARKET_CAP = 200000
-INDUSTRY_ALLOCATION_PERCENT = 80
-MARKET_ALLOCATION_PERCENT = 20
-MAX_PERMIT_HOLDING_PERCENT = 150
-
-# Total number of tiles (0-15, so 16 tiles total)
-TOTAL_TILES = 16
-
-# Cached CSS to avoid re-rendering
-@st.cache_data
-def get_custom_css():
-    return f"""
-    <style>
-        /* Force light theme for the entire app */
-        .stApp {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-        }}
-
-        /* Universal text color override - most aggressive approach */
-        * {{
-            color: #000000 !important;
-        }}
-
-        /* Make only H1 white - override universal rule */
-        .main .block-container h1,
-        .main-header h1, 
-        .main-header p {{
-            color: #FFFFFF !important;
-        }}
-
-        /* Sidebar text should be black for better readability */
-        .css-1d391kg *,
-        .css-1d391kg .stMarkdown *, 
-        .css-1d391kg .stText *,
-        .css-1d391kg h1, .css-1d391kg h2, .css-1d391kg h3, 
-        .css-1d391kg h4, .css-1d391kg h5, .css-1d391kg h6,
-        .css-1d391kg p, .css-1d391kg div, .css-1d391kg span,
-        .css-1d391kg label,
-        section[data-testid="stSidebar"] *,
-        .stSidebar * {{
-            color: #000000 !important;
-            text-shadow: none !important;
-        }}
-
-        /* Fix input boxes to be white with black text like buttons */
-        .stNumberInput input,
-        .stTextInput input,
-        .stSelectbox select,
-        input[type="number"],
-        input[type="text"],
-        select {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Fix the +/- increment/decrement buttons on number inputs */
-        .stNumberInput button,
-        .stNumberInput [data-testid="stNumberInputStepUp"],
-        .stNumberInput [data-testid="stNumberInputStepDown"],
-        [data-testid="stNumberInput"] button,
-        input[type="number"]::-webkit-outer-spin-button,
-        input[type="number"]::-webkit-inner-spin-button {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Target the step buttons more specifically */
-        .step-up,
-        .step-down,
-        [class*="step"] {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Target Streamlit's input containers */
-        [data-testid="stNumberInput"] input,
-        [data-testid="stTextInput"] input,
-        [data-testid="stSelectbox"] select {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Also target the input wrapper divs */
-        .stNumberInput > div > div > input,
-        .stTextInput > div > div > input {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Target any input elements in the sidebar specifically */
-        .css-1d391kg input,
-        section[data-testid="stSidebar"] input,
-        .stSidebar input {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Also target sidebar +/- buttons */
-        .css-1d391kg button,
-        section[data-testid="stSidebar"] button,
-        .stSidebar button {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-        }}
-
-        /* Main content area - VERY aggressive black text enforcement */
-        .main .block-container *:not(.main-header *),
-        .main .element-container *,
-        .main [data-testid="stText"] *,
-        .main [data-testid="stMarkdown"] *,
-        .main [data-testid="stInfo"] *,
-        .main [data-testid="stWarning"] *,
-        .main [data-testid="stAlert"] *,
-        .main [data-testid="stSuccess"] *,
-        .main [data-testid="stError"] *,
-        .main div:not(.main-header *),
-        .main p:not(.main-header *),
-        .main span:not(.main-header *) {{
-            color: #000000 !important;
-        }}
-
-        /* Force all text elements in main to be black - nuclear option */
-        .main {{
-            color: #000000 !important;
-        }}
-        
-        .main * {{
-            color: #000000 !important;
-        }}
-
-        /* Re-override for header and sidebar after nuclear option */
-        .main-header,
-        .main-header * {{
-            color: #FFFFFF !important;
-        }}
-
-        /* Success/Error/Warning custom classes should keep their colors */
-        .success,
-        .success * {{
-            color: white !important;
-        }}
-        
-        .danger,
-        .danger * {{
-            color: white !important;
-        }}
-        
-        .warning,
-        .warning * {{
-            color: black !important;
-        }}
-
-                
-        /* Main content area */
-        .main .block-container {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-        }}
-        
-        /* Sidebar styling - more comprehensive selectors */
-        .css-1d391kg,
-        section[data-testid="stSidebar"],
-        .stSidebar {{
-            background-color: #FFFFFF !important;
-        }}
-        
-        /* Fix the top right toolbar/header bar to be white */
-        .stApp > header,
-        [data-testid="stHeader"],
-        .css-18e3th9,
-        .css-1544g2n,
-        .main > div:first-child,
-        .block-container > div:first-child {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-        }}
-
-        /* Target the specific top toolbar elements */
-        .stApp > header *,
-        [data-testid="stHeader"] *,
-        .css-18e3th9 *,
-        .css-1544g2n * {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-        }}
-
-        /* Also target any fixed position elements that might be the black bar */
-        [style*="position: fixed"],
-        [style*="position:fixed"] {{
-            background-color: #FFFFFF !important;
-            color: #000000 !important;
-        }}
-        
-        .main-header {{
-            background: linear-gradient(90deg, {COLORS['teal']}, {COLORS['cyan']});
-            padding: 1rem;
-            border-radius: 10px;
-            color: white !important;
-            text-align: center;
-            margin-bottom: 2rem;
-        }}
-        
-        .main-header h1, .main-header p {{
-            color: white !important;
-        }}
-        
-        .player-card {{
-            border: 2px solid {COLORS['medium_gray']};
-            border-radius: 10px;
-            padding: 1rem;
-            margin: 0.5rem 0;
-            background-color: #F8F9FA;
-            color: #000000 !important;
-        }}
-        
-        .player-card h3, .player-card p, .player-card strong {{
-            color: #000000 !important;
-        }}
-        
-        .active-player {{
-            border-color: {COLORS['green']};
-            background-color: #e8f5e8;
-            color: #000000 !important;
-        }}
-        
-        .active-player h3, .active-player p, .active-player strong {{
-            color: #000000 !important;
-        }}
-        
-        .finished-player {{
-            border-color: {COLORS['yellow']};
-            background-color: #fff8e1;
-            color: #000000 !important;
-        }}
-        
-        .finished-player h3, .finished-player p, .finished-player strong {{
-            color: #000000 !important;
-        }}
-        
-        .tile-card {{
-            border: 2px solid {COLORS['black']};
-            border-radius: 8px;
-            padding: 0.5rem;
-            margin: 0.2rem;
-            text-align: center;
-            font-size: 0.8rem;
-            font-weight: bold;
-            height: 80px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            flex-direction: column;
-        }}
-        
-        .metric-card {{
-            background-color: #F0F2F6;
-            padding: 1rem;
-            border-radius: 8px;
-            text-align: center;
-            color: #000000 !important;
-        }}
-        
-        .metric-card h2, .metric-card h4 {{
-            color: #000000 !important;
-        }}
-        
-        .success {{
-            background-color: {COLORS['green']};
-            color: white !important;
-            padding: 1rem;
-            border-radius: 8px;
-            text-align: center;
-        }}
-        
-        .warning {{
-            background-color: {COLORS['yellow']};
-            color: black !important;
-            padding: 1rem;
-            border-radius: 8px;
-            text-align: center;
-        }}
-        
-        .danger {{
-            background-color: {COLORS['red']};
-            color: white !important;
-            padding: 1rem;
-            border-radius: 8px;
-            text-align: center;
-        }}
-        
-        /* Primary buttons - Green for Start Game */
-        .stButton > button[kind="primary"] {{
-            background-color: {COLORS['green']} !important;
-            color: white !important;
-            border: none !important;
-            font-weight: bold;
-        }}
-        
-        
-        /* Style ONLY Buy Equipment and Skip Investment buttons */
-        div[data-testid="stButton"] > button[aria-label="buy_equipment_btn"],
-        div[data-testid="stButton"] > button[aria-label="skip_investment_btn"] {{
-            background-color: #f8f9fa !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-            font-weight: bold;}}
-        
-        /* All other buttons - Light background with black text for better contrast */
-        .stButton > button {{
-            background-color: #f8f9fa !important;
-            color: #000000 !important;
-            border: 2px solid #333333 !important;
-            font-weight: bold;
-        }}
-        
-        /* Force text color on all button text spans */
-        .stButton > button span {{
-            color: #000000 !important;
-        }}
-        
-        /* Override for primary and secondary button text */
-        .stButton > button[kind="primary"] span {{
-            color: white !important;
-        }}
-        
-        .stButton > button[kind="secondary"] span {{
-            color: white !important;
-        }}
-        
-        /* Hover effects */
-        .stButton > button:hover {{
-            opacity: 0.8;
-        }}
-        
-        /* Ensure dataframes are readable */
-        .dataframe {{
-            background-color: white !important;
-            color: black !important;
-        }}
-        
-        /* Metrics styling */
-        [data-testid="metric-container"] {{
-            background-color: #F0F2F6;
-            border: 1px solid #E1E5E9;
-            padding: 1rem;
-            border-radius: 8px;
-        }}
-        
-        [data-testid="metric-container"] > div {{
-            color: #000000 !important;
-        }}
-    </style>
-    """
+def current_table() -> Optional[Table]:
+    """The classroom table this session is at, if any"""
+    code = st.session_state.get('table_code')
+    if code is None:
+        return None
+    try:
+        return game_registry().get(code)
+    except KeyError:
+        # Closed after sitting idle; carry on with a game of our own
+        del st.session_state['table_code']
+        st.session_state.game = GameEngine()
+        return None
 
-# Helper functions
-def rint(x: float) -> int:
-    return int(round(x))
+def my_seat() -> Optional[int]:
+    """The seat this session holds, or None if it controls every seat (alone, hosting or facilitating)"""
+    table = current_table()
+    return None if table is None else table.seat_of(st.session_state.client_id)
 
-def money(x: float) -> str:
-    return f"₹{rint(x):,}"
+def hosting() -> bool:
+    """True if this session sets the game up: playing alone, or the host who opened its table"""
+    table = current_table()
+    return table is None or table.host == st.session_state.client_id
 
-def format_number(x: float) -> str:
-    return f"{rint(x):,}"
+def current_bots() -> Dict[int, Strategy]:
+    """The seats bots play, at this session's table or in its own game"""
+    table = current_table()
+    return table.bots if table is not None else st.session_state.get('bots', {})
 
-# Player class
-class Player:
-    def __init__(self, name: str, kind_dict: Dict, color: str, market_cap: int, num_players: int):
-        self.name = name
-        self.kind_name = "Large" if kind_dict is LARGE else "Small"
-        self.produce = float(kind_dict["produce"])
-        self.pollution = float(kind_dict["pollution"])
-        
-        # Calculate initial allocation
-        total_pollution = LARGE["pollution"] + SMALL["pollution"] if num_players == 2 else kind_dict["pollution"]
-        pollution_share = self.pollution / total_pollution if num_players == 2 else 1.0
-        industry_allocation = market_cap * (INDUSTRY_ALLOCATION_PERCENT / 100)
-        
-        self.initial_permits = rint(industry_allocation * pollution_share)
-        self.permits = self.initial_permits
-        self.max_permits = rint(self.initial_permits * (MAX_PERMIT_HOLDING_PERCENT / 100))
-        
-        self.revenue = self.produce * PRODUCE_PRICE
-        self.earnings = float(self.revenue)
-        self.total_cost = 0.0
-        self.permit_cost = 0.0
-        
-        self.position = 0
-        self.color = color
-        self.finished = False
-
-    def roll(self) -> int:
-        return random.randint(1, 6)
-
-# Effect functions
-def client_order_effect(p: Player, multiplier: float):
-    pre = p.produce
-    p.produce *= (1 + multiplier)
-    p.pollution *= (1 + multiplier)
-    p.earnings += multiplier * pre * PRODUCE_PRICE
-
-def abatement_effect(p: Player, cost: float, multiplier: float):
-    st.session_state.pending_investment = {
-        'player': p, 'cost': cost, 'multiplier': multiplier, 'type': 'abatement'
-    }
+def apply_bots():
+    """The host's choice of bot seats and strategy, for its game and table"""
+    bots = {seat: get_strategy(st.session_state.bot_strategy) for seat in st.session_state.bot_seats}
+    st.session_state.bots = bots
+    table = current_table()
+    if table is not None:
+        table.bots = bots
 
-def maintenance_effect(p: Player, cost: float, multiplier: float):
-    st.session_state.pending_investment = {
-        'player': p, 'cost': cost, 'multiplier': multiplier, 'type': 'maintenance'
-    }
+def table_lock():
+    table = current_table()
+    return table.lock if table is not None else contextlib.nullcontext()
 
-def cost_effect(p: Player, cost: float):
-    p.earnings -= cost
-    p.total_cost += cost
+def locked(fn: Callable) -> Callable:
+    """Hold the table's lock while fn runs; fragments rerun without main() and need it themselves"""
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with table_lock():
+            return fn(*args, **kwargs)
+    return run
 
-def tax_effect(p: Player):
-    loss = 200.0 * 0.5 * p.produce
-    p.earnings -= loss
-    p.total_cost += loss
+def action(fn: Callable) -> Callable:
+    """A callback that changes the game: one seat at a time per table, and the table counts as active"""
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        table = current_table()
+        if table is None:
+            return fn(*args, **kwargs)
+        with table.hold():
+            return fn(*args, **kwargs)
+    return run
 
-def order_cancel_effect(p: Player, multiplier: float):
-    pre = p.produce
-    p.produce *= multiplier
-    p.pollution *= multiplier
-    p.earnings -= (1 - multiplier) * pre * PRODUCE_PRICE
+def render_game_board(game: Optional[GameEngine] = None):
+    """Render the board ring as one CSS grid, GO in the bottom-left corner"""
+    if game is None:
+        st.header("Game Board")
+        game = st.session_state.game
+    tiles = game.board.tiles
+    rows, cols, cells = ring_layout(len(tiles))
+    
+    # One pass over the players instead of one scan per tile
+    occupants: Dict[int, List[Player]] = {}
+    for p in game.players:
+        occupants.setdefault(p.position, []).append(p)
+    
+    parts = [f'<div class="board-grid" style="grid-template-columns: repeat({cols}, 1fr); '
+             f'grid-template-rows: repeat({rows}, 80px);">']
+    for idx, (tile, (row, col)) in enumerate(zip(tiles, cells)):
+        here = occupants.get(idx, [])
+        markers = tuple(p.color == COLORS['red'] for p in here[:MAX_TILE_MARKERS])
+        overflow = max(0, len(here) - MAX_TILE_MARKERS)
+        parts.append(f'<div style="grid-row:{row + 1}; grid-column:{col + 1};">'
+                     f'{tile_html(tile["text"], tile["color"], markers, overflow)}</div>')
+    parts.append('</div>')
+    st.markdown("".join(parts), unsafe_allow_html=True)
 
-# Tile definitions - cached for better performance - Updated for 5x5 grid
-@st.cache_data
-def get_tile_rules():
-    return [
-        {"text": "Uniform Auction GO\nTrue-up period", "color": COLORS['light_gray']},  # 0 (corner)
-        {"text": "Unseasonal Rains\nPollution -0.1%", "color": COLORS['white']},      # 1
-        {"text": "CEMS Issue\nEmissions +20%", "color": COLORS['white']},           # 2
-        {"text": "Client Order\nProduction +30%", "color": COLORS['white']},        # 3
-        {"text": "Abatement\n₹20L, -40%", "color": COLORS['teal']},                 # 4 (corner)
-        {"text": "Advanced Abate\n₹40L, -60%", "color": COLORS['teal']},            # 5
-        {"text": "CEMS Issue\nEmissions +10%", "color": COLORS['white']},           # 6
-        {"text": "Bird's Nest\nPay ₹5,000", "color": COLORS['white']},              # 7
-        {"text": "Client Order\nProduction +10%", "color": COLORS['white']},        # 8 (corner)
-        {"text": "Tax Issue\n50% at ₹800", "color": COLORS['white']},               # 9
-        {"text": "CEMS Issue\nEmissions +30%", "color": COLORS['white']},           # 10
-        {"text": "Hire Additional Maintenance\n₹1L, -10%", "color": COLORS['teal']}, # 11
-        {"text": "Hire Additional Maintenance Staff\n₹1.5L, -15%", "color": COLORS['teal']}, # 12 (corner)
-        {"text": "Client Order Cancel, -5%", "color": COLORS['white']},             # 13
-        {"text": "CEMS Data Quality Issue\nImputation, +10%", "color": COLORS['white']}, # 14
-        {"text": "Client Order Cancel, -5%", "color": COLORS['white']},             # 15
-    ]
+def render_player_card(i: int):
+    """Render one player status card"""
+    game = st.session_state.game
+    player = game.players[i]
+    is_active = (i == game.current_turn and
+                game.game_started and
+                not game.game_over)
 
-def get_tile_effects():
-    return [
-        lambda p: None,  # GO
-        lambda p: setattr(p, "pollution", p.pollution * 0.999),  # Rain
-        lambda p: setattr(p, "pollution", p.pollution * 1.20),   # CEMS +20%
-        lambda p: client_order_effect(p, 0.30),                  # Client +30%
-        lambda p: abatement_effect(p, 2000000, 0.6),            # Abatement
-        lambda p: abatement_effect(p, 4000000, 0.4),            # Advanced
-        lambda p: setattr(p, "pollution", p.pollution * 1.10),  # CEMS +10%
-        lambda p: cost_effect(p, 5000),                         # Bird's Nest
-        lambda p: client_order_effect(p, 0.10),                 # Client +10%
-        lambda p: tax_effect(p),                                # Tax
-        lambda p: setattr(p, "pollution", p.pollution * 1.30),  # CEMS +30%
-        lambda p: maintenance_effect(p, 100000, 0.9),           # Maintenance
-        lambda p: maintenance_effect(p, 150000, 0.85),          # Maintenance Staff
-        lambda p: order_cancel_effect(p, 0.95),                 # Order Cancel
-        lambda p: setattr(p, "pollution", p.pollution * 1.10),  # Data Quality
-        lambda p: order_cancel_effect(p, 0.95),                 # Order Cancel
-    ]
+    # Determine card class based on player status
+    if player.finished:
+        card_class = "finished-player"
+        status_icon = "🟢"
+    elif is_active:
+        card_class = "active-player"
+        status_icon = "🟩"
+    else:
+        card_class = "player-card"
+        status_icon = ""
 
-# Initialize session state
-def init_session_state():
-    defaults = {
-        'players': [],
-        'current_turn': 0,
-        'market_permits': 0,
-        'game_started': False,
-        'game_over': False,
-        'tile_rules': get_tile_rules(),
-        'tile_effects': get_tile_effects(),
-        'pending_investment': None,
-        'last_roll': None,
-        'game_log': [],
-        'roll_again_required': False,
-        'roll_was_too_high': False
-    }
-    
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+    st.markdown(player_card_html(
+        card_class,
+        f"{player.name} ({player.kind_name}) {status_icon}",
+        player.position,
+        format_number(player.produce),
+        format_number(player.pollution),
+        f"{player.permits:,} / {player.max_permits:,}",
+        money(player.revenue),
+        money(player.earnings),
+        player.finished,
+    ), unsafe_allow_html=True)
 
-def render_game_board():
-    """Render the game board as a 5x5 square grid using Streamlit columns"""
-    st.header("Game Board")
-    
-    tiles = st.session_state.tile_rules
-    
-    # Create a 5x5 grid layout
-    # The board follows this pattern (like Monopoly):
-    # Row 1 (top): tiles 12, 11, 10, 9, 8 (reverse order)
-    # Row 2: tile 13, empty, empty, empty, 7
-    # Row 3: tile 14, empty, empty, empty, 6
-    # Row 4: tile 15, empty, empty, empty, 5
-    # Row 5 (bottom): tiles 0, 1, 2, 3, 4 (normal order)
-    
-    # Row 1 (top): tiles 12, 11, 10, 9, 8
-    cols1 = st.columns(5)
-    top_tiles = [12, 11, 10, 9, 8]
-    for i, tile_idx in enumerate(top_tiles):
-        with cols1[i]:
-            render_tile(tile_idx, tiles[tile_idx])
-    
-    # Row 2: tile 13, empty, empty, empty, 7
-    cols2 = st.columns(5)
-    with cols2[0]:
-        render_tile(13, tiles[13])
-    for i in range(1, 4):
-        with cols2[i]:
-            st.markdown('<div style="height: 80px;"></div>', unsafe_allow_html=True)
-    with cols2[4]:
-        render_tile(7, tiles[7])
-    
-    # Row 3: tile 14, empty, empty, empty, 6
-    cols3 = st.columns(5)
-    with cols3[0]:
-        render_tile(14, tiles[14])
-    for i in range(1, 4):
-        with cols3[i]:
-            st.markdown('<div style="height: 80px;"></div>', unsafe_allow_html=True)
-    with cols3[4]:
-        render_tile(6, tiles[6])
-    
-    # Row 4: tile 15, empty, empty, empty, 5
-    cols4 = st.columns(5)
-    with cols4[0]:
-        render_tile(15, tiles[15])
-    for i in range(1, 4):
-        with cols4[i]:
-            st.markdown('<div style="height: 80px;"></div>', unsafe_allow_html=True)
-    with cols4[4]:
-        render_tile(5, tiles[5])
-    
-    # Row 5 (bottom): tiles 0, 1, 2, 3, 4
-    cols5 = st.columns(5)
-    bottom_tiles = [0, 1, 2, 3, 4]
-    for i, tile_idx in enumerate(bottom_tiles):
-        with cols5[i]:
-            render_tile(tile_idx, tiles[tile_idx])
+def render_player_cards(seats: List[int]):
+    """Render the given players' cards in rows"""
+    n_cols = min(len(seats), STATUS_COLUMNS)
+    for k, i in enumerate(seats):
+        if k % n_cols == 0:
+            cols = st.columns(n_cols)
+        with cols[k % n_cols]:
+            render_player_card(i)
 
 def render_player_status():
     """Render player status cards"""
     st.header("Industry Status")
-    
-    cols = st.columns(2)
-    for i, player in enumerate(st.session_state.players):
-        with cols[i]:
-            is_active = (i == st.session_state.current_turn and 
-                        st.session_state.game_started and 
-                        not st.session_state.game_over)
-            
-            # Determine card class based on player status
-            if player.finished:
-                card_class = "finished-player"
-                status_icon = "🟢"
-            elif is_active:
-                card_class = "active-player"
-                status_icon = "🟩"
-            else:
-                card_class = "player-card"
-                status_icon = ""
-            
-            st.markdown(f"""
-            <div class="{card_class}">
-                <h3>{player.name} ({player.kind_name}) {status_icon}</h3>
-                <p><strong>Position:</strong> Tile {player.position}</p>
-                <p><strong>Production:</strong> {format_number(player.produce)} units</p>
-                <p><strong>Pollution:</strong> {format_number(player.pollution)} kg</p>
-                <p><strong>Permits:</strong> {player.permits:,} / {player.max_permits:,}</p>
-                <p><strong>Revenue:</strong> {money(player.revenue)}</p>
-                <p><strong>Earnings:</strong> {money(player.earnings)}</p>
-                {"<p><strong>Status:</strong> Finished the round!</p>" if player.finished else ""}
-            </div>
-            """, unsafe_allow_html=True)
 
-def render_market_status(market_cap: int, permit_price: float):
+    game = st.session_state.game
+    render_player_cards(list(range(len(game.players))))
+
+# Every card of a large roster is too much to redraw per roll, so the standings keep their own time
+standings_panel = st.fragment(run_every=STANDINGS_REFRESH)(locked(render_player_status))
+
+def render_market_status():
     """Render market status"""
     st.header("Market Status")
     
+    game = st.session_state.game
+    # The game's own cap, which in a multi-year game tightens period by period
+    market_cap = game.cap
+    if game.periods.multi:
+        st.caption(f"Compliance period {game.period + 1} of {game.periods.n_periods}")
     cols = st.columns(3)
     metrics = [
         ("Market Cap", f"{format_number(market_cap)} kg"),
-        ("Available Permits", f"{st.session_state.market_permits:,}"),
-        ("Permit Price", f"₹{permit_price:.1f}")
+        ("Available Permits", f"{st.session_state.game.market_permits:,}"),
+        ("Permit Price", f"₹{st.session_state.game.current_price:.2f}")
     ]
     
     for col, (title, value) in zip(cols, metrics):
@@ -653,96 +218,61 @@ def render_market_status(market_cap: int, permit_price: float):
             </div>
             """, unsafe_allow_html=True)
 
-def handle_dice_roll():
-    """Handle dice rolling logic with single round completion"""
-    current_player = st.session_state.players[st.session_state.current_turn]
-    roll = current_player.roll()
-    st.session_state.last_roll = roll
-    
-    # Calculate potential new position
-    old_pos = current_player.position
-    potential_new_pos = current_player.position + roll
-    
-    # Check if player would go past the final tile (15) or reach/exceed GO (0) after starting
-    if old_pos > 0 and potential_new_pos >= TOTAL_TILES:
-        # Player would complete the circuit or go beyond
-        if potential_new_pos == TOTAL_TILES:
-            # Exactly reaches GO - game ends for this player
-            current_player.position = 0  # Set to GO
-            current_player.finished = True
-            
-            # Apply GO tile effect (if any)
-            st.session_state.tile_effects[0](current_player)
-            
-            st.session_state.game_log.append(f"{current_player.name} rolled {roll} and completed the round at GO/True-up!")
-            
-            # Check if all players have finished
-            if all(p.finished for p in st.session_state.players):
-                st.session_state.game_over = True
-                st.session_state.game_log.append("All players have completed the round! Game Over!")
-            else:
-                # Move to next player
-                st.session_state.current_turn = (st.session_state.current_turn + 1) % 2
-                # Skip finished players
-                while st.session_state.players[st.session_state.current_turn].finished and not st.session_state.game_over:
-                    st.session_state.current_turn = (st.session_state.current_turn + 1) % 2
-            
-        else:
-            # Roll was too high - player must roll again
-            st.session_state.roll_again_required = True
-            st.session_state.roll_was_too_high = True
-            tiles_needed = TOTAL_TILES - current_player.position
-            st.session_state.game_log.append(f"{current_player.name} rolled {roll} but needs exactly {tiles_needed} to reach GO. Must roll again!")
-            return  # Don't advance turn
+def render_order_book():
+    """Render best bid/ask levels and the most recent firm-to-firm trades"""
+    book = st.session_state.game.book
+    if not book.orders and not book.tape:
+        return
     
-    else:
-        # Normal move within the board
-        current_player.position = potential_new_pos
-        
-        # Apply tile effect
-        st.session_state.tile_effects[current_player.position](current_player)
-        
-        # Normalize values
-        current_player.produce = float(rint(current_player.produce))
-        current_player.pollution = float(rint(current_player.pollution))
-        
-        # Log the move
-        tile_name = st.session_state.tile_rules[current_player.position]["text"].split('\n')[0]
-        st.session_state.game_log.append(f"{current_player.name} rolled {roll} and moved to {tile_name}")
-        
-        # Reset roll again flags
-        st.session_state.roll_again_required = False
-        st.session_state.roll_was_too_high = False
-        
-        # Next turn (only if game isn't over)
-        if not st.session_state.game_over:
-            st.session_state.current_turn = (st.session_state.current_turn + 1) % 2
-            # Skip finished players
-            while st.session_state.players[st.session_state.current_turn].finished and not st.session_state.game_over:
-                st.session_state.current_turn = (st.session_state.current_turn + 1) % 2
-
-def render_final_results(market_cap: int):
+    st.subheader("Order Book")
+    depth = book.depth()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("**Bids**")
+        for price, qty in depth[BUY]:
+            st.text(f"₹{price:.2f}  ×  {qty:,}")
+    with col2:
+        st.markdown("**Asks**")
+        for price, qty in depth[SELL]:
+            st.text(f"₹{price:.2f}  ×  {qty:,}")
+    with col3:
+        st.markdown("**Recent Trades**")
+        players = st.session_state.game.players
+        for trade in list(book.tape)[-5:]:
+            st.text(f"{trade.qty:,} @ ₹{trade.price:.2f} ({players[trade.seller].name} → {players[trade.buyer].name})")
+
+def render_final_results():
     """Render final game results"""
+    import pandas as pd
+
     st.header("Final Results")
     
-    total_pollution = sum(p.pollution for p in st.session_state.players)
-    total_permits = sum(p.permits for p in st.session_state.players)
-    all_compliant = all(p.pollution <= p.permits for p in st.session_state.players)
+    game = st.session_state.game
+    players = game.players
+    history = game.history
+    # Every firm settled in one pass, as the simulator and the archive do;
+    # a multi-year game is judged on all its periods together
+    settlement = game.settlement()
+    market_cap = sum(h['cap'] for h in history) if history else game.market_cap
+    outcome = OUTCOMES[settlement['outcome']]
     
     # Results summary
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Total Pollution", f"{format_number(total_pollution)} kg")
-        st.metric("Total Permits", f"{format_number(total_permits)}")
+        st.metric("Total Pollution", f"{format_number(settlement['total'])} kg")
+        if history:
+            st.metric("Total Penalties", money(settlement['penalty'].sum()))
+        else:
+            st.metric("Total Permits", f"{format_number(game.column('permits').sum())}")
     
     with col2:
-        st.metric("Market Cap", f"{format_number(market_cap)} kg")
-        excess = max(0, total_pollution - market_cap)
-        st.metric("Excess Pollution", f"{format_number(excess)} kg")
+        st.metric(f"Market Cap over {len(history)} Periods" if history else "Market Cap",
+                  f"{format_number(market_cap)} kg")
+        st.metric("Excess Pollution", f"{format_number(settlement['excess'])} kg")
     
     # Victory conditions
-    if total_pollution <= market_cap:
-        if all_compliant:
+    if outcome != "EVERYONE LOSES":
+        if outcome == "EVERYONE WINS":
             st.markdown("""
             <div class="success">
                 EVERYONE WINS!<br>
@@ -767,32 +297,540 @@ def render_final_results(market_cap: int):
         </div>
         """, unsafe_allow_html=True)
     
-    # Detailed player results
-    st.subheader("Player Details")
-    results_data = []
-    for player in st.session_state.players:
-        compliance = "Compliant" if player.pollution <= player.permits else "Deficit"
-        deficit = max(0, player.pollution - player.permits)
-        
-        results_data.append({
-            "Industry": player.name,
-            "Type": player.kind_name,
-            "Pollution (kg)": format_number(player.pollution),
-            "Permits": format_number(player.permits),
-            "Status": compliance,
-            "Deficit (kg)": format_number(deficit) if deficit > 0 else "0",
-            "Final Earnings": money(player.earnings)
-        })
+    if history:
+        st.subheader("Compliance Periods")
+        periods_df = pd.DataFrame([{
+            "Period": h['period'] + 1,
+            "Cap (kg)": format_number(h['cap']),
+            "Emissions (kg)": format_number(h['emissions']),
+            "Banked": format_number(h['banked']),
+            "Borrowed": format_number(h['borrowed']),
+            "Uncovered (kg)": format_number(h['uncovered']),
+            "Penalties": money(h['penalties']),
+            "Outcome": OUTCOMES[h['outcome']].title(),
+        } for h in history])
+        if game.periods.make_good:
+            periods_df.insert(6, "Made Good", [format_number(h['make_good']) for h in history])
+        st.dataframe(periods_df, use_container_width=True)
     
-    results_df = pd.DataFrame(results_data)
+    # Detailed player results, a column at a time
+    st.subheader("Player Details")
+    compliant = settlement['compliant']
+    if history:
+        status = {
+            "Status": ["Compliant" if ok else f"Short in {n} of {len(history)} periods"
+                       for ok, n in zip(compliant.tolist(), game.column('breaches', int).tolist())],
+            "Penalties": [money(x) for x in settlement['penalty'].tolist()],
+        }
+    else:
+        status = {
+            "Status": ["Compliant" if ok else "Deficit" for ok in compliant.tolist()],
+            "Deficit (kg)": [format_number(x) for x in settlement['deficit'].tolist()],
+            "Penalty Due": [money(x) for x in settlement['penalty'].tolist()],
+        }
+    results_df = pd.DataFrame({
+        "Industry": [p.name for p in players],
+        "Type": [p.kind_name for p in players],
+        "Pollution (kg)": [format_number(x) for x in game.column('pollution').tolist()],
+        "Permits": [format_number(x) for x in game.column('permits').tolist()],
+        **status,
+        "Final Earnings": [money(x) for x in game.column('earnings').tolist()],
+    })
     st.dataframe(results_df, use_container_width=True)
 
+    # Typed numbers for analysis, rather than the formatted strings above
+    try:
+        data = to_parquet_bytes(game_table(game))
+    except ImportError as e:
+        st.caption(str(e))
+    else:
+        st.download_button("Download Results (Parquet)", data, file_name=f"ets-game-{game.seed}.parquet",
+                           mime="application/vnd.apache.parquet")
+
+    # A policy takes a second or two to solve the first time, so only on request, and off the page's run
+    if st.toggle("Compare with optimal play", key="optimal_benchmark"):
+        rows = benchmark(game, block=False)
+        if rows is None:
+            pending_benchmark_panel()
+        else:
+            render_benchmark(game, rows)
+
+def render_benchmark(game: GameEngine, rows: List[Dict]):
+    import pandas as pd
+
+    st.dataframe(pd.DataFrame([{
+        "Industry": row['name'],
+        "Final Earnings": money(game.players[row['seat']].earnings),
+        "Optimal Expected Earnings": money(row['earnings']),
+        "Optimal Compliance Chance": f"{row['compliance']:.0%}",
+    } for row in rows]), use_container_width=True)
+    st.caption("Optimal play is each firm's best investment policy from the same start, playing this "
+               "board alone at the floor price."
+               + (f" Only the {len(rows)} industries with the first {BENCHMARK_POLICIES} distinct starts are compared."
+                  if len(rows) < len(game.players) else ""))
+
+@st.fragment(run_every=ADVICE_REFRESH)
+@locked
+def pending_benchmark_panel():
+    """Waits on the optimal policies solving in the background, then redraws the page with them"""
+    if benchmark(st.session_state.game, block=False) is None:
+        st.caption("Solving optimal policies…")
+    else:
+        st.rerun()
+
+def advice_text(outlook: Dict[str, float]) -> str:
+    return (f"Expected: {outlook['compliance']:.0%} chance of ending compliant, "
+            f"{money(outlook['earnings'])} final earnings")
+
+def render_advice(advice: Dict[str, Dict[str, float]]):
+    """Expected outcome of buying and of skipping, under the matching buttons"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption(advice_text(advice['buy']) if 'buy' in advice else "Not affordable")
+    with col2:
+        st.caption(advice_text(advice['skip']))
+
+@st.fragment(run_every=ADVICE_REFRESH)
+@locked
+def pending_advice_panel():
+    """Advice for an offer whose policy is still solving; fills in without rerunning the turn panel"""
+    game = st.session_state.game
+    if game.pending_investment is None:
+        return
+    advice = advise(game, block=False)
+    if advice is None:
+        st.caption("Advice computing…")
+    else:
+        render_advice(advice)
+
+# Widget callbacks run before the fragment redraws, so panels never need an explicit rerun.
+# At a classroom table another seat may have moved since this page was drawn, so each
+# callback checks the game is still where the click expected it.
+@action
+def buy_from_regulator(i: int):
+    game = st.session_state.game
+    qty = st.session_state[f"permits_{i}"]
+    if qty > 0:
+        try:
+            game.buy_permits(i, qty)
+        except ValueError as e:
+            st.session_state.order_error = str(e)
+        else:
+            st.session_state.trade_parties = [i]
+
+@action
+def place_limit_order(i: int):
+    game = st.session_state.game
+    try:
+        _, trades = game.place_order(i, st.session_state.order_side, st.session_state.order_price,
+                                     int(st.session_state.order_qty))
+    except ValueError as e:
+        st.session_state.order_error = str(e)
+    else:
+        parties = [i] + [t.seller if t.buyer == i else t.buyer for t in trades]
+        st.session_state.trade_parties = list(dict.fromkeys(parties))
+
+@action
+def cancel_order(order_id: int):
+    st.session_state.game.cancel_order(order_id)
+
+@action
+def roll_dice(mover: int):
+    game = st.session_state.game
+    if (game.game_over or game.true_up_due or game.pending_investment is not None
+            or game.current_turn != mover):
+        return
+    game.roll()
+    st.session_state.last_mover = mover
+
+@action
+def decide_investment(seat: int, buy: bool):
+    game = st.session_state.game
+    if game.pending_investment is not None and game.pending_investment['player'] == seat:
+        game.decide_investment(buy)
+
+@action
+def close_period():
+    game = st.session_state.game
+    if not game.true_up_due:
+        return
+    game.close_period()
+    # Every firm is back on GO, or the game is over
+    st.session_state.pop('last_mover', None)
+    st.session_state.refresh_page = True
+
+@action
+def undo_action():
+    game = st.session_state.game
+    if game.undo():
+        st.session_state.pop('last_mover', None)
+        st.session_state.pop('trade_parties', None)
+        st.session_state.refresh_page = True
+
+@st.fragment
+@locked
+def trading_panel():
+    """Market status, the order book and trade entry, plus the cards of the firms that last traded"""
+    game = st.session_state.game
+    render_market_status()
+    render_order_book()
+
+    if not game.game_started or game.game_over:
+        return
+
+    st.subheader("Permit Trading")
+
+    # Only allow trading for active players; in the true-up window every firm
+    # may still cover its period's emissions from the pool
+    truing_up = game.true_up_due
+    active = [i for i, p in enumerate(game.players) if truing_up or not p.finished]
+    # A seated player trades for their own industry only
+    seat = my_seat()
+    if seat is not None:
+        active = [i for i in active if i == seat]
+        if not active:
+            st.text("Your industry has finished this period")
+            return
+    i = st.selectbox("Industry", active, format_func=lambda i: game.players[i].name, key="trade_player")
+    player = game.players[i]
+    max_possible = game.max_buyable(i)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Buy from Regulator**")
+        if max_possible > 0:
+            qty = st.number_input(f"Permits for {player.name}",
+                                min_value=0,
+                                max_value=max_possible,
+                                key=f"permits_{i}")
+
+            st.caption(f"Cost at current scarcity: {money(game.pricing.quote(qty))}")
+            st.button(f"Buy {qty} permits", key=f"buy_{i}", on_click=buy_from_regulator, args=(i,))
+        else:
+            st.text(f"{player.name}: No permits available")
+
+    with col2:
+        # Limit orders against other industries
+        st.markdown("**Trade with Industries**")
+        if truing_up:
+            st.text("Reopens with the next period")
+        else:
+            st.radio("Side", [BUY, SELL], horizontal=True, format_func=str.title, key="order_side")
+            st.number_input("Limit Price (₹)", min_value=0.5, value=float(game.permit_price), step=0.5,
+                            key="order_price")
+            st.number_input("Quantity", min_value=1, value=100, step=100, key="order_qty")
+            st.button("Place Order", on_click=place_limit_order, args=(i,))
+            if 'order_error' in st.session_state:
+                st.error(st.session_state.pop('order_error'))
+            for order in game.book.open_orders(i):
+                st.button(f"Cancel {order.side} {order.remaining:,} @ ₹{order.price:.2f}", key=f"cancel_{order.id}",
+                          on_click=cancel_order, args=(order.id,))
+
+    parties = st.session_state.get('trade_parties')
+    if parties:
+        render_player_cards(parties)
+
+def game_phase(game: GameEngine) -> tuple:
+    """What the page outside the turn panel depends on"""
+    return game.game_started, game.period, game.true_up_due, game.game_over
+
+@locked
+def _turn_panel():
+    """Dice, the pending investment, the board, the active industries and the log
+
+    A roll reruns only this fragment, which redraws only the cards of the
+    seat that moved and the seat to move; the full standings refresh on
+    their own timer. The whole page reruns only when the game changes
+    phase: it starts, a period is up for true-up or closes, or the game ends.
+    """
+    if st.session_state.pop('refresh_page', False):
+        st.rerun()
+    game = st.session_state.game
+    table = current_table()
+    seat = my_seat()
+
+    # Bots move as soon as the game reaches them
+    bots = current_bots()
+    if bots:
+        game.play_bots(bots)
+
+    # A roll here, a bot or another seat at a classroom table may have moved
+    # the game on to a new phase, which this whole page catches up with
+    if game_phase(game) != st.session_state.get('page_phase'):
+        st.rerun()
+
+    if game.true_up_due:
+        # Firms may still buy from the pool until the facilitator trues the period up
+        st.info(f"Every industry has finished period {game.period + 1}. Buy any permits still needed, "
+                "then true up: uncovered emissions are penalised.")
+        st.button(f"True Up Period {game.period + 1}", type="primary", on_click=close_period)
+    elif game.game_started and not game.game_over:
+        # The turn ring only holds unfinished players
+        current_player = game.current_player
+
+        # Show appropriate button text based on roll status
+        if game.roll_again_required:
+            if game.roll_was_too_high:
+                button_text = f"🎲 {current_player.name}: Roll Again (Previous roll too high!)"
+                st.warning(f"Roll was too high! {current_player.name} needs to roll exactly {game.board.n_tiles - current_player.position} to reach GO.")
+            else:
+                button_text = f"🎲 {current_player.name}: Roll Again"
+        else:
+            button_text = f"🎲 {current_player.name}: Roll Dice"
+
+        st.button(button_text, type="secondary", on_click=roll_dice, args=(game.current_turn,),
+                  disabled=seat is not None and seat != game.current_turn)
+    
+    # Only whoever runs the table can take moves back
+    if game.game_started and seat is None:
+        st.button("↩ Undo Last Action", key="undo_btn", on_click=undo_action)
+
+    # Handle pending investments
+    if game.pending_investment:
+        investment = game.pending_investment
+        player = game.players[investment['player']]
+        cost = investment['cost']
+        multiplier = investment['multiplier']
+        inv_type = investment['type']
+
+        reduction = int((1 - multiplier) * 100)
+
+        st.warning(f"Investment Decision for {player.name}")
+        col1, col2 = st.columns(2)
+        theirs = seat is not None and seat != investment['player']
+
+        with col1:
+            st.button(f"Buy {inv_type.title()} Equipment", key="buy_equipment_btn",
+                      on_click=decide_investment, args=(investment['player'], True), disabled=theirs)
+
+        with col2:
+            st.button("Skip Investment", key="skip_investment_btn",
+                      on_click=decide_investment, args=(investment['player'], False), disabled=theirs)
+
+        # Expected outcome of each choice under optimal play from here, read from the solved
+        # policy; one still solving is left to a background thread rather than wait for it here
+        advice = advise(game, block=False)
+        if advice is None:
+            pending_advice_panel()
+        else:
+            render_advice(advice)
+
+        st.info(f"Cost: {money(cost)} | Pollution Reduction: {reduction}% | Current Earnings: {money(player.earnings)}")
+
+    # Display last roll
+    if game.last_roll:
+        st.success(f"Last roll: {game.last_roll}")
+
+    # Display current turn info
+    if game.game_started and not game.game_over and not game.true_up_due:
+        current_player = game.current_player
+        st.info(f"Current turn: {current_player.name}")
+
+        # Show position info for current player
+        tiles_to_go = game.board.n_tiles - current_player.position
+        if tiles_to_go <= 6:
+            st.warning(f"ⓘ {current_player.name} needs exactly {tiles_to_go} to reach GO!")
+
+    render_game_board()
+
+    if game.game_started and not game.game_over and not game.true_up_due:
+        mover = st.session_state.get('last_mover')
+        seats = [mover, game.current_turn] if mover is not None and mover != game.current_turn else [game.current_turn]
+        st.subheader("Active Industries")
+        render_player_cards(seats)
+
+    # Game log
+    log = game.recent_log(5)
+    if log:
+        st.header("Game Log")
+        for log_entry in log:
+            st.text(log_entry)
+
+turn_panel = st.fragment(_turn_panel)
+# At a classroom table the panel also redraws on a timer, to show the other seats' moves
+table_turn_panel = st.fragment(run_every=TABLE_REFRESH)(_turn_panel)
+
+@st.fragment
+@locked
+def timeline_panel():
+    """Scrub back through the game turn by turn, for debriefs"""
+    import pandas as pd
+
+    game = st.session_state.game
+    turn = st.slider("Turn", 0, game.turns, game.turns, key="timeline_turn")
+    past = game if turn == game.turns else game.state_at_turn(turn)
+    seq = game.events.count if turn == game.turns else game.events.seq_of_turn(turn)
+    
+    render_game_board(past)
+    st.dataframe(pd.DataFrame([
+        {
+            "Industry": p['name'],
+            "Tile": p['position'],
+            "Pollution (kg)": format_number(p['pollution']),
+            "Permits": format_number(p['permits']),
+            "Earnings": money(p['earnings']),
+        }
+        for p in past.state()['players']
+    ]), use_container_width=True, hide_index=True)
+    for log_entry in game.recent_log(5, before=seq):
+        st.text(log_entry)
+
+def render_instrumentation():
+    """Hit and miss counters for the rendered-HTML caches"""
+    with st.sidebar.expander("Instrumentation"):
+        for name, cache in (("Tile HTML", tile_html), ("Player cards", player_card_html)):
+            info = cache.cache_info()
+            lookups = info.hits + info.misses
+            hit_rate = f"{info.hits / lookups:.0%}" if lookups else "-"
+            st.text(f"{name}: {info.hits:,} hits, {info.misses:,} misses ({hit_rate})")
+            st.caption(f"{info.currsize:,} of {info.maxsize:,} entries")
+
+@st.cache_data
+def estimate_outcome_odds(market_cap: int, permit_price: float, board_source: Optional[tuple] = None,
+                          price_ceiling: Optional[float] = None, supply_curve: str = "flat",
+                          periods: Optional[Dict] = None) -> Dict[str, float]:
+    """Monte Carlo odds of each final outcome for the current settings"""
+    board = load_board_source(*board_source) if board_source else None
+    # Long games cost a pass per period, so fewer of them keep the estimate quick
+    n_periods = periods['n_periods'] if periods else 1
+    result = simulate_games(max(20_000, 200_000 // n_periods), market_cap, permit_price, invest_prob=0.5, seed=0,
+                            board=board, price_ceiling=price_ceiling, supply_curve=supply_curve,
+                            periods=PeriodSchedule(**periods) if periods else None)
+    return result.outcome_probabilities()
+
+@st.cache_resource
+def load_board_source(text: str, fmt: str) -> Board:
+    """Compile an uploaded board spec once per distinct source"""
+    return parse_board(text, fmt)
+
+@st.cache_resource
+def load_roster_source(data: bytes, fmt: str) -> Roster:
+    """Parse an uploaded roster once per distinct file"""
+    return load_roster(io.BytesIO(data), fmt)
+
+@st.cache_resource
+def game_archive() -> GameArchive:
+    """One write-behind archive of finished games, shared by every session"""
+    return GameArchive()
+
+def render_archive_summary():
+    """Archived games per market cap and outcome"""
+    archive = game_archive()
+    with st.sidebar.expander("Game Archive"):
+        if archive.error is not None:
+            st.error(f"Archive write failed: {archive.error}")
+        counts = archive.outcome_counts()
+        if counts:
+            import pandas as pd
+            st.dataframe(pd.DataFrame.from_dict(counts, orient="index").rename_axis("Market Cap"))
+        else:
+            st.caption("No finished games yet")
+
+def render_classroom():
+    """Open, join and leave classroom tables, and switch to the facilitator view"""
+    game = st.session_state.game
+    table = current_table()
+    client = st.session_state.client_id
+    with st.sidebar.expander("Classroom", expanded=table is not None):
+        if table is None:
+            # The host sets the game up as usual, then shares its code
+            if game.players and st.button("Open as Classroom Table"):
+                table = game_registry().create(game, host=client)
+                table.bots = st.session_state.get('bots', {})
+                st.session_state.table_code = table.code
+                st.rerun()
+            code = st.text_input("Join Code", key="join_code", max_chars=CODE_LENGTH)
+            if st.button("Join Table", disabled=not code.strip()):
+                try:
+                    joining = game_registry().get(code)
+                    joining.join(client)
+                except (KeyError, ValueError) as e:
+                    st.error(e.args[0])
+                else:
+                    st.session_state.table_code = joining.code
+                    st.session_state.game = joining.engine
+                    st.rerun()
+        else:
+            seat = table.seat_of(client)
+            st.markdown(f"Table **{table.code}**")
+            if seat is None:
+                st.caption(f"You run this table; players join with its code. "
+                           f"{len(table.seats)} of {len(game.players)} seats taken.")
+            else:
+                names = game.players
+                choice = st.selectbox("Your Industry", [seat] + table.free_seats(),
+                                      format_func=lambda i: names[i].name, key="seat_choice")
+                if choice != seat:
+                    table.join(client, choice)
+                    st.rerun()
+            if st.button("Leave Table"):
+                table.leave(client)
+                for key in ('table_code', 'seat_choice', 'trade_parties', 'last_mover'):
+                    st.session_state.pop(key, None)
+                st.session_state.game = GameEngine()
+                st.rerun()
+        st.toggle("Facilitator View", key="facilitator")
+
+def run_table(code: str):
+    """Take a table over from the facilitator view, playing every seat nobody holds"""
+    try:
+        table = game_registry().get(code)
+    except KeyError:
+        return
+    current = current_table()
+    if current is not None:
+        current.leave(st.session_state.client_id)
+    st.session_state.table_code = table.code
+    st.session_state.game = table.engine
+    st.session_state.facilitator = False
+
+@st.fragment(run_every=FACILITATOR_REFRESH)
+def facilitator_panel():
+    """Every table in this server with its live state; listing never holds up a game"""
+    import pandas as pd
+
+    st.header("Classroom Tables")
+    summaries = game_registry().summaries()
+    if not summaries:
+        st.info("No tables yet. Set up a game and open it as a classroom table from the sidebar.")
+        return
+    st.dataframe(pd.DataFrame([{
+        "Table": row['code'],
+        "Status": row['status'].title(),
+        "Industries": row['industries'],
+        "Seated": row['seated'],
+        "Bots": row['bots'],
+        "Period": row['period'],
+        "Turns": row['turns'],
+        "Current Turn": row['current'] or "",
+        "Pollution (kg)": format_number(row['pollution']),
+        "Cap (kg)": format_number(row['cap']),
+        "Firms in Deficit": row['in_deficit'],
+        "Outcome": (row['outcome'] or "").title(),
+        "Idle": f"{row['idle'] / 60:.0f} min",
+    } for row in summaries]), use_container_width=True, hide_index=True)
+    code = st.selectbox("Table", [row['code'] for row in summaries], key="facilitator_table")
+    st.button(f"Run Table {code}", on_click=run_table, args=(code,))
+
 # Main application
 def main():
+    # Configured here rather than at import, so the module can be imported without side effects
+    st.set_page_config(
+        page_title="Gujarat ETS - Emission Trading Simulation",
+        page_icon="🌐",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
     init_session_state()
+    # At a classroom table the run holds the table's lock, so its seats take turns
+    with table_lock():
+        render_page()
+
+def render_page():
+    game = st.session_state.game
     
-    # Apply CSS
-    st.markdown(get_custom_css(), unsafe_allow_html=True)
+    # Apply CSS, prebuilt in ets/static
+    st.markdown(app_css(), unsafe_allow_html=True)
     
     # Main header
     st.markdown("""
@@ -802,7 +840,52 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Sidebar configuration
+    render_classroom()
+    if st.session_state.get('facilitator'):
+        facilitator_panel()
+        return
+    
+    # Seated players play the game their host set up
+    table = current_table()
+    if my_seat() is None:
+        (render_configuration if hosting() else render_table_settings)(game)
+    
+    # Main game area: market and trading, the board and turn, then the standings.
+    # Each is a fragment, so a trade or a roll reruns only its own panel.
+    if len(game.players) > 0:
+        st.session_state.page_phase = game_phase(game)
+        trading_panel()
+        (turn_panel if table is None else table_turn_panel)()
+        standings_panel()
+
+        if game.turns:
+            with st.expander("Timeline"):
+                timeline_panel()
+        
+        # Final results
+        if game.game_over:
+            render_final_results()
+            # Archived once per game, by whichever session at its table gets there first;
+            # the insert runs on the archive's writer thread
+            if table is not None:
+                if table.mark_archived():
+                    game_archive().submit(game)
+            elif not st.session_state.get('archived'):
+                game_archive().submit(game)
+                st.session_state.archived = True
+        
+        render_instrumentation()
+        render_archive_summary()
+    
+    else:
+        render_instructions()
+
+def render_configuration(game: GameEngine):
+    """The sidebar's game settings and controls
+
+    Settings take effect when the host assigns industries, so nothing in
+    the sidebar changes a game under way.
+    """
     with st.sidebar:
         st.header("Game Configuration")
         
@@ -810,222 +893,235 @@ def main():
         st.subheader("Market Settings")
         market_cap = st.number_input("Total Market Cap (kg)", 
                                     value=DEFAULT_MARKET_CAP, 
-                                    min_value=100000, 
-                                    max_value=500000, 
-                                    step=10000)
+                                    min_value=MARKET_CAP_RANGE[0], 
+                                    max_value=MARKET_CAP_RANGE[1], 
+                                    step=MARKET_CAP_RANGE[2])
         
         permit_price = st.number_input("Permit Floor Price (₹)", 
                                       value=float(PERMIT_PRICE), 
-                                      min_value=1.0, 
-                                      max_value=20.0, 
-                                      step=0.5)
+                                      min_value=PERMIT_PRICE_RANGE[0], 
+                                      max_value=PERMIT_PRICE_RANGE[1], 
+                                      step=PERMIT_PRICE_RANGE[2])
+        # Scarcity pricing: the pool price climbs towards the ceiling as it drains
+        supply_curve = st.selectbox("Supply Curve", SUPPLY_CURVES, format_func=str.title)
+        price_ceiling = st.number_input("Permit Ceiling Price (₹)",
+                                        value=max(float(permit_price), PERMIT_PRICE_RANGE[1]),
+                                        min_value=float(permit_price),
+                                        step=PERMIT_PRICE_RANGE[2],
+                                        disabled=supply_curve == "flat")
+        
+        # Multi-year play: one lap of the board per compliance period, trued up in between
+        with st.expander("Compliance Periods"):
+            n_periods = st.number_input("Periods", value=PERIODS_RANGE[0], min_value=PERIODS_RANGE[0],
+                                        max_value=PERIODS_RANGE[1], step=PERIODS_RANGE[2])
+            single = n_periods == 1
+            cap_decline = st.number_input("Cap Tightening per Period (%)", value=0.0, min_value=0.0,
+                                          max_value=50.0, step=1.0, disabled=single)
+            banking = st.checkbox("Bank Unused Permits", value=True, disabled=single)
+            borrow_limit = st.number_input("Borrowing Limit (% of next allocation)", value=0.0, min_value=0.0,
+                                           max_value=50.0, step=5.0, disabled=single)
+            # A single-period game shows the penalty due at GO without charging it
+            penalty = st.number_input("Penalty per Uncovered kg (₹)", value=DEFAULT_PENALTY,
+                                      min_value=PENALTY_RANGE[0], max_value=PENALTY_RANGE[1],
+                                      step=PENALTY_RANGE[2])
+            make_good = st.checkbox("Make Good Uncovered Emissions", value=False, disabled=single,
+                                    help="Uncovered kg also come off the next period's allocation")
+        periods = PeriodSchedule(n_periods, cap_decline / 100, banking, borrow_limit / 100, penalty, make_good)
+        
+        # Custom boards are swapped in per classroom from a spec file
+        board_source = None
+        board_file = st.file_uploader("Board Spec (JSON/YAML)", type=["json", "yaml", "yml"])
+        if board_file is not None:
+            source = (board_file.getvalue().decode("utf-8"), board_file.name.rsplit(".", 1)[-1].lower())
+            try:
+                board = load_board_source(*source)
+            except ValueError as e:
+                st.error(f"Invalid board spec: {e}")
+            else:
+                board_source = source
+        
+        if st.button("Estimate Outcome Odds"):
+            for outcome, prob in estimate_outcome_odds(market_cap, permit_price, board_source, price_ceiling,
+                                                       supply_curve, periods.to_dict()).items():
+                st.text(f"{outcome}: {prob:.1%}")
         
         # Player names
         st.subheader("Industry Setup")
-        player1_name = st.text_input("Player 1 Name", value="Industry A")
-        player2_name = st.text_input("Player 2 Name", value="Industry B")
+        num_players = st.number_input("Number of Industries", value=2, min_value=1, max_value=MAX_INDUSTRIES, step=1)
+        names_text = st.text_area("Industry Names (one per line)", value="Industry A\nIndustry B")
+        names = [line.strip() for line in names_text.splitlines() if line.strip()][:num_players]
+        names += [default_name(i) for i in range(len(names), num_players)]
+        
+        # A roster file replaces the generated Large/Small mix
+        roster = None
+        roster_file = st.file_uploader("Industry Roster (CSV/Parquet)", type=["csv", "parquet"])
+        allocation_method = st.selectbox("Allocation Method", ALLOCATION_METHODS,
+                                         format_func=lambda m: m.title())
+        if roster_file is not None:
+            try:
+                roster = load_roster_source(roster_file.getvalue(), roster_file.name.rsplit(".", 1)[-1].lower())
+            except ValueError as e:
+                st.error(f"Invalid roster: {e}")
+            else:
+                if len(roster) > MAX_INDUSTRIES:
+                    st.error(f"Interactive games support up to {MAX_INDUSTRIES} industries, roster has {len(roster):,}")
+                    roster = None
+                else:
+                    st.caption(f"{len(roster):,} industries in {len(roster.sector_names)} sectors")
         
         # Game controls
         st.subheader("Game Controls")
         
+        # A seed replays the same shuffle and dice, here or in the batch simulator
+        seed_text = st.text_input("Game Seed (blank for random)", key="seed_text")
+        try:
+            seed = int(seed_text) if seed_text.strip() else None
+        except ValueError:
+            st.error("The seed must be a whole number")
+            seed = None
+        
         if st.button("Assign Industry Types", type="primary"):
-            # Reset game state
-            st.session_state.players = []
-            st.session_state.game_started = False
-            st.session_state.game_over = False
-            st.session_state.current_turn = 0
-            st.session_state.game_log = []
-            st.session_state.roll_again_required = False
-            st.session_state.roll_was_too_high = False
-            
-            # Assign industry types randomly
-            kinds = [LARGE, SMALL]
-            random.shuffle(kinds)
-            colors = [COLORS['red'], COLORS['teal']]
-            names = [player1_name or "Industry A", player2_name or "Industry B"]
-            
-            for i in range(2):
-                player = Player(names[i], kinds[i], colors[i], market_cap, 2)
-                st.session_state.players.append(player)
-            
-            st.session_state.market_permits = rint(market_cap * (MARKET_ALLOCATION_PERCENT / 100))
+            # Reset game state and assign industry types randomly
+            game.market_cap = market_cap
+            game.periods = periods
+            game.configure_pricing(permit_price, price_ceiling, supply_curve)
+            game.board = load_board_source(*board_source) if board_source else default_board()
+            if roster is not None:
+                game.assign_roster(roster, allocation_method, seed=seed)
+            else:
+                game.assign_players(names, seed=seed)
+            # Seats from the previous game no longer apply
+            table = current_table()
+            if table is not None:
+                table.release_seats()
+                table.archived = False
+                table.bots = {}
+            st.session_state.pop('trade_parties', None)
+            st.session_state.pop('last_mover', None)
+            st.session_state.pop('archived', None)
+            st.session_state.pop('bot_seats', None)
+            st.session_state.pop('bots', None)
             st.success("Industries assigned successfully!")
             st.rerun()
         
-        if len(st.session_state.players) == 2 and not st.session_state.game_started:
-            if st.button("Start Game", type="secondary"):
-                st.session_state.game_started = True
-                st.session_state.current_turn = 0
-                st.success("Game started!")
-                st.rerun()
+        if game.players:
+            st.caption(f"Game seed: {game.seed}")
         
-        if st.session_state.game_started and not st.session_state.game_over:
-            current_player = st.session_state.players[st.session_state.current_turn]
-            
-            # Check if current player is finished
-            if current_player.finished:
-                st.info(f"{current_player.name} has finished the round!")
+        render_game_controls(game)
+
+def render_table_settings(game: GameEngine):
+    """The sidebar for a session running a table it did not set up: the host's settings, read only"""
+    with st.sidebar:
+        st.header("Game Configuration")
+        st.caption("Set up by the table's host")
+        if game.players:
+            periods = game.periods
+            st.markdown(f"Market cap: **{format_number(game.market_cap)} kg**  \n"
+                        f"Permit price: **₹{game.permit_price:.2f}**"
+                        + (f" to ₹{game.price_ceiling:.2f} ({game.supply_curve})"
+                           if game.supply_curve != "flat" and game.price_ceiling is not None else "")
+                        + f"  \nPeriods: **{periods.n_periods}**, penalty ₹{periods.penalty:g}/kg  \n"
+                        f"Game seed: {game.seed}")
+        render_game_controls(game)
+
+def render_game_controls(game: GameEngine):
+    """The auction, bots, start and new-game controls of any session running the game"""
+    # Sealed-bid uniform auction of the period's pool, held on GO before its first roll
+    if game.auction_open:
+        st.subheader(f"Period {game.period + 1} Auction" if game.periods.multi else "Uniform Auction")
+        bidder = st.selectbox("Bidder", range(len(game.players)),
+                              format_func=lambda i: game.players[i].name, key="auction_bidder")
+        curve_text = st.text_input("Bid Curve (price:qty, ...)", key=f"bid_curve_{bidder}",
+                                   placeholder=f"{game.permit_price + 1:.1f}:1000, {game.permit_price:.1f}:2000")
+        if st.button("Submit Sealed Bid"):
+            try:
+                game.submit_bids(bidder, parse_bid_curve(curve_text))
+            except ValueError as e:
+                st.error(str(e))
             else:
-                # Show appropriate button text based on roll status
-                if st.session_state.roll_again_required:
-                    if st.session_state.roll_was_too_high:
-                        button_text = f"🎲 {current_player.name}: Roll Again (Previous roll too high!)"
-                        st.warning(f"Roll was too high! {current_player.name} needs to roll exactly {TOTAL_TILES - current_player.position} to reach GO.")
-                    else:
-                        button_text = f"🎲 {current_player.name}: Roll Again"
-                else:
-                    button_text = f"🎲 {current_player.name}: Roll Dice"
-                
-                if st.button(button_text, type="secondary"):
-                    handle_dice_roll()
-                    st.rerun()
-        
-        # Trading section
-        if st.session_state.game_started and not st.session_state.game_over:
-            st.subheader("Permit Trading")
-            
-            for i, player in enumerate(st.session_state.players):
-                if not player.finished:  # Only allow trading for active players
-                    max_affordable = int(player.earnings // permit_price) if permit_price > 0 else 0
-                    max_by_limit = player.max_permits - player.permits
-                    max_possible = min(st.session_state.market_permits, max_by_limit, max_affordable)
-                    
-                    if max_possible > 0:
-                        qty = st.number_input(f"Permits for {player.name}", 
-                                            min_value=0, 
-                                            max_value=max_possible, 
-                                            key=f"permits_{i}")
-                        
-                        if st.button(f"Buy {qty} permits", key=f"buy_{i}") and qty > 0:
-                            cost = qty * permit_price
-                            player.earnings -= cost
-                            player.permit_cost += cost
-                            player.total_cost += cost
-                            player.permits += qty
-                            st.session_state.market_permits -= qty
-                            
-                            st.success(f"{player.name} bought {qty:,} permits for {money(cost)}")
-                            st.rerun()
-                    else:
-                        st.text(f"{player.name}: No permits available")
-        
-        # Reset button
-        if st.button("New Game", type="secondary"):
-            for key in list(st.session_state.keys()):
-                if key not in ['tile_rules', 'tile_effects']:
-                    del st.session_state[key]
-            init_session_state()
+                st.success(f"Bid received from {game.players[bidder].name}")
+        st.caption(f"{len(game.bids)} of {len(game.players)} industries have bid")
+        if st.button("Run Auction"):
+            game.run_auction()
             st.rerun()
-        
-        # Display last roll
-        if st.session_state.last_roll:
-            st.success(f"Last roll: {st.session_state.last_roll}")
-        
-        # Display current turn info
-        if st.session_state.game_started and not st.session_state.game_over:
-            current_player = st.session_state.players[st.session_state.current_turn]
-            if current_player.finished:
-                # Find next active player
-                next_player_idx = st.session_state.current_turn
-                for _ in range(2):
-                    next_player_idx = (next_player_idx + 1) % 2
-                    if not st.session_state.players[next_player_idx].finished:
-                        st.info(f"Current turn: {st.session_state.players[next_player_idx].name}")
-                        break
-                else:
-                    st.info("All players finished!")
+    
+    if game.auction_result is not None and not game.game_over:
+        st.success(f"Auction cleared at ₹{game.auction_result.clearing_price:.2f} "
+                   f"({game.auction_result.sold:,} permits sold)")
+    
+    # Bots can fill any seat and act as soon as the game reaches them; the host picks them
+    if game.players and not game.game_over:
+        with st.expander("Bot Players"):
+            if hosting():
+                st.multiselect("Seats Played by Bots", range(len(game.players)),
+                               format_func=lambda i: game.players[i].name, key="bot_seats",
+                               on_change=apply_bots)
+                st.selectbox("Bot Strategy", list(STRATEGIES), format_func=str.title,
+                             key="bot_strategy", on_change=apply_bots)
             else:
-                st.info(f"Current turn: {current_player.name}")
-                
-                # Show position info for current player
-                tiles_to_go = TOTAL_TILES - current_player.position
-                if tiles_to_go <= 6:
-                    st.warning(f"ⓘ {current_player.name} needs exactly {tiles_to_go} to reach GO!")
+                bots = current_bots()
+                st.caption(", ".join(f"{game.players[seat].name} ({strategy})"
+                                     for seat, strategy in sorted(bots.items())) or "No bots at this table")
     
-    # Handle pending investments
-    if st.session_state.pending_investment:
-        investment = st.session_state.pending_investment
-        player = investment['player']
-        cost = investment['cost']
-        multiplier = investment['multiplier']
-        inv_type = investment['type']
-        
-        reduction = int((1 - multiplier) * 100)
-        
-        st.warning(f"Investment Decision for {player.name}")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button(f"Buy {inv_type.title()} Equipment", key="buy_equipment_btn"):
-                if player.earnings >= cost:
-                    player.earnings -= cost
-                    player.total_cost += cost
-                    player.pollution *= multiplier
-                    st.success(f"Equipment purchased! Pollution reduced by {reduction}%")
-                else:
-                    st.error(f"Insufficient funds! Need {money(cost)}, have {money(player.earnings)}")
-                st.session_state.pending_investment = None
-                st.rerun()
-        
-        with col2:
-            if st.button("Skip Investment", key="skip_investment_btn"):
-                st.session_state.pending_investment = None
-                st.rerun()
-        
-        st.info(f"Cost: {money(cost)} | Pollution Reduction: {reduction}% | Current Earnings: {money(player.earnings)}")
+    if game.players and not game.game_started:
+        if st.button("Start Game", type="secondary"):
+            game.start()
+            # Have the investment advisor's policies ready by the first offer; bots need no advice
+            bots = current_bots()
+            warm(game, [seat for seat in range(len(game.players)) if seat not in bots])
+            st.success("Game started!")
+            st.rerun()
     
-    # Main game area - REORDERED: Market Status first, then Game Board, then Industry Status, then Game Log
-    if len(st.session_state.players) > 0:
-        render_market_status(market_cap, permit_price)
-        render_game_board()
-        render_player_status()
-        
-        # Game log
-        if st.session_state.game_log:
-            st.header("Game Log")
-            for log_entry in st.session_state.game_log[-5:]:
-                st.text(log_entry)
-        
-        # Final results
-        if st.session_state.game_over:
-            render_final_results(market_cap)
+    # Reset button; a host leaves the table to its seated players
+    if st.button("New Game", type="secondary"):
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        init_session_state()
+        st.rerun()
+
+def render_instructions():
+    st.info("Configure the game settings and assign industry types to begin!")
     
-    else:
-        st.info("Configure the game settings and assign industry types to begin!")
-        
-        # Show game instructions
-        st.header("How to Play")
-        
-        st.markdown("""
-        ### Game Objective
-        The goal is for all industries to collectively stay within the **market cap** for pollution while maintaining profitable operations. The game ends when all players complete **one full round** around the board.
-        
-        ### Key Rules
-        1. **Single Round**: Each player must complete exactly one circuit around the board
-        2. **Exact Landing**: Players must roll the exact number to land on GO/True-up tile
-        3. **No Overshooting**: If a roll would take a player past GO, they must roll again
-        4. **Game Ends**: When all players have reached the GO/True-up tile
-        
-        ### Key Concepts
-        1. **Cap-and-Trade**: Industries receive pollution permits and can trade them
-        2. **Market Cap**: Total allowed pollution for all industries combined
-        3. **Permits**: Allow industries to emit a certain amount of pollution
-        4. **Trading**: Industries can buy additional permits if needed
-        
-        ### Victory Conditions
-        - **Everyone Wins**: Total pollution ≤ market cap AND all industries compliant
-        - **Partial Success**: Total pollution ≤ market cap BUT some non-compliance
-        - **Everyone Loses**: Total pollution > market cap (environmental failure)
-        
-        ### Getting Started
-        1. Set market parameters in the sidebar
-        2. Enter industry names
-        3. Click "Assign Industry Types" to randomly assign Large/Small industries
-        4. Click "Start Game" to begin
-        5. Take turns rolling dice and making decisions
-        6. Use permit trading to stay compliant
-        7. Game ends when both players complete one full round
-        """)
+    # Show game instructions
+    st.header("How to Play")
+    
+    st.markdown("""
+    ### Game Objective
+    The goal is for all industries to collectively stay within the **market cap** for pollution while maintaining profitable operations. The game ends when all players complete **one full round** around the board.
+    
+    ### Key Rules
+    1. **Single Round**: Each player must complete exactly one circuit around the board
+    2. **Exact Landing**: Players must roll the exact number to land on GO/True-up tile
+    3. **No Overshooting**: If a roll would take a player past GO, they must roll again
+    4. **Game Ends**: When all players have reached the GO/True-up tile
+    5. **Compliance Periods**: In a multi-year game each period is one round; once everyone is home,
+       the period is trued up, uncovered pollution is penalised and the next period starts under a tighter cap
+    
+    ### Key Concepts
+    1. **Cap-and-Trade**: Industries receive pollution permits and can trade them
+    2. **Market Cap**: Total allowed pollution for all industries combined
+    3. **Permits**: Allow industries to emit a certain amount of pollution
+    4. **Trading**: Industries can buy additional permits if needed
+    
+    ### Victory Conditions
+    - **Everyone Wins**: Total pollution ≤ market cap AND all industries compliant
+    - **Partial Success**: Total pollution ≤ market cap BUT some non-compliance
+    - **Everyone Loses**: Total pollution > market cap (environmental failure)
+    
+    ### Classroom Tables
+    - **Host**: set the game up, then open it as a classroom table and share its join code
+    - **Players**: enter the code under Classroom to take a seat; you roll, invest and trade for your industry
+    - **Facilitator**: the Facilitator View lists every table on this server with its live state
+    
+    ### Getting Started
+    1. Set market parameters in the sidebar
+    2. Enter industry names
+    3. Click "Assign Industry Types" to randomly assign Large/Small industries
+    4. Click "Start Game" to begin
+    5. Take turns rolling dice and making decisions
+    6. Use permit trading to stay compliant
+    7. Game ends when all players complete one full round
+    """)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import pytest
+
+from ets.archive import GameArchive, game_record
+from ets.engine import GameEngine
+from ets.periods import PeriodSchedule
+from ets.rules import OUTCOMES
+
+def finished_game(seed, periods=None):
+    engine = GameEngine(seed=seed, periods=periods)
+    engine.assign_players(["A", "B", "C"])
+    engine.start()
+    while not engine.game_over:
+        if engine.true_up_due:
+            engine.close_period()
+        elif engine.pending_investment:
+            engine.decide_investment(True)
+        else:
+            engine.roll()
+    return engine
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = GameArchive(str(tmp_path / "games.sqlite3"))
+    yield archive
+    if archive._writer.is_alive():
+        archive.close()
+
+def test_games_round_trip(archive):
+    schedule = PeriodSchedule(2, cap_decline=0.1, penalty=20.0)
+    engines = [finished_game(1), finished_game(2, schedule)]
+    for engine in engines:
+        archive.submit(engine)
+    archive.flush()
+    assert archive.written == 2
+
+    rows = sorted(archive.games(), key=lambda row: row['id'])
+    assert [row['seed'] for row in rows] == [e.seed for e in engines]
+    assert rows[1]['periods'] == schedule.to_dict()
+    for row, engine in zip(rows, engines):
+        settlement = engine.settlement()
+        assert row['outcome'] == OUTCOMES[int(settlement['outcome'])]
+        assert row['turns'] == engine.turns
+        firms = archive.firms([row['id']])
+        assert [f['penalty'] for f in firms] == settlement['penalty'].tolist()
+
+        copy = archive.load(row['id'])
+        assert copy.to_bytes() == engine.to_bytes()
+        assert copy.state() == engine.state()
+        assert (copy.events.slice(0) == engine.events.slice(0)).all()
+
+def test_bad_game_is_skipped(archive):
+    bad = game_record(finished_game(3))
+    bad['state'] = b"not a game"
+    archive._queue.put(bad)
+    archive.submit(finished_game(4))
+    archive.flush()
+    assert archive.written == 1
+    assert archive.error is not None
+    assert [row['seed'] for row in archive.games()] == [4]
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_flush_fails_once_the_writer_has_died(archive, monkeypatch):
+    def crash(conn, records):
+        raise MemoryError("writer crashed")
+    monkeypatch.setattr(archive, "_write", crash)
+    archive.submit(finished_game(5))
+    archive._writer.join(5)
+    assert not archive._writer.is_alive()
+    archive.submit(finished_game(6))
+    with pytest.raises(RuntimeError, match="has stopped"):
+        archive.flush()
@@ -0,0 +1,77 @@
+import numpy as np
+
+from ets.compliance import over_periods, true_up
+from ets.engine import GameEngine
+from ets.periods import PeriodSchedule
+from ets.rules import OUTCOMES
+from ets.strategy import Greedy
+
+def test_single_period_true_up_shows_the_penalty_due():
+    schedule = PeriodSchedule(penalty=20.0)
+    result = true_up(np.array([100.4, 50.0]), np.array([80.0, 60.0]), 200, schedule)
+    assert result['surrendered'].tolist() == [80.0, 50.0]
+    assert result['deficit'].tolist() == [21.0, 0.0]
+    assert result['uncovered'].tolist() == [21.0, 0.0]
+    assert result['penalty'].tolist() == [420.0, 0.0]
+    assert result['compliant'].tolist() == [False, True]
+    assert OUTCOMES[int(result['outcome'])] == "PARTIAL SUCCESS"
+
+def test_true_up_settles_many_games_at_once():
+    emissions = np.array([[100.0, 50.0], [300.0, 10.0]])
+    permits = np.array([[100.0, 50.0], [100.0, 10.0]])
+    result = true_up(emissions, permits, np.array([200, 200]))
+    assert result['total'].tolist() == [150.0, 310.0]
+    assert result['excess'].tolist() == [0.0, 110.0]
+    assert result['outcome'].tolist() == [0, 2]
+
+def test_borrowing_banking_and_make_good_roll_forward():
+    schedule = PeriodSchedule(3, borrow_limit=0.5, penalty=20.0, make_good=True)
+    result = true_up(np.array([100.0, 10.0]), np.array([10.0, 10.0]), 1000, schedule,
+                     next_allocation=np.array([20.0, 20.0]), owed=np.array([0.0, 5.0]))
+    assert result['borrowed'].tolist() == [10.0, 0.0]
+    assert result['uncovered'].tolist() == [80.0, 0.0]
+    assert result['penalty'].tolist() == [1600.0, 0.0]
+    # Borrowing and make-good take more than the next allocation: the rest is owed, never negative permits
+    assert result['next_permits'].tolist() == [0.0, 15.0]
+    assert result['owed'].tolist() == [70.0, 0.0]
+
+def test_periods_chain_into_over_periods():
+    schedule = PeriodSchedule(3, cap_decline=0.1, banking=True, borrow_limit=0.0, penalty=10.0)
+    allocation = np.array([100.0, 100.0])
+    permits, owed = allocation.copy(), np.zeros(2)
+    emissions = [np.array([90.0, 120.0]), np.array([95.0, 80.0]), np.array([120.0, 70.0])]
+    penalties, breaches, total, caps = np.zeros(2), np.zeros(2, dtype=np.int64), 0.0, 0
+    for period, emitted in enumerate(emissions):
+        cap = schedule.cap(200, period)
+        next_allocation = np.rint(allocation * schedule.factor(period + 1))
+        result = true_up(emitted, permits, cap, schedule, next_allocation, owed)
+        penalties += result['penalty']
+        breaches += ~result['compliant']
+        total += result['total']
+        caps += cap
+        permits, owed = result['next_permits'], result['owed']
+    # Period 1: B is 20 short, A banks 10. Period 2: both covered, A banks 5, B 10. Period 3: A has
+    # 81 + 5 against 120, 34 short
+    assert penalties.tolist() == [340.0, 200.0]
+    assert breaches.tolist() == [1, 1]
+    final = over_periods(result, total, caps, breaches, penalties)
+    assert final['penalty'].tolist() == [340.0, 200.0]
+    assert final['compliant'].tolist() == [False, False]
+    assert final['total'] == 575.0
+    # Caps of 200, 180 and 162
+    assert final['excess'] == 575.0 - 542
+    assert OUTCOMES[int(final['outcome'])] == "EVERYONE LOSES"
+
+def test_engine_charges_each_period_penalty_once():
+    schedule = PeriodSchedule(3, cap_decline=0.2, banking=False, penalty=20.0)
+    engine = GameEngine(seed=11, periods=schedule)
+    engine.assign_players(["A", "B", "C"])
+    engine.start()
+    engine.play_bots({seat: Greedy() for seat in range(3)})
+    assert engine.game_over and len(engine.history) == 3
+    charged = sum(p.penalties for p in engine.players)
+    assert charged == sum(h['penalties'] for h in engine.history)
+    settled = engine.settlement()
+    assert settled['penalty'].tolist() == [p.penalties for p in engine.players]
+    assert settled['total'] == sum(h['emissions'] for h in engine.history)
+    assert [h['cap'] for h in engine.history] == [schedule.cap(engine.market_cap, k) for k in range(3)]
@@ -0,0 +1,72 @@
+import pytest
+
+from ets.engine import GameEngine
+from ets.events import EventLog
+
+def new_game(seed, n_firms=40, capacity=16):
+    engine = GameEngine(seed=seed)
+    engine.assign_players([f"F{i}" for i in range(n_firms)])
+    # A tiny ring, so the log spills to disk within a few turns
+    engine.events = EventLog(capacity=capacity)
+    engine._snapshot()
+    engine.start()
+    return engine
+
+def step(engine, buy=True):
+    if engine.pending_investment:
+        engine.decide_investment(buy)
+    else:
+        engine.roll()
+
+def play_to_end(engine, buy=True):
+    while not engine.game_over:
+        step(engine, buy)
+
+def test_log_spills_events_and_snapshots():
+    engine = new_game(3)
+    play_to_end(engine)
+    assert engine.events.spilled > 0
+    assert any(isinstance(v, str) for v in engine.events._snapshots.values())
+    assert len(engine.events.slice(0)) == engine.events.count
+
+@pytest.mark.parametrize("fraction", [0.1, 0.5, 0.9])
+def test_rewind_across_snapshots_and_spilled_events(fraction):
+    engine = new_game(5)
+    states = {}
+    while not engine.game_over:
+        states[engine.events.count] = engine.state()
+        step(engine)
+    seq = max(s for s in states if s <= int(engine.events.count * fraction))
+    assert seq < engine.events.spilled
+    engine.rewind(seq)
+    assert engine.events.count == seq
+    assert engine.state() == states[seq]
+    # The rewound game plays on, replaying the same dice
+    play_to_end(engine)
+    assert engine.game_over
+
+def test_rewound_game_replays_identically():
+    engine, twin = new_game(7), new_game(7)
+    play_to_end(engine)
+    play_to_end(twin)
+    engine.rewind(engine.events.count // 3)
+    play_to_end(engine)
+    assert engine.state() == twin.state()
+
+def test_undo_takes_back_one_action_at_a_time():
+    engine = new_game(9)
+    states = []
+    for _ in range(120):
+        states.append((engine.events.count, engine.state()))
+        step(engine, buy=False)
+    for count, state in reversed(states[-60:]):
+        assert engine.undo()
+        assert engine.events.count == count and engine.state() == state
+
+def test_state_at_leaves_the_game_alone():
+    engine = new_game(4)
+    play_to_end(engine)
+    before = engine.state()
+    past = engine.state_at(engine.events.count // 2)
+    assert past.turns < engine.turns
+    assert engine.state() == before
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from ets import markov
+from ets.engine import GameEngine
+from ets.periods import PeriodSchedule
+from ets.simulate import simulate_games
+from ets.strategy import Greedy, PriceThreshold
+
+SEEDS = list(range(100, 140))
+
+def play(seed, strategies, periods=None):
+    engine = GameEngine(seed=seed, periods=periods)
+    engine.assign_players([f"F{i}" for i in range(len(strategies))])
+    engine.start()
+    engine.play_bots(dict(enumerate(strategies)))
+    assert engine.game_over
+    return engine
+
+def firm_columns(engine):
+    return np.array([[p.pollution, p.permits, p.earnings, p.penalties, p.breaches] for p in engine.players])
+
+@pytest.mark.parametrize("periods", [
+    None,
+    PeriodSchedule(penalty=20.0),
+    PeriodSchedule(4, cap_decline=0.1, banking=True, borrow_limit=0.2, penalty=20.0),
+    PeriodSchedule(4, cap_decline=0.2, banking=False, borrow_limit=0.5, penalty=5.0, make_good=True),
+])
+def test_engine_matches_simulator_for_the_same_seeds(periods):
+    strategies = [Greedy(), Greedy(), Greedy()]
+    result = simulate_games(0, game_seeds=SEEDS, n_firms=3, strategies=strategies, periods=periods)
+    for i, seed in enumerate(SEEDS):
+        engine = play(seed, strategies, periods)
+        simulated = np.stack([result.pollution[i], result.permits[i], result.earnings[i], result.penalties[i],
+                              result.breaches[i] if result.breaches is not None else np.zeros(3)], axis=1)
+        np.testing.assert_allclose(firm_columns(engine), simulated, err_msg=f"seed {seed}")
+        assert engine.turns == result.rolls[i].sum()
+        settled, simulated = engine.settlement(), {k: v[i] for k, v in result.settlement.items()}
+        assert int(settled['outcome']) == simulated['outcome']
+        np.testing.assert_allclose(settled['penalty'], simulated['penalty'])
+
+def test_engine_matches_simulator_with_investing_bots():
+    strategies = [PriceThreshold(), Greedy()]
+    result = simulate_games(0, game_seeds=SEEDS, strategies=strategies)
+    for i, seed in enumerate(SEEDS):
+        engine = play(seed, strategies)
+        np.testing.assert_allclose(firm_columns(engine)[:, :3], np.stack(
+            [result.pollution[i], result.permits[i], result.earnings[i]], axis=1), err_msg=f"seed {seed}")
+
+def test_engine_agrees_with_the_markov_chain():
+    n_games = 500
+    rolls, multipliers = [], {"Large": [], "Small": []}
+    for seed in range(n_games):
+        engine = play(seed, [Greedy(), Greedy()])
+        rolls.append(engine.turns / len(engine.players))
+        for p in engine.players:
+            multipliers[p.kind_name].append(p.pollution / p.initial_pollution)
+    exact = markov.solve()
+
+    def close(samples, expected):
+        samples = np.asarray(samples)
+        assert abs(samples.mean() - expected) < 4 * samples.std() / np.sqrt(samples.size)
+
+    close(rolls, exact['expected_rolls'])
+    for kind, samples in multipliers.items():
+        close(samples, exact['pollution_multiplier'][kind]['mean'])